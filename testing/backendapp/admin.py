@@ -1,3 +1,127 @@
-from django.contrib import admin
+from asgiref.sync import async_to_sync
+from django import forms
+from django.contrib import admin, messages
 
-# Register your models here.
+from backendapp import symbols as symbol_registry
+from backendapp.models import Binance_Data, HistoryData, IbApi_Data, TrackedSymbol
+
+
+class TrackedSymbolForm(forms.ModelForm):
+    class Meta:
+        model = TrackedSymbol
+        fields = ["provider", "symbol", "enabled"]
+        widgets = {"provider": forms.Select(choices=[(p, p) for p in symbol_registry.DEFAULTS])}
+
+    def clean(self):
+        cleaned = super().clean()
+        # self.instance still holds the saved values here; only check what is newly enabled.
+        old = self.instance
+        # The changelist form only edits "enabled"; the rest comes from the row.
+        provider = cleaned.get("provider") if "provider" in self.fields else old.provider
+        symbol = cleaned.get("symbol") if "symbol" in self.fields else old.symbol
+        unchanged = old.pk and old.enabled and (old.provider, old.symbol) == (provider, symbol)
+        if provider and symbol and cleaned.get("enabled") and not unchanged:
+            try:
+                symbol = async_to_sync(symbol_registry.validate)(provider, symbol)
+            except symbol_registry.SymbolRejected as e:
+                raise forms.ValidationError(str(e))
+            if "symbol" in self.fields:
+                cleaned["symbol"] = symbol
+        return cleaned
+
+
+@admin.register(TrackedSymbol)
+class TrackedSymbolAdmin(admin.ModelAdmin):
+    """Changes made here are pushed to the live feeds as subscribe/unsubscribe deltas."""
+    form = TrackedSymbolForm
+    list_display = ["symbol", "provider", "enabled", "updated_at"]
+    list_filter = ["provider", "enabled"]
+    list_editable = ["enabled"]
+    search_fields = ["symbol"]
+    actions = ["enable", "disable"]
+
+    def get_changelist_form(self, request, **kwargs):
+        # list_editable edits go through the same validation as the change form.
+        kwargs.setdefault("form", TrackedSymbolForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        previous = TrackedSymbol.objects.filter(pk=obj.pk).first() if change else None
+        super().save_model(request, obj, form, change)
+        before = (previous.provider, previous.symbol) if previous is not None and previous.enabled else None
+        after = (obj.provider, obj.symbol) if obj.enabled else None
+        if before == after:
+            return
+        if before:
+            async_to_sync(symbol_registry.publish)(before[0], removed=[before[1]])
+        if after:
+            async_to_sync(symbol_registry.publish)(after[0], added=[after[1]])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        if obj.enabled:
+            async_to_sync(symbol_registry.publish)(obj.provider, removed=[obj.symbol])
+
+    def delete_queryset(self, request, queryset):
+        self._publish_each(list(queryset.filter(enabled=True)), "removed")
+        super().delete_queryset(request, queryset)
+
+    @admin.action(description="Enable selected symbols")
+    def enable(self, request, queryset):
+        rows = []
+        for row in queryset.filter(enabled=False):
+            try:
+                async_to_sync(symbol_registry.validate)(row.provider, row.symbol)
+            except symbol_registry.SymbolRejected as e:
+                self.message_user(request, f"{row.symbol} not enabled: {e}", messages.WARNING)
+                continue
+            rows.append(row)
+        queryset.filter(pk__in=[row.pk for row in rows]).update(enabled=True)
+        self._publish_each(rows, "added")
+
+    @admin.action(description="Disable selected symbols")
+    def disable(self, request, queryset):
+        rows = list(queryset.filter(enabled=True))
+        queryset.filter(pk__in=[row.pk for row in rows]).update(enabled=False)
+        self._publish_each(rows, "removed")
+
+    @staticmethod
+    def _publish_each(rows, key):
+        by_provider = {}
+        for row in rows:
+            by_provider.setdefault(row.provider, []).append(row.symbol)
+        for provider, symbols in by_provider.items():
+            async_to_sync(symbol_registry.publish)(provider, **{key: symbols})
+
+
+class CandleAdmin(admin.ModelAdmin):
+    """
+    Browse-only. Candle rows are keyed by (symbol, timestamp) on Postgres,
+    which the models cannot declare (see CandleModel), so there are no change
+    pages to link to and rows are never added, edited or deleted from here.
+    """
+    list_display = ["symbol", "timestamp", "open_price", "high_price", "low_price", "close_price", "volume"]
+    list_display_links = None
+    search_fields = ["symbol"]
+    date_hierarchy = "timestamp"
+    ordering = ["-timestamp"]
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(HistoryData)
+class HistoryDataAdmin(CandleAdmin):
+    list_display = ["source", *CandleAdmin.list_display]
+    list_filter = ["source"]
+
+
+admin.site.register(Binance_Data, CandleAdmin)
+admin.site.register(IbApi_Data, CandleAdmin)
@@ -0,0 +1,26 @@
+from django.conf import settings
+from binance import AsyncClient, BinanceSocketManager
+
+
+class ConfigurableAsyncClient(AsyncClient):
+    """AsyncClient whose REST base URL can be redirected via settings.BINANCE_API_URL."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        api_url = getattr(settings, "BINANCE_API_URL", None)
+        if api_url:
+            self.API_URL = api_url.rstrip("/")
+
+
+async def create_client(**kwargs):
+    """Create an AsyncClient pointed at Binance or at the configured stand-in exchange."""
+    return await ConfigurableAsyncClient.create(**kwargs)
+
+
+def create_socket_manager(client, **kwargs):
+    """Create a BinanceSocketManager honouring settings.BINANCE_STREAM_URL."""
+    bm = BinanceSocketManager(client, **kwargs)
+    stream_url = getattr(settings, "BINANCE_STREAM_URL", None)
+    if stream_url:
+        bm.STREAM_URL = stream_url.rstrip("/") + "/"
+    return bm
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from backendapp import metrics, symbols as symbol_registry
+from backendapp.binance_client import create_client, create_socket_manager
+from backendapp.feed_supervisor import supervisor
+from backendapp.fixed_point import DEFAULT_DECIMALS, binance_scales
+from backendapp.providers import BINANCE
+from backendapp.sharding import HashRing
+from backendapp.tick_pipeline import TickPipeline
+from backendapp.trade_tape import get_trade_tape
+
+logger = logging.getLogger(__name__)
+
+# Sharded Binance ingestion. Each worker process runs one ShardWorker, which
+# owns the symbols that a HashRing over the live workers assigns to it, keeps
+# one combined aggTrade+kline socket per owned symbol and publishes through a
+# TickPipeline to the "binance_updates" group that BinanceConsumer joins in
+# sharded mode (settings.BINANCE_INGEST). Workers find each other through
+# the channel layer itself: each one heartbeats to the membership group, and
+# a worker that stops heartbeating drops out after member_timeout. Any
+# membership change recomputes the ring; symbols that move are started by the
+# new owner as soon as it sees the change and stopped by the old one after
+# `handoff` seconds (longer than a newcomer's first heartbeat interval), so a
+# move briefly overlaps, sending duplicate updates, instead of leaving a gap.
+# Symbol registry changes reach every worker the same way and are applied
+# through the same ring, so only the owner of an added symbol opens it.
+# With TRADE_TAPE_DIR set every aggregate trade is also written to the
+# trade tape (backendapp.trade_tape), and the trades a dropped socket missed
+# are fetched over REST once the feed supervisor has reconnected it.
+
+MEMBERSHIP_GROUP = "binance_ingest"
+
+
+class ShardWorker:
+    def __init__(self, worker_id, symbols=None, group="binance_updates", membership_group=MEMBERSHIP_GROUP,
+                 heartbeat_interval=2.0, member_timeout=6.0, handoff=5.0, static_members=None):
+        self.worker_id = worker_id
+        # None: follow the symbol registry
+        self.fixed_symbols = symbols
+        self.symbols = [symbol.upper() for symbol in symbols or ()]
+        self.group = group
+        self.membership_group = membership_group
+        self.heartbeat_interval = heartbeat_interval
+        self.member_timeout = member_timeout
+        self.handoff = handoff
+        # A fixed member list skips discovery: worker i of N always owns the same slice.
+        self.static_members = static_members
+        self.members = {}  # worker_id -> loop time of its last heartbeat
+        self.ring = HashRing()
+        self.listeners = {}  # symbol -> supervised listen stream
+        self.releasing = {}  # symbol -> delayed cancel
+        self.client = None
+        self.bm = None
+        self.pipeline = None
+        self.channel = None
+        self.ticks = 0
+        self._stopping = asyncio.Event()
+
+    @property
+    def owned(self):
+        return sorted(self.listeners)
+
+    async def run(self):
+        layer = get_channel_layer()
+        self.client = await create_client()
+        self.bm = create_socket_manager(self.client)
+        try:
+            await binance_scales.load(self.client)
+        except Exception as e:
+            logger.error(f"Could not load exchangeInfo, using {DEFAULT_DECIMALS} decimals for every symbol: {e}")
+        self.pipeline = TickPipeline(
+            BINANCE, self.group, "send.binance",
+            queue_size=getattr(settings, "BINANCE_TICK_QUEUE_SIZE", 100_000),
+            broadcast_interval=getattr(settings, "BINANCE_BROADCAST_INTERVAL", 0.25),
+            candles=False,
+        )
+        tasks = [asyncio.create_task(self.pipeline.run())]
+        metrics.track_queue("binance", f"shard_queue:{self.worker_id}", self.pipeline.queue)
+        if self.fixed_symbols is None:
+            self.symbols = symbol_registry.tradable(await symbol_registry.enabled("binance"))
+            symbol_registry.watcher.watch("binance", self.on_symbols)
+        try:
+            if self.static_members:
+                self._set_members(self.static_members)
+            else:
+                self.channel = await layer.new_channel()
+                await layer.group_add(self.membership_group, self.channel)
+                tasks.append(asyncio.create_task(self._receive_membership(layer)))
+                tasks.append(asyncio.create_task(self._heartbeat(layer)))
+                # Let existing workers answer before claiming anything.
+                await asyncio.sleep(self.heartbeat_interval)
+                self._rebalance()
+            logger.info(f"Shard worker {self.worker_id} started with {len(self.listeners)} symbols")
+            await self._stopping.wait()
+        finally:
+            if self.fixed_symbols is None:
+                symbol_registry.watcher.unwatch("binance", self.on_symbols)
+            for task in tasks:
+                task.cancel()
+            if self.channel:
+                await layer.group_send(self.membership_group, {"type": "shard.leave", "worker": self.worker_id})
+                await layer.group_discard(self.membership_group, self.channel)
+            for release in self.releasing.values():
+                release.cancel()
+            for symbol in list(self.listeners):
+                self._stop_listener(symbol)
+            await asyncio.gather(*tasks, *self.releasing.values(), return_exceptions=True)
+            await self.pipeline.stop()
+            metrics.untrack_queue("binance", f"shard_queue:{self.worker_id}")
+            await self.client.close_connection()
+
+    def stop(self):
+        self._stopping.set()
+
+    # --- membership ---
+
+    async def _heartbeat(self, layer):
+        loop = asyncio.get_running_loop()
+        while True:
+            # group_add is idempotent and restamps the membership, so a worker
+            # outliving the layer's group_expiry never silently drops out.
+            await layer.group_add(self.membership_group, self.channel)
+            await self._announce(layer)
+            await asyncio.sleep(self.heartbeat_interval)
+            cutoff = loop.time() - self.member_timeout
+            expired = [w for w, seen in self.members.items() if seen < cutoff and w != self.worker_id]
+            if expired:
+                logger.warning(f"Shard workers {expired} stopped heartbeating")
+                for worker in expired:
+                    del self.members[worker]
+                self._rebalance()
+
+    async def _announce(self, layer):
+        await layer.group_send(self.membership_group, {"type": "shard.heartbeat", "worker": self.worker_id})
+
+    async def _receive_membership(self, layer):
+        loop = asyncio.get_running_loop()
+        self.members[self.worker_id] = loop.time()
+        while True:
+            message = await layer.receive(self.channel)
+            worker = message.get("worker")
+            if message["type"] == "shard.leave":
+                if self.members.pop(worker, None) is not None:
+                    logger.info(f"Shard worker {worker} left")
+                    self._rebalance()
+            elif message["type"] == "shard.heartbeat":
+                known = worker in self.members
+                self.members[worker] = loop.time()
+                if not known:
+                    logger.info(f"Shard worker {worker} joined")
+                    # Answer right away so the newcomer sees the full membership before it claims symbols.
+                    await self._announce(layer)
+                    self._rebalance()
+
+    async def on_symbols(self, added, removed):
+        """Registry delta; the ring decides which worker opens an added symbol."""
+        self.symbols = [symbol for symbol in self.symbols if symbol not in removed]
+        self.symbols += [symbol for symbol in added if symbol not in self.symbols]
+        for symbol in removed:
+            self.pipeline.snapshot.pop(symbol, None)
+        if self.members:
+            self._rebalance()
+
+    def _set_members(self, members):
+        self.members = dict.fromkeys(members, 0.0)
+        self._rebalance()
+
+    def _rebalance(self):
+        if self.ring.members != set(self.members):
+            self.ring = HashRing(self.members)
+        mine = {symbol for symbol in self.symbols if self.ring.owner(symbol) == self.worker_id}
+        for symbol in mine:
+            release = self.releasing.pop(symbol, None)
+            if release is not None:
+                release.cancel()
+            elif symbol not in self.listeners:
+                self.listeners[symbol] = self._supervise(symbol)
+        for symbol in set(self.listeners) - mine:
+            if symbol not in self.releasing:
+                self.releasing[symbol] = asyncio.create_task(self._release_later(symbol))
+        logger.info(f"Shard {self.worker_id}: {len(mine)}/{len(self.symbols)} symbols over {len(self.members)} workers")
+
+    async def _release_later(self, symbol):
+        await asyncio.sleep(self.handoff)
+        self.releasing.pop(symbol, None)
+        self._stop_listener(symbol)
+
+    def _stop_listener(self, symbol):
+        stream = self.listeners.pop(symbol, None)
+        if stream is not None:
+            stream.cancel()
+
+    def _supervise(self, symbol):
+        stream = symbol.lower()
+        return supervisor.start(
+            "binance", symbol,
+            lambda: self.bm.multiplex_socket([f"{stream}@aggTrade", f"{stream}@kline_1m"]),
+            lambda feed: self.listen(symbol, feed),
+            backfill=lambda since_ms, until_ms: self.backfill_trades(symbol, since_ms, until_ms),
+        )
+
+    # --- upstream ---
+
+    async def listen(self, symbol, feed):
+        """Publish one symbol's combined aggTrade + 1m kline stream for as long as it is owned."""
+        tape = get_trade_tape()
+        last_kline = None
+        while True:
+            message = await feed.recv()
+            data = message.get("data")
+            if not data:
+                continue
+            metrics.messages_in.inc("binance", symbol)
+            if data.get("e") == "kline":
+                last_kline = data
+                trade = {"s": symbol, "T": data.get("E")}
+            else:
+                trade = data
+                if tape is not None:
+                    tape.append(data)
+            if last_kline is not None:
+                self.pipeline.submit((trade, last_kline))
+                self.ticks += 1
+
+    async def backfill_trades(self, symbol, since_ms, until_ms):
+        """Write the aggregate trades a dropped stream missed to the tape; the reader drops overlaps."""
+        tape = get_trade_tape()
+        if tape is None:
+            return
+        # startTime/endTime may span at most an hour: step through hour windows
+        # until the first trade, then page on by ID until past until_ms. A short
+        # page by ID means there are no newer trades yet.
+        start = since_ms
+        params = {"startTime": start, "endTime": min(until_ms, start + 3_599_999)}
+        while True:
+            trades = await self.client.get_aggregate_trades(symbol=symbol, limit=1000, **params)
+            for trade in trades:
+                tape.append(dict(trade, s=symbol))
+            if trades:
+                if trades[-1]["T"] >= until_ms or ("fromId" in params and len(trades) < 1000):
+                    return
+                params = {"fromId": trades[-1]["a"] + 1}
+            else:
+                if "fromId" in params or params["endTime"] >= until_ms:
+                    return
+                start = params["endTime"] + 1
+                params = {"startTime": start, "endTime": min(until_ms, start + 3_599_999)}
@@ -2,31 +2,30 @@ import asyncio
 from datetime import datetime, timezone, timedelta
 import logging
 from binance import AsyncClient, BinanceSocketManager, exceptions
-from backendapp.data_list import CRYPTO_SYMBOLS
-from backendapp.models import Binance_Data
+from backendapp.binance_client import create_client, create_socket_manager
 from django.db.utils import IntegrityError
-from asgiref.sync import sync_to_async  
+from backendapp import metrics, db, symbols as symbol_registry
+from backendapp.feed_supervisor import supervisor
+from backendapp.fixed_point import binance_scales
+from backendapp.journal import get_journal
+from backendapp.providers import BINANCE
 
 logger = logging.getLogger(__name__)
 
-# ✅ Convert Django ORM calls into async-safe functions
-@sync_to_async
-def save_bulk_binance_data(data_list):
-    """Bulk insert Binance data asynchronously while ignoring duplicates."""
+# ✅ Database access goes through the async market-data layer (backendapp.db)
+async def save_bulk_binance_data(data_list):
+    """Bulk insert Binance Candle records asynchronously while ignoring duplicates."""
     try:
-        Binance_Data.objects.bulk_create(data_list, ignore_conflicts=True)
+        await db.insert_candles(BINANCE.model_name, [candle.row() for candle in data_list])
         print(f"✅ Inserted {len(data_list)} historical records (if not duplicates)")
     except IntegrityError as e:
         logger.warning(f"⚠️ IntegrityError: {e}")
     except Exception as e:
         logger.exception(f"❌ Error saving historical Binance data: {e}")
 
-@sync_to_async
-def get_latest_binance_data(symbol):
+async def get_latest_binance_data(symbol):
     """Fetch the latest Binance data entry for a given symbol."""
-    return Binance_Data.objects.filter(symbol=symbol).values(
-        'symbol', 'timestamp', 'open_price', 'high_price', 'low_price', 'close_price', 'volume'
-    ).order_by('-timestamp').first()
+    return await db.latest_candle("Binance_Data", symbol)
 
 async def fetch_historical_data(client, symbol):
     """Fetch 10 years of historical Binance data in 5-minute intervals and store it."""
@@ -66,20 +65,10 @@ async def fetch_historical_data(client, symbol):
             print(f"⚠️ No historical data found for {symbol}, skipping.")
             return  
 
-        for kline in klines:
-            timestamp = datetime.fromtimestamp(kline[0] / 1000, tz=timezone.utc)  
-            historical_data.append(
-                Binance_Data(
-                    symbol=symbol,
-                    timestamp=timestamp,
-                    open_price=float(kline[1]),
-                    high_price=float(kline[2]),
-                    low_price=float(kline[3]),
-                    close_price=float(kline[4]),
-                    volume=float(kline[5]),
-                )
-            )
+        # Parsed once into fixed-point ints; written back out as exact decimal text.
+        historical_data.extend(BINANCE.candle(symbol, kline) for kline in klines)
 
+        metrics.backfill_rows.inc("binance", symbol.upper(), amount=len(klines))
         start_time = datetime.fromtimestamp(klines[-1][0] / 1000, tz=timezone.utc)
 
         if len(historical_data) >= 1000:
@@ -91,50 +80,53 @@ async def fetch_historical_data(client, symbol):
 
     print(f"✅ Completed fetching & storing data for {symbol}")
 
-async def listen_to_symbol(client, symbol):
-    """Listen to Binance WebSocket for live price updates."""
-    bm = BinanceSocketManager(client)
-    ts = bm.kline_socket(symbol=symbol, interval=AsyncClient.KLINE_INTERVAL_5MINUTE)
-
-    async with ts as stream:
-        while True:
-            try:
-                msg = await stream.recv()
-                kline = msg['k']
-                if kline['x']:  # Check if candle is closed
-                    binance_data = Binance_Data(
-                        symbol=symbol,
-                        timestamp=datetime.fromtimestamp(kline['t'] / 1000, tz=timezone.utc),
-                        open_price=float(kline['o']),
-                        high_price=float(kline['h']),
-                        low_price=float(kline['l']),
-                        close_price=float(kline['c']),
-                        volume=float(kline['v']),
-                    )
-                    print(binance_data)
-                    await save_bulk_binance_data([binance_data])
-                    print(f"📊 Live update for {symbol}: {binance_data.close_price}")
-            except exceptions.BinanceAPIException as e:
-                if e.code == -1121:
-                    logger.warning(f"⚠️ Invalid symbol in WebSocket: {symbol}. Skipping.")
-                    return  # Exit WebSocket for this symbol
-                else:
-                    logger.exception(f"❌ WebSocket error for {symbol}: {e}")
-            except Exception as e:
-                logger.exception(f"❌ Unexpected WebSocket error for {symbol}: {e}")
-                return  # Exit WebSocket for this symbol
+async def listen_to_symbol(symbol, feed):
+    """Save closed 5m candles from the kline stream; the feed supervisor reconnects and backfills."""
+    journal = get_journal("binance")
+    while True:
+        msg = await feed.recv()
+        metrics.messages_in.inc("binance", symbol.upper())
+        if journal:
+            journal.append(msg)
+        kline = msg['k']
+        if kline['x']:  # Check if candle is closed
+            candle = BINANCE.stream_candle(symbol, kline)
+            await save_bulk_binance_data([candle])
+            print(f"📊 Live update for {symbol}: {candle.row()[5]}")
+
+async def backfill_closed_candles(client, symbol, since_ms, until_ms):
+    """Save the 5m candles that closed while the stream was down."""
+    klines = await client.get_klines(
+        symbol=symbol, interval=AsyncClient.KLINE_INTERVAL_5MINUTE,
+        startTime=since_ms // 300_000 * 300_000, endTime=until_ms, limit=1000,
+    )
+    closed = [BINANCE.candle(symbol, kline) for kline in klines if kline[6] < until_ms]
+    metrics.backfill_rows.inc("binance", symbol.upper(), amount=len(closed))
+    if closed:
+        await save_bulk_binance_data(closed)
+
+def supervise_symbol(client, bm, symbol):
+    return supervisor.start(
+        "binance", symbol.upper(),
+        lambda: bm.kline_socket(symbol=symbol, interval=AsyncClient.KLINE_INTERVAL_5MINUTE),
+        lambda feed: listen_to_symbol(symbol, feed),
+        backfill=lambda since_ms, until_ms: backfill_closed_candles(client, symbol, since_ms, until_ms),
+    )
 
 async def start_binance_ws():
     """Fetch historical data, then start Binance WebSocket streaming."""
     try:
-        client = await AsyncClient.create()
+        client = await create_client()
+        await binance_scales.load(client)
+        symbols = symbol_registry.tradable(await symbol_registry.enabled("binance"))
 
         # ✅ Step 1: Fetch and store historical data before starting WebSocket
-        await asyncio.gather(*(fetch_historical_data(client, symbol) for symbol in CRYPTO_SYMBOLS))
+        await asyncio.gather(*(fetch_historical_data(client, symbol) for symbol in symbols))
 
-        # ✅ Step 2: Start real-time WebSocket data streaming
-        tasks = [listen_to_symbol(client, symbol) for symbol in CRYPTO_SYMBOLS]
-        await asyncio.gather(*tasks)
+        # ✅ Step 2: Start real-time WebSocket data streaming under the feed supervisor
+        bm = create_socket_manager(client)
+        streams = [supervise_symbol(client, bm, symbol) for symbol in symbols]
+        await asyncio.gather(*(stream.task for stream in streams))
 
     except Exception as e:
         logger.exception(f"❌ Error starting Binance WebSocket: {e}")
@@ -2,14 +2,26 @@ import json
 import asyncio
 import logging
 from datetime import datetime, timezone, timedelta
-from django.apps import apps
 from channels.generic.websocket import AsyncWebsocketConsumer
-from asgiref.sync import sync_to_async
-from binance import AsyncClient, BinanceSocketManager
-from backendapp.data_list import CRYPTO_SYMBOLS
+from django.conf import settings
+from backendapp.binance_client import create_client, create_socket_manager
+from backendapp.latency import latency_tracker, now_us
+from backendapp import metrics, db, symbols as symbol_registry
+from backendapp.journal import get_journal
+from backendapp.feed_supervisor import supervisor
+from backendapp.fixed_point import DEFAULT_DECIMALS, binance_scales
+from backendapp.providers import BINANCE
 
 logger = logging.getLogger(__name__)
 
+# Group the `manage.py ingest_binance` shard workers publish to.
+SHARDED_GROUP = "binance_updates"
+
+
+def sharded():
+    return getattr(settings, "BINANCE_INGEST", "direct") == "sharded"
+
+
 class BinanceConsumer(AsyncWebsocketConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -20,43 +32,57 @@ class BinanceConsumer(AsyncWebsocketConsumer):
         self.is_sending = False
         # Initialize tasks as empty list upon creation
         self.tasks = []
+        self.symbols = []
+        self.listeners = {}  # symbol -> supervised listen_to_symbol stream
         self.client = None
         self.bm = None
         self.sender_task = None
         self.history_task = None
         self.previous_data = {}
         self.latest_updates = {}
+        # Per-symbol (exchange_event, socket_receive, state_merge) stamps in microseconds
+        self.latest_stamps = {}
+        self.flush_interval = 1  # seconds between buffered sends
 
     async def connect(self):
         try:
             await self.accept()
+            metrics.track_consumer("binance", self)
             logger.info("WebSocket connection accepted")
             
             # Ping/pong heartbeat task to keep connection alive
             self.heartbeat_task = asyncio.create_task(self.send_heartbeat())
             self.tasks.append(self.heartbeat_task)
+
+            if sharded():
+                # Shard workers own the upstream sockets; just receive what they publish.
+                await self.channel_layer.group_add(SHARDED_GROUP, self.channel_name)
+                logger.info("Joined sharded Binance feed")
+                return
             
             # Initialize Binance client with additional timeout
-            self.client = await AsyncClient.create()
-            self.bm = BinanceSocketManager(self.client)
+            self.client = await create_client()
+            self.bm = create_socket_manager(self.client)
+            try:
+                # Tick/step sizes for fixed-point parsing; cached per process for BINANCE_METADATA_TTL.
+                await binance_scales.load(self.client)
+            except Exception as e:
+                logger.error(f"Could not load exchangeInfo, using {DEFAULT_DECIMALS} decimals for every symbol: {e}")
             
             # Start background tasks
             self.sender_task = asyncio.create_task(self.send_buffered_updates())
             self.tasks.append(self.sender_task)
             
-            # Create tasks for each symbol
-            for symbol in CRYPTO_SYMBOLS:
-                try:
-                    task = asyncio.create_task(self.listen_to_symbol(symbol))
-                    self.tasks.append(task)
-                    logger.info(f"Started listening to symbol: {symbol}")
-                except Exception as e:
-                    logger.exception("Error starting task for symbol %s: %s", symbol, e)
+            # Create tasks for each symbol; registry changes add and cancel them one at a time
+            self.symbols = symbol_registry.tradable(await symbol_registry.enabled("binance"))
+            for symbol in self.symbols:
+                self.start_listener(symbol)
+            symbol_registry.watcher.watch("binance", self.on_symbols)
             
             self.history_task = asyncio.create_task(self.fill_missing_data())
             self.tasks.append(self.history_task)
             
-            logger.info(f"Connection setup complete with {len(self.tasks)} active tasks")
+            logger.info(f"Connection setup complete with {len(self.tasks) + len(self.listeners)} active tasks")
             
         except Exception as e:
             logger.exception("Error during connection setup: %s", e)
@@ -64,9 +90,14 @@ class BinanceConsumer(AsyncWebsocketConsumer):
 
     async def disconnect(self, close_code):
         logger.info(f"WebSocket disconnecting with code: {close_code}")
+        metrics.untrack_consumer("binance", self)
         try:
+            if sharded():
+                await self.channel_layer.group_discard(SHARDED_GROUP, self.channel_name)
+            else:
+                symbol_registry.watcher.unwatch("binance", self.on_symbols)
             # Cancel all tasks
-            for task in self.tasks:
+            for task in self.tasks + [stream.task for stream in self.listeners.values()]:
                 if not task.done() and not task.cancelled():
                     task.cancel()
                     try:
@@ -111,103 +142,113 @@ class BinanceConsumer(AsyncWebsocketConsumer):
                 # Handle any client subscription requests
                 logger.info(f"Client subscription request: {data}")
 
-    async def listen_to_symbol(self, symbol):
-        """Listen to a specific symbol and process its data"""
-        retry_count = 0
-        max_retries = 5
-        retry_delay = 1
-        
-        while retry_count < max_retries:
-            try:
-                trade_socket = self.bm.trade_socket(symbol.lower())
-                kline_socket = self.bm.kline_socket(symbol.lower(), interval="1m")
-                
-                async with trade_socket as trade_ws, kline_socket as kline_ws:
-                    logger.info(f"Socket connections established for {symbol}")
-                    while True:
-                        try:
-                            trade_res, kline_res = await asyncio.gather(
-                                trade_ws.recv(),
-                                kline_ws.recv(),
-                                return_exceptions=True
-                            )
-                            
-                            # Handle exception cases
-                            if isinstance(trade_res, Exception):
-                                logger.error(f"Trade socket error for {symbol}: {trade_res}")
-                                raise trade_res
-                            if isinstance(kline_res, Exception):
-                                logger.error(f"Kline socket error for {symbol}: {kline_res}")
-                                raise kline_res
-                                
-                            # Process trade data
-                            trade_data = {
-                                "symbol": symbol.upper(),
-                                "timestamp": trade_res.get("T"),
-                            }
-                            
-                            # Process kline data
-                            kline = kline_res.get("k", {})
-                            kline_data = {
-                                "open": kline.get("o"),
-                                "high": kline.get("h"),
-                                "low": kline.get("l"),
-                                "close": kline.get("c"),
-                                "volume": kline.get("v"),
-                            }
-                            
-                            # Combine the data
-                            combined_data = {**trade_data, **kline_data}
+    def start_listener(self, symbol):
+        try:
+            stream = symbol.lower()
+            self.listeners[symbol] = supervisor.start(
+                "binance", symbol.upper(),
+                lambda: self.bm.multiplex_socket([f"{stream}@trade", f"{stream}@kline_1m"]),
+                lambda feed: self.listen_to_symbol(symbol, feed),
+                backfill=lambda since_ms, until_ms: self.backfill_window(symbol, since_ms, until_ms),
+            )
+            logger.info(f"Started listening to symbol: {symbol}")
+        except Exception as e:
+            logger.exception("Error starting task for symbol %s: %s", symbol, e)
 
-                            # Only update if data has changed
-                            if self.previous_data.get(symbol) != combined_data:
-                                self.previous_data[symbol] = combined_data
-                                self.latest_updates[symbol] = combined_data
-                                
-                        except asyncio.CancelledError:
-                            logger.info(f"Listen task for symbol {symbol} was cancelled")
-                            return
-                        except Exception as e:
-                            logger.exception(f"Error processing data for {symbol}: {e}")
-                            await asyncio.sleep(0.5)
-                            
-            except asyncio.CancelledError:
-                logger.info(f"Listen task for symbol {symbol} was cancelled during setup")
-                return
-            except Exception as e:
-                retry_count += 1
-                logger.error(f"Socket error for {symbol}, retry {retry_count}/{max_retries}: {e}")
-                
-                if retry_count >= max_retries:
-                    logger.error(f"Max retries reached for {symbol}, giving up")
-                    return
-                    
-                # Exponential backoff
-                await asyncio.sleep(retry_delay * (2 ** (retry_count - 1)))
+    async def on_symbols(self, added, removed):
+        """Registry delta: open or close just the affected symbols' sockets."""
+        for symbol in removed:
+            stream = self.listeners.pop(symbol, None)
+            if stream is not None:
+                stream.cancel()
+            self.previous_data.pop(symbol, None)
+        self.symbols = [symbol for symbol in self.symbols if symbol not in removed]
+        for symbol in added:
+            if symbol not in self.listeners:
+                self.symbols.append(symbol)
+                self.start_listener(symbol)
+
+    async def listen_to_symbol(self, symbol, feed):
+        """Apply one symbol's combined trade + 1m kline stream; the feed supervisor reconnects and backfills"""
+        journal = get_journal("binance")
+        last_kline = None
+        while True:
+            message = await feed.recv()
+            received_us = now_us()
+            data = message.get("data")
+            if not data:
+                continue
+            metrics.messages_in.inc("binance", symbol.upper())
+            if journal:
+                journal.append(data, received_us)
+            if data.get("e") == "kline":
+                last_kline = data
+                trade = {"s": symbol.upper(), "T": data.get("E")}
+            else:
+                trade = data
+            if last_kline is None:
+                continue
+            # Trade time and the open kline's OHLCV as fixed-point ints
+            tick = BINANCE.tick((trade, last_kline))
+            event_ts = tick.ts
+            self.apply_tick(
+                symbol, tick,
+                (event_ts * 1000 if event_ts else received_us, received_us),
+            )
+
+    async def backfill_window(self, symbol, since_ms, until_ms):
+        """Store the 5m candles a dropped stream missed"""
+        start = datetime.fromtimestamp(since_ms // 300_000 * 300, tz=timezone.utc)
+        await self.fetch_and_insert_klines(symbol, start, datetime.fromtimestamp(until_ms / 1000, tz=timezone.utc))
+
+    def apply_tick(self, symbol, tick, stamps=None):
+        """Buffer a Tick for the next flush if it changed; later ticks for a symbol replace earlier ones"""
+        # Change detection compares fixed-point ints; the message is only built when flushed.
+        key = tick.key()
+        if self.previous_data.get(symbol) == key:
+            return False
+        self.previous_data[symbol] = key
+        self.latest_updates[symbol] = tick
+        if stamps is not None:
+            self.latest_stamps[symbol] = stamps + (now_us(),)
+        return True
 
     async def send_buffered_updates(self):
         """Periodically send aggregated updates to the client"""
         try:
             while True:
-                await asyncio.sleep(1)  # Send updates every second
+                await asyncio.sleep(self.flush_interval)  # Send updates every second by default
                 
                 if not self.latest_updates:
                     continue
                 
-                updates_to_send = self.latest_updates.copy()
+                updates_to_send = {symbol: BINANCE.message(tick) for symbol, tick in self.latest_updates.items()}
+                stamps_to_send = self.latest_stamps
                 self.latest_updates = {}  # Clear the buffer before sending
+                self.latest_stamps = {}
+                flush_start_us = now_us()
                 
                 try:
                     self.is_sending = True
-                    await asyncio.wait_for(
+                    sent = await asyncio.wait_for(
                         self.send(text_data=json.dumps(updates_to_send)),
                         timeout=3
                     )
+                    if sent is False:
+                        self._count_dropped(updates_to_send)
+                        continue
+                    sent_us = now_us()
+                    for symbol, stamps in stamps_to_send.items():
+                        latency_tracker.record_path(symbol.upper(), stamps + (flush_start_us, sent_us))
+                    for symbol in updates_to_send:
+                        metrics.messages_out.inc("binance", symbol.upper())
                     logger.debug(f"Sent updates for {len(updates_to_send)} symbols")
                 except asyncio.TimeoutError:
                     logger.error("Send operation timed out")
+                    self._count_dropped(updates_to_send)
                 except Exception as e:
                     logger.error(f"Error sending updates: {e}")
+                    self._count_dropped(updates_to_send)
                 finally:
                     self.is_sending = False
                     
@@ -216,6 +257,20 @@ class BinanceConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             logger.exception(f"Fatal error in send_buffered_updates: {e}")
 
+    async def send_binance(self, event):
+        # Batched {symbol: update} frame from one shard worker, already serialized.
+        sent = await self.send(text_data=event["text"])
+        if sent is False:
+            self._count_dropped(event["symbols"])
+            return
+        for symbol in event["symbols"]:
+            metrics.messages_out.inc("binance", symbol.upper())
+
+    @staticmethod
+    def _count_dropped(updates):
+        for symbol in updates:
+            metrics.messages_dropped.inc("binance", symbol.upper())
+
     async def fill_missing_data(self):
         """Fill in missing historical data"""
         try:
@@ -223,7 +278,7 @@ class BinanceConsumer(AsyncWebsocketConsumer):
                 current_time = datetime.now(timezone.utc)
                 logger.info("Starting missing data check")
                 
-                for symbol in CRYPTO_SYMBOLS:
+                for symbol in list(self.symbols):
                     try:
                         latest_data = await get_latest_binance_data(symbol)
                         
@@ -271,69 +326,38 @@ class BinanceConsumer(AsyncWebsocketConsumer):
             )
             
             logger.info(f"Fetched {len(klines)} klines for {symbol}")
+            metrics.backfill_rows.inc("binance", symbol.upper(), amount=len(klines))
             
-            for kline in klines:
-                data = self.parse_kline(symbol, kline)
-                await insert_binance_data(data)
+            await insert_binance_data([BINANCE.candle(symbol, kline) for kline in klines])
                 
             logger.info(f"Inserted historical data for {symbol}")
             
         except Exception as e:
             logger.exception(f"Error fetching/inserting klines for {symbol}: {e}")
 
-    @staticmethod
-    def parse_kline(symbol, kline):
-        """Parse a kline into a structured data format"""
-        return {
-            "symbol": symbol.upper(),
-            "timestamp": datetime.fromtimestamp(kline[0] / 1000, tz=timezone.utc),
-            "open": kline[1],
-            "high": kline[2],
-            "low": kline[3],
-            "close": kline[4],
-            "volume": kline[5],
-        }
-
     async def send(self, *args, **kwargs):
         """Override send to add error handling"""
         try:
             return await super().send(*args, **kwargs)
         except Exception as e:
             logger.error(f"Error in send(): {e}. Dropping message.")
-            return
+            return False
 
 
-# --- Helper Functions for Django ORM Access ---
+# --- Helper Functions for Database Access ---
 
-@sync_to_async(thread_sensitive=True)
-def get_latest_binance_data(symbol):
+async def get_latest_binance_data(symbol):
     """Get the latest stored data for a symbol"""
     try:
-        Binance_Data = apps.get_model('backendapp', 'Binance_Data')  # Moved inside function
-        return (
-            Binance_Data.objects.filter(symbol=symbol.upper())
-            .values("symbol", "timestamp")
-            .order_by("-timestamp")
-            .first()
-        ) or None
+        return await db.latest_candle("Binance_Data", symbol.upper())
     except Exception as e:
         logger.exception(f"Database error getting latest data for {symbol}: {e}")
         return None
 
 
-@sync_to_async(thread_sensitive=True)
-def insert_binance_data(data):
-    """Insert new data record into the database"""
+async def insert_binance_data(candles):
+    """Insert Candle records into the database, skipping duplicates"""
     try:
-        Binance_Data = apps.get_model('backendapp', 'Binance_Data')  # Moved inside function
-        Binance_Data.objects.create(
-            symbol=data["symbol"],
-            timestamp=data["timestamp"],
-            open_price=data["open"],
-            high_price=data["high"],
-            low_price=data["low"],
-            close_price=data["close"],
-            volume=data["volume"],
-        )
+        await db.insert_candles(BINANCE.model_name, [candle.row() for candle in candles])
     except Exception as e:
         logger.exception(f"Database error inserting data: {e}")
@@ -1,22 +1,27 @@
-import json
-import asyncio
 import logging
 
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.exceptions import ChannelFull
-from binance import AsyncClient, BinanceSocketManager
-from backendapp.data_list import CRYPTO_SYMBOLS
+from django.conf import settings
+
+from backendapp import metrics
+from backendapp.ib_feed import IbFeed
+from backendapp.ib_stub import StubIB, get_gateway
+from backendapp.websockets.ibapi_ws import IBConnection
 
 logger = logging.getLogger(__name__)
 
+
+def create_ib_connection():
+    client_id = getattr(settings, "IB_FEED_CLIENT_ID", 50)
+    if getattr(settings, "IB_STUB", False):
+        return IBConnection(client_id=client_id, ib=StubIB(get_gateway()))
+    return IBConnection(client_id=client_id)
+
+
 class IbApiConsumer(AsyncWebsocketConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Override internal queues to use a larger limit.
-        self._channel_queue = asyncio.Queue(maxsize=1000)
-        self._queue = asyncio.Queue(maxsize=1000)
-        self._send_queue = asyncio.Queue(maxsize=1000)
-        self.is_sending = False
+        self.feed_acquired = False
 
     async def connect(self):
         try:
@@ -24,70 +29,30 @@ class IbApiConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             logger.exception("Error during connection accept: %s", e)
             return
-
-        # Reassign our custom queues after connection acceptance.
-        self._channel_queue = asyncio.Queue(maxsize=1000)
-        self._queue = asyncio.Queue(maxsize=1000)
-        self._send_queue = asyncio.Queue(maxsize=1000)
-
-        self.previous_data = {}
-        self.latest_updates = {}  # Buffer for aggregated updates
-
-        try:
-            self.client = await AsyncClient.create()
-            self.bm = BinanceSocketManager(self.client)
-        except Exception as e:
-            logger.exception("Error initializing Binance client/socket manager: %s", e)
-            await self.close()
-            return
-
-        # Start a background task to send buffered updates.
-        self.sender_task = asyncio.create_task(self.send_buffered_updates())
-
-        # Start a listening task for each symbol.
-        self.tasks = []
-        for symbol in CRYPTO_SYMBOLS:
-            try:
-                task = asyncio.create_task(self.listen_to_symbol(symbol))
-                self.tasks.append(task)
-            except Exception as e:
-                logger.exception("Error starting task for symbol %s: %s", symbol, e)
+        metrics.track_consumer("ibapi", self)
+        await self.channel_layer.group_add(ib_feed.group, self.channel_name)
+        # All clients share one IB connection that publishes to the group once.
+        await ib_feed.acquire()
+        self.feed_acquired = True
+        # Bring a late joiner up to date; group updates only carry what changed.
+        snapshot = ib_feed.snapshot_text()
+        if snapshot:
+            await self.send(text_data=snapshot)
+            for symbol in ib_feed.pipeline.snapshot:
+                metrics.messages_out.inc("ibapi", symbol)
 
     async def disconnect(self, close_code):
-        for task in self.tasks:
-            task.cancel()
-        self.sender_task.cancel()
-        try:
-            await self.client.close_connection()
-        except Exception as e:
-            logger.exception("Error closing Binance connection: %s", e)
+        metrics.untrack_consumer("ibapi", self)
+        await self.channel_layer.group_discard(ib_feed.group, self.channel_name)
+        if self.feed_acquired:
+            self.feed_acquired = False
+            await ib_feed.release()
 
-    async def send_buffered_updates(self):
-        """
-        Periodically send aggregated updates to the client.
-        We increase the interval to 1 second to throttle sending.
-        """
-        while True:
-            # Wait 1 second between sends.
-            await asyncio.sleep(1)
-            if not self.latest_updates:
-                continue
-
-            try:
-                self.is_sending = True
-                # Attempt to send the aggregated update with a timeout.
-                await asyncio.wait_for(
-                    self.send(text_data=json.dumps(self.latest_updates)),
-                    timeout=2
-                )
-                logger.info("Buffered updates sent successfully.")
-            except Exception as e:
-                # Catch any exception (including ChannelFull and the internal queue error)
-                logger.error("Error in send_buffered_updates (dropping updates): %s", e)
-            finally:
-                self.is_sending = False
-                # Clear the buffer regardless of send success.
-                self.latest_updates = {}
+    async def send_ibapi(self, event):
+        # Batched {symbol: update} frame from the shared feed, already serialized.
+        await self.send(text_data=event["text"])
+        for symbol in event["symbols"]:
+            metrics.messages_out.inc("ibapi", symbol)
 
     async def send(self, *args, **kwargs):
         """
@@ -101,3 +66,6 @@ class IbApiConsumer(AsyncWebsocketConsumer):
             logger.error("Error in send(): %s. Dropping message.", e)
             # We drop the message (return None) if sending fails.
             return
+
+
+ib_feed = IbFeed(create_ib_connection)
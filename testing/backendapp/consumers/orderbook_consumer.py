@@ -0,0 +1,82 @@
+import json
+import logging
+
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from backendapp import metrics
+from backendapp.order_book import OrderBookFeed, group_name
+from backendapp.symbols import SymbolRejected
+
+logger = logging.getLogger(__name__)
+
+# Local books are shared by every OrderBookConsumer in the process.
+order_book_feed = OrderBookFeed()
+
+
+class OrderBookConsumer(AsyncWebsocketConsumer):
+    """
+    Top-N order book levels for the symbols a client asks for:
+
+        {"type": "subscribe", "symbol": "BTCUSDT", "depth": 10}
+        {"type": "unsubscribe", "symbol": "BTCUSDT"}
+
+    Depth is rounded up to 5, 10 or 20 levels. The client gets the current book
+    right away, then at most one {symbol, lastUpdateId, E, bids, asks} frame
+    per ORDER_BOOK_PUSH_INTERVAL while its levels change.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.subscriptions = {}  # symbol -> tier
+
+    async def connect(self):
+        await self.accept()
+        metrics.track_consumer("orderbook", self)
+
+    async def disconnect(self, close_code):
+        metrics.untrack_consumer("orderbook", self)
+        for symbol in list(self.subscriptions):
+            await self.unsubscribe(symbol)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data or "")
+            kind = data.get("type")
+            symbol = str(data.get("symbol", "")).strip().upper()
+            if kind == "subscribe":
+                await self.subscribe(symbol, int(data.get("depth", 10)))
+            elif kind == "unsubscribe":
+                await self.unsubscribe(symbol)
+        except (ValueError, AttributeError, TypeError):
+            await self.send(text_data=json.dumps({"error": "Expected {\"type\": \"subscribe\", \"symbol\": ..., \"depth\": N}"}))
+
+    async def subscribe(self, symbol, depth):
+        # A new depth for a symbol replaces the old subscription.
+        await self.unsubscribe(symbol)
+        try:
+            symbol, depth = await order_book_feed.acquire(symbol, depth)
+        except SymbolRejected as e:
+            await self.send(text_data=json.dumps({"error": str(e), "symbol": symbol}))
+            return
+        except Exception as e:
+            logger.exception(f"Order book subscription to {symbol} failed: {e}")
+            await self.send(text_data=json.dumps({"error": f"Could not subscribe to {symbol}", "symbol": symbol}))
+            return
+        self.subscriptions[symbol] = depth
+        await self.channel_layer.group_add(group_name(symbol, depth), self.channel_name)
+        await self.send(text_data=json.dumps({"subscribed": symbol, "depth": depth}))
+        view = order_book_feed.view(symbol, depth)
+        if view:
+            await self.send(text_data=view)
+
+    async def unsubscribe(self, symbol):
+        depth = self.subscriptions.pop(symbol, None)
+        if depth is None:
+            return
+        await self.channel_layer.group_discard(group_name(symbol, depth), self.channel_name)
+        await order_book_feed.release(symbol, depth)
+
+    async def send_book(self, event):
+        # Serialized once per tier by the feed's publisher.
+        await self.send(text_data=event["text"])
+        metrics.messages_out.inc("orderbook", event["symbol"])
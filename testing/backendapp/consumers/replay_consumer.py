@@ -0,0 +1,87 @@
+import json
+import asyncio
+import logging
+import math
+from datetime import datetime, timezone, timedelta
+from urllib.parse import parse_qs
+
+from backendapp.consumers.binance_consumer import BinanceConsumer
+from backendapp.replay import REPLAY_SOURCES, replay_candles
+from backendapp import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_time(value, default):
+    if not value:
+        return default
+    if value.isdigit():
+        return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc)
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+class ReplayConsumer(BinanceConsumer):
+    """
+    Replays stored candles through the same buffering and send path as BinanceConsumer.
+
+    Query string: ?source=binance|history&from=<iso|ms>&to=<iso|ms>&speed=1|100|max&symbols=BTCUSDT,ETHUSDT
+    Flushes happen every virtual second (1/speed real seconds), so clients see
+    the same conflation they would see live.
+    """
+
+    async def connect(self):
+        params = {k: v[-1] for k, v in parse_qs(self.scope.get("query_string", b"").decode()).items()}
+        now = datetime.now(timezone.utc)
+        try:
+            self.replay_source = params.get("source", "binance")
+            if self.replay_source not in REPLAY_SOURCES:
+                raise ValueError(f"unknown source {self.replay_source}")
+            self.replay_end = _parse_time(params.get("to"), now)
+            self.replay_start = _parse_time(params.get("from"), self.replay_end - timedelta(days=1))
+            speed = params.get("speed", "100")
+            self.replay_speed = None if speed == "max" else float(speed)
+            if self.replay_speed is not None and not (math.isfinite(self.replay_speed) and self.replay_speed > 0):
+                raise ValueError(f"speed must be a positive number or max, got {speed}")
+            self.replay_symbols = [s.strip().upper() for s in params.get("symbols", "").split(",") if s.strip()]
+        except ValueError as e:
+            logger.error(f"Invalid replay parameters {params}: {e}")
+            # Accept first so the client gets the reason, not just a failed handshake.
+            await self.accept()
+            await self.send(text_data=json.dumps({"error": f"Invalid replay parameters: {e}"}))
+            await self.close(code=4400)
+            return
+
+        await self.accept()
+        metrics.track_consumer("replay", self)
+        # One virtual second per flush; at max speed flush as often as the client can take it.
+        self.flush_interval = 0.05 if self.replay_speed is None else max(0.01, 1 / self.replay_speed)
+
+        self.heartbeat_task = asyncio.create_task(self.send_heartbeat())
+        self.sender_task = asyncio.create_task(self.send_buffered_updates())
+        self.history_task = asyncio.create_task(self.run_replay())
+        self.tasks.extend([self.heartbeat_task, self.sender_task, self.history_task])
+        logger.info(
+            f"Replay of {self.replay_source} from {self.replay_start} to {self.replay_end} "
+            f"at {speed}x for {self.replay_symbols or 'all symbols'}"
+        )
+
+    async def disconnect(self, close_code):
+        metrics.untrack_consumer("replay", self)
+        await super().disconnect(close_code)
+
+    async def run_replay(self):
+        """Stream candles from the database onto the virtual clock"""
+        try:
+            count = await replay_candles(
+                self.replay_source, self.replay_symbols, self.replay_start, self.replay_end,
+                self.replay_speed, self.apply_tick,
+            )
+            # Give the sender one more flush before announcing completion.
+            await asyncio.sleep(self.flush_interval * 2)
+            await self.send(text_data=json.dumps({"replay_complete": True, "candles": count}))
+            logger.info(f"Replay finished after {count} candles")
+        except asyncio.CancelledError:
+            logger.info("Replay task cancelled")
+        except Exception as e:
+            logger.exception(f"Replay failed: {e}")
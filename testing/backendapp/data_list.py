@@ -91,7 +91,7 @@ FYERS_SYMBOLS = [
     'NSE:SAIL-EQ', 'NSE:NESTLEIND-EQ', 'NSE:PAGEIND-EQ', 'NSE:TATACHEM-EQ', 'NSE:SPANDANA-EQ',
     'NSE:OIL-EQ', 'NSE:BIOCON-EQ', 'NSE:GSFC-EQ', 'NSE:GICRE-EQ', 'NSE:ADANIPOWER-EQ',
     'NSE:GODREJCP-EQ', 'NSE:SYMPHONY-EQ', 'NSE:BANKBARODA-EQ', 'NSE:DRREDDY-EQ', 'NSE:CGPOWER-EQ',
-    'NSE:BANKINDIA-EQ', 'NSE:EMAMILTD-EQ', 'NSE:HDFCBANK-EQ', 'NSE:AKZOINDIA-EQ', 'NSE:POLYPLEX-EQ',
+    'NSE:BANKINDIA-EQ', 'NSE:EMAMILTD-EQ', 'NSE:AKZOINDIA-EQ', 'NSE:POLYPLEX-EQ',
     'NSE:TATASTEEL-EQ', 'NSE:VOLTAS-EQ', 'NSE:IDFC-EQ', 'NSE:CROMPTON-EQ', 'NSE:TORNTPOWER-EQ',
     'NSE:DIXON-EQ', 'NSE:ABFRL-EQ', 'NSE:IRCTC-EQ', 'NSE:LICHSGFIN-EQ', 'NSE:BALKRISIND-EQ',
     'NSE:COROMANDEL-EQ', 'NSE:RAMCOCEM-EQ', 'NSE:MRF-EQ', 'NSE:SUNPHARMA-EQ', 'NSE:HAPPSTMNDS-EQ',
@@ -99,10 +99,13 @@ FYERS_SYMBOLS = [
     'NSE:BRITANNIA-EQ', 'NSE:GLENMARK-EQ', 'NSE:CIPLA-EQ', 'NSE:BERGEPAINT-EQ', 'NSE:ATUL-EQ',
     'NSE:JUBLFOOD-EQ', 'NSE:GUJGASLTD-EQ', 'NSE:SRF-EQ', 'NSE:INDIAMART-EQ', 'NSE:BOSCHLTD-EQ',
     'NSE:ASHOKLEY-EQ', 'NSE:SCHAEFFLER-EQ', 'NSE:PNBHOUSING-EQ', 'NSE:MGL-EQ', 'NSE:COFORGE-EQ',
-    'NSE:DMART-EQ', 'NSE:TORNTPOWER-EQ', 'NSE:JINDALSTEL-EQ', 'NSE:JSWENERGY-EQ', 'NSE:CASTROLIND-EQ',
+    'NSE:DMART-EQ', 'NSE:JINDALSTEL-EQ', 'NSE:JSWENERGY-EQ', 'NSE:CASTROLIND-EQ',
     'NSE:ALKEM-EQ', 'NSE:AJANTPHARM-EQ', 'NSE:SIEMENS-EQ', 'NSE:JINDALSAW-EQ', 'NSE:ABB-EQ',
     'NSE:INDOCO-EQ', 'NSE:CANFINHOME-EQ', 'NSE:ENGINERSIN-EQ', 'NSE:OMAXE-EQ', 'NSE:CHOLAFIN-EQ',
     'NSE:ORIENTCEM-EQ', 'NSE:JKCEMENT-EQ', 'NSE:JPPOWER-EQ', 'NSE:RBLBANK-EQ', 'NSE:VGUARD-EQ',
     'NSE:KEC-EQ', 'NSE:TRIVENI-EQ', 'NSE:SUNDRMFAST-EQ', 'NSE:ARVIND-EQ', 'NSE:ICIL-EQ',
     'NSE:PGHL-EQ', 'NSE:VISHWARAJ-EQ'
 ]
+
+IB_SYMBOLS = ["AAPL", "MSFT", "GOOG"]
+
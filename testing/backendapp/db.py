@@ -0,0 +1,290 @@
+import asyncio
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, InterfaceError, OperationalError
+
+from backendapp import metrics
+from backendapp.partitions import ensure_partitions_async
+
+try:
+    from psycopg.conninfo import make_conninfo
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # pragma: no cover - falls back to the thread-pool backend
+    AsyncConnectionPool = None
+
+logger = logging.getLogger(__name__)
+
+# Async access layer for the market-data tables (Binance_Data, HistoryData,
+# IbApi_Data). On Postgres it talks to the database through a psycopg 3
+# AsyncConnectionPool so queries from different consumers overlap instead of
+# queueing behind sync_to_async(thread_sensitive=True). Elsewhere (SQLite for
+# local runs) it runs the ORM on a small dedicated thread pool.
+
+CANDLE_COLUMNS = ("symbol", "timestamp", "open_price", "high_price", "low_price", "close_price", "volume")
+
+# Batches at least this large are loaded with COPY into a staging table and
+# merged with INSERT ... SELECT ... ON CONFLICT DO NOTHING on Postgres.
+COPY_THRESHOLD = 200
+
+
+def candle_rows(instances):
+    """Turn unsaved candle model instances into column tuples."""
+    return [tuple(getattr(obj, column) for column in CANDLE_COLUMNS) for obj in instances]
+
+
+def _table(model_name):
+    return apps.get_model("backendapp", model_name)._meta.db_table
+
+
+def _source(model_name, source):
+    """The source tag to store, or None when the table has no source column."""
+    if source is None:
+        return None
+    if not source.isidentifier():
+        raise ValueError(f"Invalid source {source!r}")  # inlined into SQL as a literal
+    model = apps.get_model("backendapp", model_name)
+    return source if any(f.name == "source" for f in model._meta.concrete_fields) else None
+
+
+_DJANGO_ONLY_OPTIONS = {"isolation_level", "server_side_binding", "pool", "assume_role", "cursor_factory"}
+
+
+class PostgresBackend:
+    """psycopg 3 async pool, one per event loop (pools cannot be shared across loops)."""
+
+    def __init__(self, alias="default"):
+        db = settings.DATABASES[alias]
+        # OPTIONS carries libpq parameters (sslmode, options, ...) alongside a few
+        # keys only Django understands; pass the former so the pool connects like Django does.
+        options = {
+            key: value for key, value in (db.get("OPTIONS") or {}).items()
+            if key not in _DJANGO_ONLY_OPTIONS
+        }
+        self.conninfo = make_conninfo(
+            dbname=db.get("NAME") or "", user=db.get("USER") or None, password=db.get("PASSWORD") or None,
+            host=db.get("HOST") or None, port=str(db["PORT"]) if db.get("PORT") else None, **options,
+        )
+        self.min_size = getattr(settings, "MARKET_DB_POOL_MIN", 2)
+        self.max_size = getattr(settings, "MARKET_DB_POOL_MAX", 10)
+        self._pools = weakref.WeakKeyDictionary()
+
+    async def pool(self):
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None:
+            pool = AsyncConnectionPool(self.conninfo, min_size=self.min_size, max_size=self.max_size, open=False)
+            self._pools[loop] = pool
+            await pool.open()
+        return pool
+
+    async def latest_candle(self, model_name, symbol, source=None):
+        pool = await self.pool()
+        columns = ", ".join(f'"{c}"' for c in CANDLE_COLUMNS)
+        where, params = ('"symbol" = %s', (symbol,)) if source is None else ('"symbol" = %s AND "source" = %s', (symbol, source))
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                f'SELECT {columns} FROM "{_table(model_name)}" WHERE {where} ORDER BY "timestamp" DESC LIMIT 1',
+                params,
+            )
+            row = await cur.fetchone()
+        return dict(zip(CANDLE_COLUMNS, row)) if row else None
+
+    async def timestamps_between(self, model_name, symbol, start, end):
+        pool = await self.pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                f'SELECT "timestamp" FROM "{_table(model_name)}" WHERE "symbol" = %s AND "timestamp" >= %s AND "timestamp" < %s',
+                (symbol, start, end),
+            )
+            return [row[0] for row in await cur.fetchall()]
+
+    async def insert_candles(self, model_name, rows, source=None):
+        if len(rows) >= COPY_THRESHOLD:
+            return await self.copy_candles(model_name, rows, source)
+        pool = await self.pool()
+        table = _table(model_name)
+        columns = ", ".join(f'"{c}"' for c in CANDLE_COLUMNS)
+        placeholders = ", ".join(["%s"] * len(CANDLE_COLUMNS))
+        if source is not None:
+            columns += ', "source"'
+            placeholders += f", '{source}'"
+        async with pool.connection() as conn:
+            await ensure_partitions_async(conn, table, min(r[1] for r in rows), max(r[1] for r in rows))
+            async with conn.cursor() as cur:
+                # executemany runs in pipeline mode: one round trip per batch, not per row.
+                await cur.executemany(
+                    f'INSERT INTO "{table}" ({columns}) VALUES ({placeholders}) ON CONFLICT DO NOTHING',
+                    rows,
+                )
+
+    async def copy_candles(self, model_name, rows, source=None):
+        """Stream rows with COPY FROM STDIN into a temp staging table, then merge skipping duplicates."""
+        async def feed(copy):
+            for row in rows:
+                await copy.write_row(row)
+        await self._copy(model_name, min(r[1] for r in rows), max(r[1] for r in rows), feed, source)
+
+    async def copy_candle_text(self, model_name, data, start, end):
+        """Same as copy_candles for rows already encoded in COPY text format, timestamps within [start, end]."""
+        async def feed(copy):
+            await copy.write(data)
+        await self._copy(model_name, start, end, feed)
+
+    async def _copy(self, model_name, start, end, feed, source=None):
+        pool = await self.pool()
+        table = _table(model_name)
+        stage = f"_stage_{table.lower()}"
+        columns = ", ".join(f'"{c}"' for c in CANDLE_COLUMNS)
+        # The source tag is the same for the whole batch, so it is added in the merge rather than copied per row.
+        target, selected = (columns, columns) if source is None else (f'{columns}, "source"', f"{columns}, '{source}'")
+        async with pool.connection() as conn:
+            await ensure_partitions_async(conn, table, start, end)
+            async with conn.transaction():
+                await conn.execute(
+                    f'CREATE TEMP TABLE IF NOT EXISTS "{stage}" (LIKE "{table}" INCLUDING DEFAULTS) ON COMMIT DELETE ROWS'
+                )
+                async with conn.cursor() as cur:
+                    async with cur.copy(f'COPY "{stage}" ({columns}) FROM STDIN') as copy:
+                        await feed(copy)
+                    await cur.execute(
+                        f'INSERT INTO "{table}" ({target}) SELECT {selected} FROM "{stage}" ON CONFLICT DO NOTHING'
+                    )
+
+    async def close(self):
+        for pool in list(self._pools.values()):
+            await pool.close()
+        self._pools.clear()
+
+
+class ThreadPoolBackend:
+    """
+    Runs ORM calls on a dedicated pool of threads, each with its own Django
+    connection. Reads overlap; on SQLite writes are serialized with a lock
+    because the database only allows one writer at a time.
+    """
+
+    def __init__(self, alias="default"):
+        self.alias = alias
+        self._executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "MARKET_DB_POOL_MAX", 10), thread_name_prefix="market-db"
+        )
+        self._write_lock = threading.Lock() if connections[alias].vendor == "sqlite" else None
+
+    def _call(self, fn, *args):
+        try:
+            return fn(*args)
+        except (InterfaceError, OperationalError):
+            # Stale per-thread connection (e.g. the server restarted); reconnect once.
+            connections[self.alias].close()
+            return fn(*args)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, fn, *args)
+
+    async def latest_candle(self, model_name, symbol, source=None):
+        def query():
+            model = apps.get_model("backendapp", model_name)
+            rows = model.objects.using(self.alias).filter(symbol=symbol)
+            if source is not None:
+                rows = rows.filter(source=source)
+            return rows.values(*CANDLE_COLUMNS).order_by("-timestamp").first()
+        return await self._run(query)
+
+    async def timestamps_between(self, model_name, symbol, start, end):
+        def query():
+            model = apps.get_model("backendapp", model_name)
+            return list(
+                model.objects.using(self.alias)
+                .filter(symbol=symbol, timestamp__gte=start, timestamp__lt=end)
+                .values_list("timestamp", flat=True)
+            )
+        return await self._run(query)
+
+    async def insert_candles(self, model_name, rows, source=None):
+        def write():
+            model = apps.get_model("backendapp", model_name)
+            extra = {} if source is None else {"source": source}
+            objs = [model(**dict(zip(CANDLE_COLUMNS, row)), **extra) for row in rows]
+            if self._write_lock is None:
+                model.objects.using(self.alias).bulk_create(objs, ignore_conflicts=True)
+            else:
+                with self._write_lock:
+                    model.objects.using(self.alias).bulk_create(objs, ignore_conflicts=True)
+        await self._run(write)
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                engine = settings.DATABASES["default"]["ENGINE"]
+                if "postgresql" in engine and AsyncConnectionPool is not None:
+                    _backend = PostgresBackend()
+                else:
+                    if "postgresql" in engine:
+                        logger.warning("psycopg_pool not installed; using the thread-pool DB backend")
+                    _backend = ThreadPoolBackend()
+    return _backend
+
+
+async def latest_candle(model_name, symbol, source=None):
+    """
+    Latest stored candle for a symbol as a dict of CANDLE_COLUMNS, or None.
+    source limits it to one provider's candles in tables shared by several.
+    """
+    return await get_backend().latest_candle(model_name, symbol, _source(model_name, source))
+
+
+async def timestamps_between(model_name, symbol, start, end):
+    """Stored candle timestamps for a symbol in [start, end), served from the (symbol, timestamp) index."""
+    return await get_backend().timestamps_between(model_name, symbol, start, end)
+
+
+async def insert_candles(model_name, rows, source=None):
+    """
+    Insert (symbol, timestamp, open, high, low, close, volume) rows, skipping
+    duplicates. source (a provider name) is stored on tables with a source
+    column and ignored elsewhere.
+    """
+    if not rows:
+        return
+    with metrics.observe_db_write(_table(model_name), len(rows)):
+        await get_backend().insert_candles(model_name, rows, _source(model_name, source))
+
+
+def primary_key_columns(model_name, alias="default"):
+    """Physical primary key columns of a table; ["symbol", "timestamp"] for candle tables partitioned on Postgres."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, _table(model_name))
+    for constraint in constraints.values():
+        if constraint["primary_key"]:
+            return constraint["columns"]
+    return []
+
+
+def supports_copy_text():
+    """True when the backend can take pre-encoded COPY text (Postgres)."""
+    return hasattr(get_backend(), "copy_candle_text")
+
+
+async def copy_candle_text(model_name, data, row_count, start, end):
+    """
+    Load rows pre-encoded as tab-separated COPY text in CANDLE_COLUMNS order,
+    skipping duplicates. Only available when supports_copy_text() is True.
+    """
+    with metrics.observe_db_write(_table(model_name), row_count):
+        await get_backend().copy_candle_text(model_name, data, start, end)
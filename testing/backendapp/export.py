@@ -0,0 +1,199 @@
+import asyncio
+import csv
+import io
+import zlib
+from contextlib import aclosing
+
+from backendapp.db import CANDLE_COLUMNS
+from backendapp.replay import stream_candle_batches
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - CSV export still works without pyarrow
+    pa = None
+
+# Streaming export of stored candles. Rows come off a server-side cursor in
+# chunks, each chunk is encoded (and optionally gzipped) on a worker thread,
+# and the bytes are handed to StreamingHttpResponse straight away, so memory
+# stays flat and the first bytes go out long before the query is done.
+
+# Each row carries its source so candles from the shared HistoryData table
+# (Fyers and IB) stay distinguishable once exported.
+EXPORT_COLUMNS = (*CANDLE_COLUMNS, "source")
+
+
+class _Sink:
+    """Write-only file object that hands back whatever was written since the last drain()."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+class CsvEncoder:
+    content_type = "text/csv; charset=utf-8"
+    extension = "csv"
+    chunk_size = 5000
+
+    def start(self):
+        return (",".join(EXPORT_COLUMNS) + "\n").encode()
+
+    def encode(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerows((symbol, timestamp.isoformat(), *rest) for symbol, timestamp, *rest in rows)
+        return buffer.getvalue().encode()
+
+    def finish(self):
+        return b""
+
+
+class _ArrowEncoderBase:
+    chunk_size = 50_000
+
+    def __init__(self):
+        self.schema = pa.schema([
+            ("symbol", pa.string()),
+            ("timestamp", pa.timestamp("ms", tz="UTC")),
+            ("open_price", pa.decimal128(10, 2)),
+            ("high_price", pa.decimal128(10, 2)),
+            ("low_price", pa.decimal128(10, 2)),
+            ("close_price", pa.decimal128(10, 2)),
+            ("volume", pa.decimal128(30, 2)),
+            ("source", pa.string()),
+        ])
+        self.sink = _Sink()
+        self.writer = None
+
+    def batch(self, rows):
+        columns = list(zip(*rows))
+        return pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, self.schema)], schema=self.schema
+        )
+
+    def start(self):
+        return b""
+
+    def finish(self):
+        if self.writer is None:
+            self.writer = self.open_writer()
+        self.writer.close()
+        return self.sink.drain()
+
+
+class ArrowEncoder(_ArrowEncoderBase):
+    """Arrow IPC stream format: a schema message followed by one record batch per chunk."""
+    content_type = "application/vnd.apache.arrow.stream"
+    extension = "arrows"
+
+    def open_writer(self):
+        return pa.ipc.new_stream(self.sink, self.schema)
+
+    def start(self):
+        self.writer = self.open_writer()
+        return self.sink.drain()
+
+    def encode(self, rows):
+        self.writer.write_batch(self.batch(rows))
+        return self.sink.drain()
+
+
+class ParquetEncoder(_ArrowEncoderBase):
+    """Parquet with one zstd row group per chunk; the footer goes out last."""
+    content_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def open_writer(self):
+        return pq.ParquetWriter(self.sink, self.schema, compression="zstd")
+
+    def encode(self, rows):
+        if self.writer is None:
+            self.writer = self.open_writer()
+        self.writer.write_batch(self.batch(rows))
+        return self.sink.drain()
+
+
+ENCODERS = {"csv": CsvEncoder, "arrow": ArrowEncoder, "parquet": ParquetEncoder}
+
+
+def available_formats():
+    return sorted(ENCODERS) if pa is not None else ["csv"]
+
+
+def accepts_gzip(accept_encoding):
+    """True if an Accept-Encoding header allows gzip (q=0 means refused)."""
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+class _Gzip:
+    def __init__(self):
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+
+    def __call__(self, data):
+        # Sync flush per chunk so the client can decode what it has received so far.
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+async def stream_export(source, symbol, start, end, fmt="csv", gzip=False):
+    """Async iterator of encoded bytes for one symbol's candles in [start, end], oldest first."""
+    encoder = ENCODERS[fmt]()
+    compress = _Gzip() if gzip else None
+
+    def encode(step, *args):
+        data = step(*args)
+        return compress(data) if compress and data else data
+
+    data = encode(encoder.start)
+    if data:
+        yield data
+    # Rows come from a server-side cursor on a worker thread, one chunk at a time.
+    # aclosing() stops the reader thread as soon as the client goes away.
+    batches = stream_candle_batches(
+        source, [symbol], start, end, chunk_size=encoder.chunk_size, max_batches=2, with_source=True
+    )
+    async with aclosing(batches):
+        async for chunk in batches:
+            data = await asyncio.to_thread(encode, encoder.encode, chunk)
+            if data:
+                yield data
+    data = encode(encoder.finish)
+    if compress:
+        data += compress.finish()
+    if data:
+        yield data
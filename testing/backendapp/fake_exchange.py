@@ -0,0 +1,459 @@
+"""
+Local stand-in for the Binance spot API used for offline load tests and
+benchmarks. It serves the subset of endpoints this project touches:
+
+    GET /api/v3/ping, /api/v3/time, /api/v3/exchangeInfo, /api/v3/klines, /api/v3/depth
+    WS  /ws/<stream>                      e.g. btcusdt@trade, btcusdt@kline_1m, btcusdt@depth@100ms
+    WS  /stream?streams=<s1>/<s2>/...     combined payloads {"stream", "data"}
+
+Prices follow a seeded random walk so runs are reproducible. Tick rate,
+symbol count, added latency, forced disconnects and REST rate limiting
+are configurable through FakeExchangeConfig. Each symbol also has one
+order book that changes every 100ms; depth snapshots and diff events share
+its update IDs the way Binance's do, and depth_gap_every drops a diff now
+and then so clients have to detect the gap and resync.
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+import zlib
+from dataclasses import dataclass, field
+
+from aiohttp import web, WSMsgType
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000,
+}
+
+# Synthetic history starts here (2017-08-17, Binance's first kline).
+HISTORY_START_MS = 1502928000000
+
+
+@dataclass
+class FakeExchangeConfig:
+    symbols: list = field(default_factory=list)
+    tick_rate: float = 10.0          # events per second per stream
+    latency_ms: float = 0.0          # added before every REST response and WS frame batch
+    jitter_ms: float = 0.0           # uniform random extra latency
+    disconnect_every: float = 0.0    # seconds between forced WS disconnects (0 = never)
+    rate_limit_weight: int = 6000    # REST request weight allowed per minute (0 = unlimited)
+    seed: int = 42
+    depth_levels: int = 200          # initial price levels per side
+    depth_changes: int = 20          # level changes per 100ms depth event
+    depth_gap_every: float = 0.0     # seconds between deliberately dropped depth diffs (0 = never)
+
+
+def _symbol_seed(symbol, seed):
+    return zlib.crc32(symbol.encode()) ^ seed
+
+
+def _fmt(value):
+    return f"{value:.8f}"
+
+
+def _tick_size(price):
+    return 10 ** (len(str(int(price))) - 6) if price >= 1 else 1e-8
+
+
+DEPTH_STEP_MS = 100
+
+
+class SymbolState:
+    """Random-walk price state for one symbol."""
+
+    def __init__(self, symbol, seed):
+        self.symbol = symbol
+        self.rng = random.Random(_symbol_seed(symbol, seed))
+        self.price = self.rng.uniform(0.05, 50_000)
+        self.trade_id = 0
+        self.candles = {}  # interval -> [open_time, o, h, l, c, v, trades]
+
+    def next_trade(self, now_ms):
+        self.price = max(1e-8, self.price * (1 + self.rng.gauss(0, 0.0005)))
+        qty = round(self.rng.expovariate(1.0), 6)
+        self.trade_id += 1
+        for interval, candle in list(self.candles.items()):
+            self._roll_candle(interval, now_ms)
+            candle = self.candles[interval]
+            candle[2] = max(candle[2], self.price)
+            candle[3] = min(candle[3], self.price)
+            candle[4] = self.price
+            candle[5] += qty
+            candle[6] += 1
+        return self.price, qty
+
+    def _roll_candle(self, interval, now_ms):
+        step = INTERVAL_MS[interval]
+        open_time = now_ms - now_ms % step
+        candle = self.candles.get(interval)
+        if candle is None or candle[0] != open_time:
+            self.candles[interval] = [open_time, self.price, self.price, self.price, self.price, 0.0, 0]
+
+    def candle(self, interval, now_ms):
+        self._roll_candle(interval, now_ms)
+        return self.candles[interval]
+
+
+class DepthState:
+    """
+    One symbol's order book, kept as {price in ticks: qty}. advance() catches
+    up on the 100ms steps since the last call, each one a diff event with
+    consecutive update IDs; the recent events are kept for the streams.
+    """
+
+    def __init__(self, symbol, price, seed, levels=200, changes=20):
+        self.rng = random.Random(_symbol_seed(symbol, seed) ^ 0xD0)
+        self.symbol = symbol
+        self.tick = _tick_size(price)
+        self.mid = max(levels + 1, int(price / self.tick))
+        self.changes = changes
+        self.bids = {self.mid - i: round(self.rng.expovariate(1.0), 5) for i in range(1, levels + 1)}
+        self.asks = {self.mid + i: round(self.rng.expovariate(1.0), 5) for i in range(1, levels + 1)}
+        self.update_id = 1_000_000
+        self.events = []
+        self.stepped_ms = int(time.time() * 1000) // DEPTH_STEP_MS * DEPTH_STEP_MS
+
+    def _level(self, units, qty):
+        return [_fmt(units * self.tick), _fmt(qty)]
+
+    def advance(self, now_ms):
+        # At most 50 steps (5s) are generated after an idle stretch; update IDs stay consecutive.
+        steps = min((now_ms - self.stepped_ms) // DEPTH_STEP_MS, 50)
+        self.stepped_ms = now_ms // DEPTH_STEP_MS * DEPTH_STEP_MS
+        for _ in range(int(steps)):
+            self.events.append(self._step(now_ms))
+        del self.events[:-200]
+
+    def _step(self, now_ms):
+        rng = self.rng
+        self.mid = max(2, self.mid + rng.choice((-1, 0, 0, 1)))
+        bids, asks = {}, {}
+        # Levels the mid moved through are removed.
+        for units in [u for u in self.bids if u >= self.mid]:
+            del self.bids[units]
+            bids[units] = 0.0
+        for units in [u for u in self.asks if u <= self.mid]:
+            del self.asks[units]
+            asks[units] = 0.0
+        for _ in range(self.changes):
+            side, changed, sign = (self.bids, bids, -1) if rng.random() < 0.5 else (self.asks, asks, 1)
+            units = self.mid + sign * (1 + int(rng.expovariate(0.1)))
+            if units <= 0:
+                continue
+            qty = 0.0 if units in side and rng.random() < 0.3 else round(rng.expovariate(1.0), 5)
+            if qty:
+                side[units] = qty
+            else:
+                side.pop(units, None)
+            changed[units] = qty
+        first = self.update_id + 1
+        self.update_id += max(1, len(bids) + len(asks))
+        return {
+            "e": "depthUpdate", "E": now_ms, "s": self.symbol, "U": first, "u": self.update_id,
+            "b": [self._level(u, q) for u, q in bids.items()],
+            "a": [self._level(u, q) for u, q in asks.items()],
+        }
+
+    def snapshot(self, limit):
+        return {
+            "lastUpdateId": self.update_id,
+            "bids": [self._level(u, self.bids[u]) for u in sorted(self.bids, reverse=True)[:limit]],
+            "asks": [self._level(u, self.asks[u]) for u in sorted(self.asks)[:limit]],
+        }
+
+    def since(self, update_id):
+        """Events after update_id merged into one diff (U of the first, u of the last), or None."""
+        pending = [event for event in self.events if event["u"] > update_id]
+        if not pending:
+            return None
+        merged = dict(pending[-1], U=pending[0]["U"], b=[], a=[])
+        for event in pending:
+            merged["b"].extend(event["b"])
+            merged["a"].extend(event["a"])
+        return merged
+
+
+def historical_kline(symbol, interval, open_time, seed):
+    """Deterministic OHLCV row in the /api/v3/klines array layout."""
+    step = INTERVAL_MS[interval]
+    rng = random.Random(_symbol_seed(symbol, seed) ^ (open_time // step))
+    base = random.Random(_symbol_seed(symbol, seed)).uniform(0.05, 50_000)
+    drift = 1 + 0.3 * ((open_time // step) % 1000 - 500) / 500.0
+    open_price = base * drift * (1 + rng.gauss(0, 0.002))
+    close_price = open_price * (1 + rng.gauss(0, 0.002))
+    high = max(open_price, close_price) * (1 + abs(rng.gauss(0, 0.001)))
+    low = min(open_price, close_price) * (1 - abs(rng.gauss(0, 0.001)))
+    volume = rng.expovariate(1 / 100.0)
+    trades = rng.randint(1, 500)
+    return [
+        open_time, _fmt(open_price), _fmt(high), _fmt(low), _fmt(close_price), _fmt(volume),
+        open_time + step - 1, _fmt(volume * close_price), trades,
+        _fmt(volume / 2), _fmt(volume * close_price / 2), "0",
+    ]
+
+
+class FakeExchange:
+    def __init__(self, config=None):
+        self.config = config or FakeExchangeConfig()
+        self.symbols = {s.upper() for s in self.config.symbols}
+        self.state = {s: SymbolState(s, self.config.seed) for s in self.symbols}
+        self.depth = {}
+        self._weight_window = 0
+        self._weight_used = 0
+        self.sockets = set()
+
+    # --- helpers ---
+
+    async def _delay(self):
+        delay = self.config.latency_ms
+        if self.config.jitter_ms:
+            delay += random.uniform(0, self.config.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+    def _spend_weight(self, weight):
+        """
+        Return a 429 response when the per-minute request weight is exhausted,
+        else None. Compare with None: aiohttp responses are empty mappings, so
+        they are falsy.
+        """
+        limit = self.config.rate_limit_weight
+        window = int(time.time() // 60)
+        if window != self._weight_window:
+            self._weight_window, self._weight_used = window, 0
+        self._weight_used += weight
+        if limit and self._weight_used > limit:
+            retry_after = 60 - int(time.time() % 60)
+            return web.json_response(
+                {"code": -1003, "msg": "Too many requests; current limit is %d request weight per 1 MINUTE." % limit},
+                status=429, headers={"Retry-After": str(retry_after)},
+            )
+        return None
+
+    @staticmethod
+    def _error(code, msg, status=400):
+        return web.json_response({"code": code, "msg": msg}, status=status)
+
+    # --- REST ---
+
+    async def ping(self, request):
+        await self._delay()
+        limited = self._spend_weight(1)
+        return limited if limited is not None else web.json_response({})
+
+    async def server_time(self, request):
+        await self._delay()
+        limited = self._spend_weight(1)
+        return limited if limited is not None else web.json_response({"serverTime": int(time.time() * 1000)})
+
+    async def exchange_info(self, request):
+        await self._delay()
+        limited = self._spend_weight(20)
+        if limited is not None:
+            return limited
+        requested = request.query.get("symbol")
+        if requested is not None and requested.upper() not in self.symbols:
+            return self._error(-1121, "Invalid symbol.")
+        symbols = []
+        for symbol in sorted(self.symbols) if requested is None else [requested.upper()]:
+            tick = _tick_size(self.state[symbol].price)
+            symbols.append({
+                "symbol": symbol,
+                "status": "TRADING",
+                "baseAsset": symbol[:-4],
+                "quoteAsset": symbol[-4:],
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "minPrice": _fmt(tick), "maxPrice": "1000000.00000000", "tickSize": _fmt(tick)},
+                    {"filterType": "LOT_SIZE", "minQty": "0.00001000", "maxQty": "9000.00000000", "stepSize": "0.00001000"},
+                ],
+            })
+        return web.json_response({"timezone": "UTC", "serverTime": int(time.time() * 1000), "symbols": symbols})
+
+    async def klines(self, request):
+        await self._delay()
+        limited = self._spend_weight(2)
+        if limited is not None:
+            return limited
+        symbol = request.query.get("symbol", "").upper()
+        interval = request.query.get("interval", "1m")
+        if symbol not in self.symbols:
+            return self._error(-1121, "Invalid symbol.")
+        if interval not in INTERVAL_MS:
+            return self._error(-1120, "Invalid interval.")
+        step = INTERVAL_MS[interval]
+        limit = min(int(request.query.get("limit", 500)), 1000)
+        now_ms = int(time.time() * 1000)
+        end = min(int(request.query.get("endTime", now_ms)), now_ms)
+        if "startTime" in request.query:
+            start = max(int(request.query["startTime"]), HISTORY_START_MS)
+            start += -start % step
+        else:
+            start = end - end % step - (limit - 1) * step
+        rows = []
+        open_time = start
+        while open_time <= end and len(rows) < limit:
+            rows.append(historical_kline(symbol, interval, open_time, self.config.seed))
+            open_time += step
+        return web.json_response(rows)
+
+    def _depth(self, symbol):
+        depth = self.depth.get(symbol)
+        if depth is None:
+            depth = self.depth[symbol] = DepthState(
+                symbol, self.state[symbol].price, self.config.seed,
+                levels=self.config.depth_levels, changes=self.config.depth_changes,
+            )
+        depth.advance(int(time.time() * 1000))
+        return depth
+
+    async def order_book(self, request):
+        await self._delay()
+        limit = min(int(request.query.get("limit", 100)), 5000)
+        weight = 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+        limited = self._spend_weight(weight)
+        if limited is not None:
+            return limited
+        symbol = request.query.get("symbol", "").upper()
+        if symbol not in self.symbols:
+            return self._error(-1121, "Invalid symbol.")
+        return web.json_response(self._depth(symbol).snapshot(limit))
+
+    # --- WebSocket ---
+
+    def _parse_stream(self, stream):
+        symbol, _, kind = stream.partition("@")
+        symbol = symbol.upper()
+        if symbol not in self.symbols:
+            return None
+        if kind == "trade" or kind == "aggTrade":
+            return symbol, kind, None
+        if kind.startswith("kline_") and kind[6:] in INTERVAL_MS:
+            return symbol, "kline", kind[6:]
+        if kind in ("depth", "depth@1000ms", "depth@100ms"):
+            return symbol, "depth", 100 if kind == "depth@100ms" else 1000
+        return None
+
+    def _event(self, stream, parsed):
+        symbol, kind, interval = parsed
+        state = self.state[symbol]
+        now_ms = int(time.time() * 1000)
+        price, qty = state.next_trade(now_ms)
+        if kind == "trade":
+            return {"e": "trade", "E": now_ms, "s": symbol, "t": state.trade_id, "p": _fmt(price),
+                    "q": _fmt(qty), "T": now_ms, "m": state.rng.random() < 0.5, "M": True}
+        if kind == "aggTrade":
+            return {"e": "aggTrade", "E": now_ms, "s": symbol, "a": state.trade_id, "p": _fmt(price),
+                    "q": _fmt(qty), "f": state.trade_id, "l": state.trade_id, "T": now_ms,
+                    "m": state.rng.random() < 0.5, "M": True}
+        candle = state.candle(interval, now_ms)
+        step = INTERVAL_MS[interval]
+        # Mark the candle closed on the last tick before the next one opens.
+        closed = now_ms + 1000 / max(self.config.tick_rate, 0.001) >= candle[0] + step
+        return {"e": "kline", "E": now_ms, "s": symbol, "k": {
+            "t": candle[0], "T": candle[0] + step - 1, "s": symbol, "i": interval,
+            "f": state.trade_id - candle[6], "L": state.trade_id,
+            "o": _fmt(candle[1]), "c": _fmt(candle[4]), "h": _fmt(candle[2]), "l": _fmt(candle[3]),
+            "v": _fmt(candle[5]), "n": candle[6], "x": closed,
+            "q": _fmt(candle[5] * candle[4]), "V": "0", "Q": "0", "B": "0",
+        }}
+
+    async def _stream_to(self, ws, streams, combined):
+        parsed = {}
+        for stream in streams:
+            result = self._parse_stream(stream)
+            if result is None:
+                await ws.close(code=1008, message=b"Invalid symbol or stream")
+                return
+            parsed[stream] = result
+        interval = 1.0 / self.config.tick_rate if self.config.tick_rate > 0 else 1.0
+        depth_streams = {stream: result for stream, result in parsed.items() if result[1] == "depth"}
+        if depth_streams:
+            # Diff streams send on their own 100ms/1s cadence, from the book's current update ID on.
+            interval = min(interval, DEPTH_STEP_MS / 1000)
+            cursors = {stream: self._depth(result[0]).update_id for stream, result in depth_streams.items()}
+            last_sent = dict.fromkeys(depth_streams, 0.0)
+            last_gap = time.monotonic()
+        started = time.monotonic()
+        self.sockets.add(ws)
+        try:
+            while not ws.closed:
+                if self.config.disconnect_every and time.monotonic() - started >= self.config.disconnect_every:
+                    await ws.close(code=1001, message=b"Forced disconnect")
+                    break
+                await self._delay()
+                now = time.monotonic()
+                for stream, result in parsed.items():
+                    if result[1] != "depth":
+                        data = self._event(stream, result)
+                    elif (now - last_sent[stream]) * 1000 < result[2] - 5:
+                        continue
+                    else:
+                        data = self._depth(result[0]).since(cursors[stream])
+                        if data is None:
+                            continue
+                        cursors[stream] = data["u"]
+                        last_sent[stream] = now
+                        if self.config.depth_gap_every and now - last_gap >= self.config.depth_gap_every:
+                            last_gap = now
+                            continue  # dropped: the client sees a gap in update IDs
+                    payload = {"stream": stream, "data": data} if combined else data
+                    await ws.send_str(json.dumps(payload))
+                await asyncio.sleep(interval)
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            self.sockets.discard(ws)
+
+    async def _drain(self, ws):
+        async for msg in ws:
+            if msg.type in (WSMsgType.CLOSE, WSMsgType.ERROR):
+                break
+
+    async def _serve_ws(self, request, streams, combined):
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        reader = asyncio.create_task(self._drain(ws))
+        try:
+            await self._stream_to(ws, streams, combined)
+        finally:
+            reader.cancel()
+            if not ws.closed:
+                await ws.close()
+        return ws
+
+    async def raw_stream(self, request):
+        return await self._serve_ws(request, [request.match_info["stream"]], combined=False)
+
+    async def combined_stream(self, request):
+        streams = [s for s in request.query.get("streams", "").split("/") if s]
+        return await self._serve_ws(request, streams, combined=True)
+
+    def build_app(self):
+        app = web.Application()
+        app.add_routes([
+            web.get("/api/v3/ping", self.ping),
+            web.get("/api/v3/time", self.server_time),
+            web.get("/api/v3/exchangeInfo", self.exchange_info),
+            web.get("/api/v3/klines", self.klines),
+            web.get("/api/v3/depth", self.order_book),
+            web.get("/ws/{stream}", self.raw_stream),
+            web.get("/stream", self.combined_stream),
+        ])
+        return app
+
+
+async def start_fake_exchange(config, host="127.0.0.1", port=9900):
+    """Start the fake exchange on the running loop and return (exchange, runner)."""
+    exchange = FakeExchange(config)
+    runner = web.AppRunner(exchange.build_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info("Fake Binance exchange listening on http://%s:%s with %d symbols", host, port, len(exchange.symbols))
+    return exchange, runner
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from backendapp import metrics
+
+logger = logging.getLogger(__name__)
+
+# Every upstream Binance socket in the process runs under the supervisor,
+# and so do the shared Fyers and IB sessions. A stream is a connect()
+# factory, which returns an async context manager (a python-binance socket,
+# or the feed's own session), plus a handler coroutine that reads from
+# stream.recv() until something fails. Callback-driven sessions don't read:
+# their handler calls stream.mark_live() once connected and raises when the
+# session drops. When the socket errors out, the handler raises, or
+# the stream stays silent for dead_after seconds, the socket is reopened.
+# There is no retry cap. The delay is full-jitter exponential backoff, and
+# reconnects from all streams are paced to reconnect_rate per second, so a
+# network blip that drops every socket at once does not reconnect them all
+# in the same instant.
+#
+# Binance sockets don't replay what was missed, and python-binance also
+# reconnects silently on its own. So when the first event after a reconnect,
+# or any event more than gap_after seconds after the previous one, leaves a
+# hole, the stream's backfill(since_ms, until_ms) runs in the background to
+# fetch just that window over REST.
+#
+# Health, per stream:
+#   connecting  socket opening, no message yet
+#   live        messages arriving
+#   stale       no message for stale_after seconds; reconnected at dead_after
+#   backoff     waiting to reconnect
+#   stopped     cancelled by its owner, or its handler returned
+
+CONNECTING, LIVE, STALE, BACKOFF, STOPPED = "connecting", "live", "stale", "backoff", "stopped"
+STATES = (CONNECTING, LIVE, STALE, BACKOFF, STOPPED)
+CLOSE_TIMEOUT = 1.0
+
+recovery_seconds = metrics.registry.histogram(
+    "feed_recovery_seconds", "Time from an upstream stream failing to its first message after reconnecting.",
+    ("provider",), buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 300),
+)
+backfills = metrics.registry.counter(
+    "feed_backfills_total", "Missed windows fetched over REST after a reconnect or an event-time gap.",
+    ("provider", "symbol"),
+)
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Full jitter: uniform over [0, min(cap, base * 2**attempt)] for the attempt-th retry (from 0)."""
+    return random.uniform(0, min(cap, base * 2 ** min(attempt, 32)))
+
+
+def _event_ms(message):
+    data = message.get("data")
+    return message.get("E") or (data.get("E") if isinstance(data, dict) else None)
+
+
+class SupervisedStream:
+    def __init__(self, supervisor, provider, symbol, connect, handler, backfill=None):
+        self.supervisor = supervisor
+        self.provider = provider
+        self.symbol = symbol
+        self.connect = connect
+        self.handler = handler
+        self.backfill = backfill
+        self.state = CONNECTING
+        self.attempt = 0  # failures since the stream was last live
+        self.reconnects = 0
+        self.gaps = 0
+        self.ws = None
+        self.opened_at = None  # monotonic time the current socket opened
+        self.last_message = None  # monotonic time of the last message
+        self.last_event_ms = None  # exchange time of the last message
+        self.failed_at = None  # monotonic time of the failure being recovered from
+        self.resumed = False  # the next event follows a reconnect
+        self.task = None
+        self._backfills = set()
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def run(self):
+        try:
+            while True:
+                if self.attempt:
+                    self.state = BACKOFF
+                    await asyncio.sleep(backoff_delay(self.attempt - 1, self.supervisor.backoff_base, self.supervisor.backoff_cap))
+                    await self.supervisor.admit()
+                self.state = CONNECTING
+                socket = self.connect()
+                try:
+                    self.ws = await socket.__aenter__()
+                    self.opened_at = time.monotonic()
+                    metrics.upstream_sockets.inc(self.provider)
+                    try:
+                        await self.handler(self)
+                    finally:
+                        metrics.upstream_sockets.dec(self.provider)
+                        self.ws = None
+                        await self._close(socket)
+                    logger.info(f"{self.provider} {self.symbol} stream finished")
+                    return
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.attempt += 1
+                    self.reconnects += 1
+                    if self.failed_at is None:
+                        self.failed_at = time.monotonic()
+                    self.resumed = self.last_event_ms is not None
+                    logger.error(f"{self.provider} {self.symbol} stream failed (attempt {self.attempt}): {e}")
+                    metrics.upstream_reconnects.inc(self.provider, self.symbol)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.state = STOPPED
+            for task in self._backfills:
+                task.cancel()
+            self.supervisor.streams.discard(self)
+
+    async def _close(self, socket):
+        # python-binance's __aexit__ waits for its read loop, which may be
+        # sleeping through its own reconnect backoff; it is already told to
+        # exit, so don't hold the stream up waiting for it.
+        if not asyncio.current_task().cancelling():
+            self.state = BACKOFF
+        try:
+            await asyncio.wait_for(socket.__aexit__(None, None, None), CLOSE_TIMEOUT)
+        except (asyncio.TimeoutError, Exception) as e:
+            logger.debug(f"{self.provider} {self.symbol} socket close abandoned: {e!r}")
+
+    async def recv(self):
+        """Next message. Raises ConnectionError for error messages and after dead_after seconds of silence."""
+        supervisor = self.supervisor
+        while True:
+            try:
+                message = await asyncio.wait_for(self.ws.recv(), supervisor.stale_after)
+                break
+            except asyncio.TimeoutError:
+                silent = time.monotonic() - (self.last_message or self.opened_at)
+                if silent >= supervisor.dead_after:
+                    raise ConnectionError(f"no messages for {silent:.0f}s")
+                self.state = STALE
+        if message.get("e") == "error":
+            raise ConnectionError(f"{message.get('type')}: {message.get('m')}")
+        self.mark_live()
+        event_ms = _event_ms(message)
+        if event_ms:
+            previous, self.last_event_ms = self.last_event_ms, max(event_ms, self.last_event_ms or 0)
+            if previous is not None and (self.resumed or event_ms - previous >= supervisor.gap_after * 1000):
+                self._repair(previous, event_ms)
+            self.resumed = False
+        return message
+
+    def mark_live(self):
+        """Record a message, or a confirmed connection for sessions that don't go through recv()."""
+        now = time.monotonic()
+        self.last_message = now
+        if self.state != LIVE:
+            self.state = LIVE
+            self.attempt = 0
+            if self.failed_at is not None:
+                recovery_seconds.observe(self.provider, value=now - self.failed_at)
+                self.failed_at = None
+
+    def _repair(self, since_ms, until_ms):
+        self.gaps += 1
+        if self.backfill is None:
+            return
+        logger.info(f"Backfilling {self.provider} {self.symbol} for the {(until_ms - since_ms) / 1000:.1f}s missed")
+        backfills.inc(self.provider, self.symbol)
+        task = asyncio.create_task(self._run_backfill(since_ms, until_ms))
+        self._backfills.add(task)
+        task.add_done_callback(self._backfills.discard)
+
+    async def _run_backfill(self, since_ms, until_ms):
+        try:
+            await self.backfill(since_ms, until_ms)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.exception(f"Backfill of {self.provider} {self.symbol} failed: {e}")
+
+    def status(self):
+        now = time.monotonic()
+        return {
+            "provider": self.provider,
+            "symbol": self.symbol,
+            "state": self.state,
+            "attempt": self.attempt,
+            "reconnects": self.reconnects,
+            "gaps": self.gaps,
+            "silent_s": round(now - self.last_message, 3) if self.last_message else None,
+            "backfilling": len(self._backfills),
+        }
+
+
+class FeedSupervisor:
+    def __init__(self, reconnect_rate=None, stale_after=None, dead_after=None, gap_after=None,
+                 backoff_base=None, backoff_cap=None):
+        self.reconnect_rate = reconnect_rate or getattr(settings, "FEED_RECONNECT_RATE", 5.0)
+        self.stale_after = stale_after or getattr(settings, "FEED_STALE_SECONDS", 10.0)
+        self.dead_after = dead_after or getattr(settings, "FEED_DEAD_SECONDS", 60.0)
+        self.gap_after = gap_after or getattr(settings, "FEED_GAP_SECONDS", 5.0)
+        self.backoff_base = backoff_base or getattr(settings, "FEED_BACKOFF_BASE", 0.5)
+        self.backoff_cap = backoff_cap or getattr(settings, "FEED_BACKOFF_CAP", 30.0)
+        self.streams = set()
+        self._next_slot = 0.0
+
+    def start(self, provider, symbol, connect, handler, backfill=None):
+        """
+        Supervise a stream on the running loop. connect() -> socket context
+        manager; handler(stream) reads stream.recv() until it raises or
+        returns; backfill(since_ms, until_ms) fetches a missed window.
+        """
+        stream = SupervisedStream(self, provider, symbol, connect, handler, backfill)
+        self.streams.add(stream)
+        stream.task = asyncio.create_task(stream.run())
+        return stream
+
+    async def admit(self):
+        """Wait for a reconnect slot; slots are 1/reconnect_rate apart across every stream."""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.reconnect_rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def status(self):
+        streams = [stream.status() for stream in list(self.streams)]
+        counts = dict.fromkeys(STATES, 0)
+        for stream in streams:
+            counts[stream["state"]] += 1
+        return {"states": counts, "streams": streams}
+
+    def _state_counts(self):
+        counts = {}
+        for stream in list(self.streams):
+            key = (stream.provider, stream.state)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+
+supervisor = FeedSupervisor()
+
+metrics.registry.gauge(
+    "feed_streams", "Supervised upstream streams by health state.", ("provider", "state"),
+    callback=supervisor._state_counts,
+)
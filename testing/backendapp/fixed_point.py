@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Fixed-point prices and quantities. Binance sends decimals as strings; they
+# are parsed once at ingest into integers scaled by the symbol's tick size
+# (price) or step size (quantity), e.g. "43000.01000000" with a 0.01 tick ->
+# 4300001. Comparisons, change detection and candle aggregation then work on
+# ints, and values are only turned back into decimal text when a message or
+# a database row is written, without going through float or Decimal.
+
+# Binance never quotes more than 8 decimals, so this scale is always exact.
+DEFAULT_DECIMALS = 8
+
+# Unlisted symbols refetch exchangeInfo at most this often, in case they were just listed.
+UNLISTED_RECHECK = 60
+
+_last_dropped_warning = None
+
+
+def step_decimals(step):
+    """'0.01000000' -> 2, '1.00000000' -> 0"""
+    _, _, frac = step.partition(".")
+    return len(frac.rstrip("0"))
+
+
+def to_scaled(text, decimals):
+    """
+    '43000.01000000', 2 -> 4300001. Non-zero digits past `decimals` are
+    dropped with a warning: they mean the symbol's cached scale is stale.
+    """
+    whole, _, frac = text.partition(".")
+    if len(frac) > decimals and frac[decimals:].strip("0"):
+        _warn_dropped(text, decimals)
+    if not decimals:
+        return int(whole)
+    return int(whole + frac[:decimals].ljust(decimals, "0"))
+
+
+def _warn_dropped(text, decimals):
+    # At most one warning a minute: a stale scale affects every message of the symbol.
+    global _last_dropped_warning
+    now = time.monotonic()
+    if _last_dropped_warning is None or now - _last_dropped_warning >= 60:
+        _last_dropped_warning = now
+        logger.warning(f"Dropped digits of {text} past {decimals} decimals; the exchangeInfo scale may be stale")
+
+
+def format_scaled(value, decimals):
+    """4300001, 2 -> '43000.01'"""
+    if not decimals:
+        return str(value)
+    whole, frac = divmod(abs(value), 10 ** decimals)
+    return f"{'-' if value < 0 else ''}{whole}.{frac:0{decimals}d}"
+
+
+class SymbolScales:
+    """
+    (price decimals, quantity decimals) and trading status per symbol from
+    exchangeInfo's PRICE_FILTER tickSize, LOT_SIZE stepSize and status.
+    Unknown symbols get DEFAULT_DECIMALS for both. load() refetches once the
+    cache is older than `ttl` seconds (default settings.BINANCE_METADATA_TTL).
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self.scales = {}
+        self.statuses = {}
+        self.loaded_at = None
+        self._loading = None
+
+    def update(self, exchange_info):
+        for info in exchange_info.get("symbols", ()):
+            filters = {f["filterType"]: f for f in info.get("filters", ())}
+            price = filters.get("PRICE_FILTER", {}).get("tickSize")
+            qty = filters.get("LOT_SIZE", {}).get("stepSize")
+            self.scales[info["symbol"]] = (
+                step_decimals(price) if price else DEFAULT_DECIMALS,
+                step_decimals(qty) if qty else DEFAULT_DECIMALS,
+            )
+            self.statuses[info["symbol"]] = info.get("status")
+
+    def max_age(self):
+        return self.ttl if self.ttl is not None else getattr(settings, "BINANCE_METADATA_TTL", 3600)
+
+    def fresh(self, max_age=None):
+        """Whether the cache is younger than max_age seconds (default the ttl)."""
+        if max_age is None:
+            max_age = self.max_age()
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < max_age
+
+    async def load(self, client, max_age=None):
+        """Fetch exchangeInfo unless the cache is fresh; concurrent callers share the request."""
+        if self.fresh(max_age):
+            return
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(client.get_exchange_info())
+        loading = self._loading
+        try:
+            self.update(await asyncio.shield(loading))
+            self.loaded_at = time.monotonic()
+        finally:
+            if self._loading is loading:
+                self._loading = None
+
+    async def lookup(self, client, symbol):
+        """Status of one symbol, or None when Binance does not list it."""
+        max_age = self.max_age()
+        if symbol not in self.statuses:
+            max_age = min(max_age, UNLISTED_RECHECK)
+        await self.load(client, max_age)
+        return self.statuses.get(symbol)
+
+    def get(self, symbol):
+        return self.scales.get(symbol, (DEFAULT_DECIMALS, DEFAULT_DECIMALS))
+
+
+binance_scales = SymbolScales()
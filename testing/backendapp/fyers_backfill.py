@@ -0,0 +1,215 @@
+import asyncio
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+
+from backendapp import db, metrics
+from backendapp.providers import FYERS
+from backendapp.models import BackfillProgress
+
+logger = logging.getLogger(__name__)
+
+# Fyers history backfill. One authenticated FyersModel is shared by every
+# caller; history() calls run on a small bounded thread pool under a limiter
+# that enforces the Fyers per-second/per-minute/per-day quotas across all
+# symbols. Within a symbol, chunk N+1 is fetched while chunk N is being
+# written, and the completed-through timestamp is saved after each write so
+# an interrupted backfill resumes where it stopped.
+
+CHUNK_DAYS = 100  # longest range Fyers serves for intraday resolutions
+RESOLUTION = "5"
+MAX_RETRIES = 3
+
+
+class RateLimiter:
+    """
+    Sliding-window limiter over several windows at once, e.g. [(10, 1), (200, 60)].
+    Safe to share between threads and event loops.
+    """
+
+    def __init__(self, limits):
+        self.limits = [(count, window, collections.deque()) for count, window in limits]
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+
+    def _reserve(self):
+        now = time.monotonic()
+        wait = self._blocked_until - now
+        for count, window, stamps in self.limits:
+            while stamps and now - stamps[0] >= window:
+                stamps.popleft()
+            if len(stamps) >= count:
+                wait = max(wait, stamps[0] + window - now)
+        if wait <= 0:
+            for _, _, stamps in self.limits:
+                stamps.append(now)
+        return wait
+
+    async def acquire(self):
+        while True:
+            with self._lock:
+                wait = self._reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def penalize(self, seconds):
+        """Hold every caller for a while after the server reported a rate-limit hit."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+_limiter = None
+_executor = None
+_clients = {}
+_setup_lock = threading.Lock()
+
+
+def get_limiter():
+    global _limiter
+    with _setup_lock:
+        if _limiter is None:
+            _limiter = RateLimiter([
+                (getattr(settings, "FYERS_HISTORY_PER_SECOND", 10), 1.0),
+                (getattr(settings, "FYERS_HISTORY_PER_MINUTE", 200), 60.0),
+                (getattr(settings, "FYERS_HISTORY_PER_DAY", 100_000), 86400.0),
+            ])
+        return _limiter
+
+
+def get_executor():
+    global _executor
+    with _setup_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "FYERS_HISTORY_WORKERS", 4), thread_name_prefix="fyers-history"
+            )
+        return _executor
+
+
+def get_client(client_id, access_token):
+    """One FyersModel per credential pair for the whole process."""
+    from fyers_apiv3 import fyersModel
+
+    key = (client_id, access_token)
+    with _setup_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = fyersModel.FyersModel(client_id=client_id, is_async=False, token=access_token, log_path="")
+            _clients[key] = client
+        return client
+
+
+async def fetch_history(client, symbol, range_from, range_to):
+    """Rate-limited history() call on the shared executor. Returns the candle list."""
+    data = {
+        "symbol": symbol,
+        "resolution": RESOLUTION,
+        "date_format": "0",
+        "range_from": int(range_from.timestamp()),
+        "range_to": int(range_to.timestamp()),
+        "cont_flag": "1",
+    }
+    limiter = get_limiter()
+    loop = asyncio.get_running_loop()
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.acquire()
+        response = await loop.run_in_executor(get_executor(), client.history, data)
+        if "candles" in response:
+            return response["candles"]
+        if response.get("code") == 429 and attempt < MAX_RETRIES:
+            logger.warning(f"Fyers rate limit hit fetching {symbol}; backing off")
+            limiter.penalize(2 ** attempt)
+            continue
+        if response.get("s") == "no_data":
+            return []
+        raise RuntimeError(f"history() failed for {symbol}: {response}")
+    return []
+
+
+def candle_rows(symbol, candles):
+    return [
+        (symbol, datetime.fromtimestamp(c[0], tz=timezone.utc), c[1], c[2], c[3], c[4], int(c[5]))
+        for c in candles
+    ]
+
+
+async def resume_point(symbol, range_start):
+    """
+    Where a symbol's backfill over [range_start, ...] should pick up. Saved
+    progress is only trusted when it covers the requested start.
+    """
+    progress = await BackfillProgress.objects.filter(provider="fyers", symbol=symbol, resolution=RESOLUTION).afirst()
+    if progress and progress.range_start <= range_start:
+        return progress.range_start, progress.completed_through
+    return range_start, range_start
+
+
+async def save_progress(symbol, range_start, completed_through):
+    await BackfillProgress.objects.aupdate_or_create(
+        provider="fyers", symbol=symbol, resolution=RESOLUTION,
+        defaults={"range_start": range_start, "completed_through": completed_through},
+    )
+
+
+async def backfill_symbol(client, fyers_symbol, start, end, range_start=None):
+    """
+    Backfill one Fyers symbol (e.g. 'NSE:SBIN-EQ') over [start, end]. Progress
+    is recorded as range_start..completed chunk end. Returns rows written.
+    """
+    symbol = FYERS.storage_symbol(fyers_symbol)
+    range_start = range_start or start
+    written = 0
+    pending_write = None
+
+    async def write(candles, completed_through):
+        rows = candle_rows(symbol, candles)
+        if rows:
+            await db.insert_candles(FYERS.model_name, rows, source=FYERS.name)
+        await save_progress(symbol, range_start, completed_through)
+        return len(rows)
+
+    chunk_start = start
+    try:
+        while chunk_start < end:
+            chunk_end = min(chunk_start + timedelta(days=CHUNK_DAYS), end)
+            candles = await fetch_history(client, fyers_symbol, chunk_start, chunk_end)
+            metrics.backfill_rows.inc("fyers", symbol, amount=len(candles))
+            # Fetch the next chunk while this one is written; writes stay in order.
+            if pending_write:
+                written += await pending_write
+            pending_write = asyncio.create_task(write(candles, chunk_end))
+            chunk_start = chunk_end
+    finally:
+        if pending_write:
+            written += await pending_write
+    return written
+
+
+async def backfill(fyers_symbols, client_id, access_token, days=CHUNK_DAYS, end=None):
+    """Backfill many symbols concurrently under the shared limiter. Returns {symbol: rows written}."""
+    client = get_client(client_id, access_token)
+    end = end or datetime.now(timezone.utc)
+    default_start = end - timedelta(days=days)
+    # Enough symbols in flight to keep every executor thread busy while others write.
+    in_flight = asyncio.Semaphore(getattr(settings, "FYERS_HISTORY_WORKERS", 4) * 2)
+    results = {}
+
+    async def run(fyers_symbol):
+        async with in_flight:
+            symbol = FYERS.storage_symbol(fyers_symbol)
+            try:
+                range_start, start = await resume_point(symbol, default_start)
+                results[fyers_symbol] = await backfill_symbol(client, fyers_symbol, start, end, range_start)
+                print(f"✅ Backfilled {results[fyers_symbol]} records for {fyers_symbol}")
+            except Exception as e:
+                results[fyers_symbol] = 0
+                print(f"❌ Error fetching historical data for {fyers_symbol}: {str(e)}")
+
+    await asyncio.gather(*(run(s) for s in dict.fromkeys(fyers_symbols)))
+    return results
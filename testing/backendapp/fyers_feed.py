@@ -0,0 +1,187 @@
+import asyncio
+import contextlib
+import logging
+
+from django.conf import settings
+
+from backendapp import metrics, symbols as symbol_registry
+from backendapp.feed_supervisor import STALE, supervisor
+from backendapp.journal import get_journal
+from backendapp.providers import FYERS
+from backendapp.tick_pipeline import TickPipeline
+
+logger = logging.getLogger(__name__)
+
+# One Fyers market-data session per process, shared by every FyersConsumer.
+# The first consumer to acquire() opens the upstream socket and starts the
+# tick pipeline, which publishes each update to the "fyers_updates" group
+# once; the last release() tears both down. Consumers themselves only join
+# and leave the group. Symbols come from the registry unless given, and
+# registry changes are applied to the open socket as subscribe/unsubscribe
+# calls. The socket runs under the feed supervisor: a failed connect, or a
+# socket that stays closed for dead_after seconds after the SDK's own
+# reconnects give up, is reopened with the supervisor's backoff.
+
+
+class FyersFeed:
+    def __init__(self, socket_factory, symbols=None, backfill=None, group="fyers_updates"):
+        # socket_factory(on_connect, on_error, on_message) -> an unconnected FyersDataSocket (or a stand-in)
+        self.socket_factory = socket_factory
+        # None: follow the symbol registry
+        self.fixed_symbols = symbols
+        self.symbols = list(symbols or ())
+        self.backfill = backfill
+        self.group = group
+        self.refs = 0
+        self.socket = None
+        self.pipeline = None
+        self.pipeline_task = None
+        self.stream = None  # the supervised socket
+        self._lock = None
+
+    def _get_lock(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def acquire(self):
+        async with self._get_lock():
+            self.refs += 1
+            if self.refs == 1:
+                await self._start()
+
+    async def release(self):
+        async with self._get_lock():
+            if self.refs == 0:
+                return
+            self.refs -= 1
+            if self.refs == 0:
+                await self._stop()
+
+    async def _start(self):
+        self.pipeline = TickPipeline(
+            FYERS, self.group, "send.fyers", backfill=self.backfill,
+            queue_size=getattr(settings, "FYERS_TICK_QUEUE_SIZE", 100_000),
+            broadcast_interval=getattr(settings, "FYERS_BROADCAST_INTERVAL", 0.25),
+            persist_interval=getattr(settings, "FYERS_PERSIST_INTERVAL", 2.0),
+        )
+        self.pipeline_task = asyncio.create_task(self.pipeline.run())
+        metrics.track_queue("fyers", "tick_queue", self.pipeline.queue)
+        if self.fixed_symbols is None:
+            self.symbols = await symbol_registry.enabled("fyers")
+            symbol_registry.watcher.watch("fyers", self.on_symbols)
+        self.stream = supervisor.start("fyers", "feed", self._session, self._run_session)
+        logger.info("Shared Fyers feed started")
+
+    async def _stop(self):
+        if self.fixed_symbols is None:
+            symbol_registry.watcher.unwatch("fyers", self.on_symbols)
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            stream.cancel()
+            await asyncio.gather(stream.task, return_exceptions=True)
+        metrics.untrack_queue("fyers", "tick_queue")
+        if self.pipeline_task:
+            self.pipeline_task.cancel()
+            await self.pipeline.stop()
+        self.pipeline = self.pipeline_task = None
+        logger.info("Shared Fyers feed stopped")
+
+    @contextlib.asynccontextmanager
+    async def _session(self):
+        """One open socket; entered and left by the supervisor."""
+        loop = asyncio.get_running_loop()
+        socket = self.socket = self.socket_factory(self.on_open, self.on_error, self.on_message)
+        try:
+            # connect() does the handshake synchronously and reports failures
+            # to on_error instead of raising; keep it off the event loop.
+            await loop.run_in_executor(None, socket.connect)
+            if not self._connected(socket):
+                raise ConnectionError("Fyers socket did not connect")
+            yield socket
+        finally:
+            self.socket = None
+            try:
+                await loop.run_in_executor(None, self._close, socket)
+                logger.info("Fyers socket closed")
+            except Exception as e:
+                logger.error(f"Error closing the Fyers socket: {e}")
+
+    async def _run_session(self, stream):
+        """Watch the socket; raise once it has been closed for dead_after seconds."""
+        stream.mark_live()
+        logger.info("Fyers socket connected")
+        down_since = None
+        while True:
+            await asyncio.sleep(supervisor.stale_after)
+            if self._connected(stream.ws):
+                if down_since is not None:
+                    down_since = None
+                    stream.mark_live()
+                continue
+            now = asyncio.get_running_loop().time()
+            if down_since is None:
+                down_since = now
+                stream.state = STALE
+            if now - down_since >= supervisor.dead_after:
+                raise ConnectionError(f"Fyers socket closed for {now - down_since:.0f}s")
+
+    @staticmethod
+    def _connected(socket):
+        # Stand-in sockets without is_connected() count as connected.
+        is_connected = getattr(socket, "is_connected", None)
+        return is_connected() if callable(is_connected) else True
+
+    @staticmethod
+    def _close(socket):
+        for name in ("close_connection", "stop", "close"):
+            close = getattr(socket, name, None)
+            if callable(close):
+                close()
+                return
+
+    async def on_symbols(self, added, removed):
+        """Registry delta: change the open socket's subscriptions without reconnecting."""
+        added = [symbol for symbol in added if symbol not in self.symbols]
+        removed = [symbol for symbol in removed if symbol in self.symbols]
+        self.symbols = [symbol for symbol in self.symbols if symbol not in removed] + added
+        if self.pipeline:
+            for symbol in removed:
+                self.pipeline.snapshot.pop(symbol, None)
+        socket = self.socket
+        if socket is None:
+            return
+        loop = asyncio.get_running_loop()
+        if added:
+            await loop.run_in_executor(None, lambda: socket.subscribe(symbols=added, data_type="SymbolUpdate"))
+        if removed:
+            await loop.run_in_executor(None, lambda: socket.unsubscribe(symbols=removed, data_type="SymbolUpdate"))
+
+    # The callbacks below run in the Fyers SDK thread.
+
+    def on_open(self):
+        """Handle WebSocket connection opening for Fyers."""
+        try:
+            if self.symbols:
+                self.socket.subscribe(symbols=self.symbols, data_type="SymbolUpdate")
+        except Exception as e:
+            logger.error(f"Error subscribing Fyers symbols: {e}")
+
+    def on_error(self, error):
+        """Handle WebSocket errors for Fyers."""
+        logger.error(f"Fyers socket error: {error}")
+
+    def on_message(self, message):
+        """Handle incoming messages from Fyers WebSocket (must stay cheap)."""
+        journal = get_journal("fyers")
+        if journal:
+            journal.append(message)
+        # Ignore messages that are empty or missing a valid symbol.
+        if not message or message.get("symbol") is None:
+            return
+        pipeline = self.pipeline
+        if pipeline is None:
+            return
+        metrics.messages_in.inc("fyers", message["symbol"])
+        # Bucketing, persistence and the broadcast happen on the event loop.
+        pipeline.submit(message)
@@ -0,0 +1,192 @@
+import asyncio
+import contextlib
+import logging
+
+from django.conf import settings
+
+from backendapp import metrics, symbols as symbol_registry
+from backendapp.feed_supervisor import supervisor
+from backendapp.providers import IB
+from backendapp.tick_pipeline import TickPipeline
+
+logger = logging.getLogger(__name__)
+
+# One IB market-data connection per process, shared by every IbApiConsumer.
+# The first consumer to acquire() connects, subscribes 5-second real-time
+# bars and top-of-book market data for each symbol and starts a
+# TickPipeline; the last release() cancels everything and disconnects.
+# ib_insync delivers bar and ticker events on the event loop itself, and the
+# handlers just submit them to the pipeline, which conflates them, publishes
+# the changed symbols as one {symbol: update} group message per interval,
+# builds 5m candles and keeps the snapshot sent to clients as they connect.
+# Symbols come from the registry unless given; registry changes subscribe or
+# cancel just those contracts on the open connection. The connection runs
+# under the feed supervisor: a failed connect or a gateway disconnect is
+# retried with its backoff, resubscribing every symbol.
+
+
+class IbFeed:
+    def __init__(self, connection_factory, symbols=None, group="ibapi_updates"):
+        # connection_factory() -> an unconnected IBConnection (its ib may be a StubIB)
+        self.connection_factory = connection_factory
+        # None: follow the symbol registry
+        self.fixed_symbols = symbols
+        self.symbols = list(symbols or ())
+        self.group = group
+        self.refs = 0
+        self.connection = None
+        self.streams = {}  # symbol -> (contract, real-time bar list)
+        self.pipeline = None
+        self.pipeline_task = None
+        self.stream = None  # the supervised connection
+        self._lock = None
+
+    def _get_lock(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def acquire(self):
+        async with self._get_lock():
+            self.refs += 1
+            if self.refs == 1:
+                await self._start()
+
+    async def release(self):
+        async with self._get_lock():
+            if self.refs == 0:
+                return
+            self.refs -= 1
+            if self.refs == 0:
+                await self._stop()
+
+    def snapshot_text(self):
+        """Every symbol's last update as one frame, or None before the first one."""
+        return self.pipeline.snapshot_text() if self.pipeline else None
+
+    async def _start(self):
+        self.pipeline = TickPipeline(
+            IB, self.group, "send.ibapi", broadcast_interval=getattr(settings, "IB_BROADCAST_INTERVAL", 0.25)
+        )
+        if self.fixed_symbols is None:
+            self.symbols = await symbol_registry.enabled("ib")
+            symbol_registry.watcher.watch("ib", self.on_symbols)
+        self.pipeline_task = asyncio.create_task(self.pipeline.run())
+        metrics.track_queue("ibapi", "tick_queue", self.pipeline.queue)
+        self.stream = supervisor.start("ibapi", "feed", self._session, self._run_session)
+        logger.info("Shared IB feed started")
+
+    async def _stop(self):
+        if self.fixed_symbols is None:
+            symbol_registry.watcher.unwatch("ib", self.on_symbols)
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            stream.cancel()
+            await asyncio.gather(stream.task, return_exceptions=True)
+        metrics.untrack_queue("ibapi", "tick_queue")
+        if self.pipeline_task:
+            self.pipeline_task.cancel()
+            await self.pipeline.stop()
+        self.pipeline = self.pipeline_task = None
+        logger.info("Shared IB feed stopped")
+
+    @contextlib.asynccontextmanager
+    async def _session(self):
+        """One connection with every symbol subscribed; entered and left by the supervisor."""
+        connection = self.connection_factory()
+        try:
+            await connection.connect(
+                getattr(settings, "IB_HOST", "127.0.0.1"), getattr(settings, "IB_PORT", 7496)
+            )
+            await self._subscribe(connection, self.symbols)
+            connection.ib.pendingTickersEvent += self.on_tickers
+        except BaseException:
+            self._cancel(connection, list(self.streams))
+            await connection.disconnect()
+            raise
+        self.connection = connection
+        try:
+            yield connection
+        finally:
+            self.connection = None
+            try:
+                connection.ib.pendingTickersEvent -= self.on_tickers
+                self._cancel(connection, list(self.streams))
+                await connection.disconnect()
+                logger.info("IB feed disconnected")
+            except Exception as e:
+                logger.error(f"Error during IB disconnection: {e}")
+            self.streams = {}
+
+    async def _run_session(self, stream):
+        """Wait for the gateway to drop the connection, then raise so the supervisor reconnects."""
+        ib = stream.ws.ib
+        dropped = asyncio.get_running_loop().create_future()
+
+        def on_disconnected():
+            if not dropped.done():
+                dropped.set_result(None)
+
+        ib.disconnectedEvent += on_disconnected
+        try:
+            if ib.isConnected():
+                stream.mark_live()
+                logger.info("IB feed connected")
+                await dropped
+        finally:
+            ib.disconnectedEvent -= on_disconnected
+        raise ConnectionError("IB gateway connection lost")
+
+    async def _subscribe(self, connection, symbols):
+        ib = connection.ib
+        contracts = [connection.get_stock_contract(symbol) for symbol in symbols if symbol not in self.streams]
+        if not contracts:
+            return
+        await ib.qualifyContractsAsync(*contracts)
+        for contract in contracts:
+            bars = ib.reqRealTimeBars(contract, 5, "TRADES", False)
+            bars.updateEvent += self.on_bar
+            ib.reqMktData(contract, "", False, False)
+            self.streams[contract.symbol] = (contract, bars)
+
+    def _cancel(self, connection, symbols):
+        ib = connection.ib
+        # After a disconnect the gateway has dropped the subscriptions already.
+        connected = ib.isConnected()
+        for symbol in symbols:
+            stream = self.streams.pop(symbol, None)
+            if stream is None:
+                continue
+            contract, bars = stream
+            bars.updateEvent -= self.on_bar
+            if connected:
+                ib.cancelRealTimeBars(bars)
+                ib.cancelMktData(contract)
+
+    async def on_symbols(self, added, removed):
+        """Registry delta: subscribe or cancel just those contracts on the open connection."""
+        added = [symbol for symbol in added if symbol not in self.symbols]
+        removed = [symbol for symbol in removed if symbol in self.symbols]
+        self.symbols = [symbol for symbol in self.symbols if symbol not in removed] + added
+        if self.pipeline:
+            for symbol in removed:
+                self.pipeline.snapshot.pop(symbol, None)
+        connection = self.connection
+        if connection is None:
+            return
+        self._cancel(connection, removed)
+        await self._subscribe(connection, added)
+
+    # The handlers below run on the event loop, called by ib_insync.
+
+    def on_bar(self, bars, has_new_bar):
+        if has_new_bar and bars and self.pipeline:
+            metrics.messages_in.inc("ibapi", bars.contract.symbol)
+            self.pipeline.submit(bars)
+
+    def on_tickers(self, tickers):
+        if self.pipeline is None:
+            return
+        for ticker in tickers:
+            metrics.messages_in.inc("ibapi", ticker.contract.symbol)
+            self.pipeline.submit(ticker)
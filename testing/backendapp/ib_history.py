@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from ib_insync import RequestError
+
+from backendapp import db, metrics
+from backendapp.fyers_backfill import RateLimiter
+from backendapp.models import BackfillProgress
+from backendapp.providers import IB
+from backendapp.websockets.ibapi_ws import IBConnection
+
+logger = logging.getLogger(__name__)
+
+# IB historical-data backfill. Every request goes through a model of IB's
+# pacing rules (no identical request within 15 s, at most 6 requests for one
+# contract/exchange/tick type in 2 s, at most 60 in any 10 minutes) shared by
+# the whole process, and symbols are spread over a small pool of
+# IBConnections with their own client IDs, one symbol per connection at a
+# time. Ranges are split into the longest durationStr IB serves for the bar
+# size and walked oldest first; progress is saved after each chunk IB
+# actually answered, so a symbol put back on the queue after a pacing
+# violation or a timed-out request (or a restarted run) resumes from the last
+# chunk written.
+
+MAX_REQUEUES = 3
+REQUEST_TIMEOUT = 60
+
+# Longest span and durationStr IB accepts per bar size.
+MAX_DURATION = {
+    "1 secs": (timedelta(seconds=1800), "1800 S"),
+    "5 secs": (timedelta(seconds=3600), "3600 S"),
+    "10 secs": (timedelta(hours=4), "14400 S"),
+    "15 secs": (timedelta(hours=4), "14400 S"),
+    "30 secs": (timedelta(hours=8), "28800 S"),
+    "1 min": (timedelta(days=1), "1 D"),
+    "2 mins": (timedelta(days=2), "2 D"),
+    "3 mins": (timedelta(weeks=1), "1 W"),
+    "5 mins": (timedelta(weeks=1), "1 W"),
+    "15 mins": (timedelta(weeks=2), "2 W"),
+    "30 mins": (timedelta(days=30), "1 M"),
+    "1 hour": (timedelta(days=30), "1 M"),
+    "1 day": (timedelta(days=365), "1 Y"),
+}
+
+
+class RetryableRequest(Exception):
+    """A request worth repeating later; carries the rows written for the symbol before it."""
+    reason = "retryable failure"
+
+    def __init__(self, symbol, written=0):
+        super().__init__(f"{self.reason} for {symbol}")
+        self.symbol = symbol
+        self.written = written
+
+
+class PacingViolation(RetryableRequest):
+    """IB rejected a request for pacing."""
+    reason = "pacing violation"
+
+
+class RequestTimedOut(RetryableRequest):
+    """IB did not answer within REQUEST_TIMEOUT."""
+    reason = "request timeout"
+
+
+def duration_str(span):
+    """durationStr covering a span shorter than the bar size's maximum."""
+    seconds = math.ceil(span.total_seconds())
+    if seconds <= 86400:
+        return f"{seconds} S"
+    return f"{math.ceil(seconds / 86400)} D"
+
+
+def plan_chunks(start, end, bar_size):
+    """[(chunk_end, durationStr)] covering [start, end] oldest first, each within IB's limit for the bar size."""
+    step, longest = MAX_DURATION[bar_size]
+    chunks = []
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + step, end)
+        chunks.append((chunk_end, longest if chunk_end - chunk_start == step else duration_str(chunk_end - chunk_start)))
+        chunk_start = chunk_end
+    return chunks
+
+
+def bar_time(value):
+    """BarData.date (a date for daily bars, a UTC datetime with formatDate=2) -> aware datetime."""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+
+
+def bar_rows(symbol, bars):
+    return [(symbol, bar_time(b.date), b.open, b.high, b.low, b.close, int(b.volume)) for b in bars]
+
+
+class IbPacing:
+    """
+    Client-side model of IB's historical-data pacing rules. One instance is
+    shared by every connection, since the gateway counts requests from all
+    clients together.
+    """
+
+    def __init__(self, per_window=60, window=600, per_contract=6, contract_window=2, identical_gap=15, penalty=60,
+                 margin=1.0):
+        # margin pads every window: the gateway timestamps a request a little after we send it.
+        self.limiter = RateLimiter([(per_window, window + margin)])
+        self.per_contract = (per_contract, contract_window + margin)
+        self.identical_gap = identical_gap + margin
+        self.penalty = penalty
+        self.violations = 0
+        self._contracts = {}
+        self._sent = {}
+
+    async def acquire(self, contract_key, request_key):
+        """Wait until a request may be sent without breaking any rule, then count it."""
+        while True:
+            wait = self._sent.get(request_key, -math.inf) + self.identical_gap - time.monotonic()
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        limiter = self._contracts.get(contract_key)
+        if limiter is None:
+            limiter = self._contracts[contract_key] = RateLimiter([self.per_contract])
+        await limiter.acquire()
+        await self.limiter.acquire()
+        now = time.monotonic()
+        if len(self._sent) > 1000:
+            self._sent = {key: sent for key, sent in self._sent.items() if now - sent < self.identical_gap}
+        self._sent[request_key] = now
+
+    def violation(self):
+        """IB reported a pacing violation: hold every request, longer each time it repeats."""
+        self.violations += 1
+        self.limiter.penalize(self.penalty * 2 ** min(self.violations - 1, 4))
+
+    def success(self):
+        self.violations = 0
+
+
+_pacing = None
+
+
+def get_pacing():
+    global _pacing
+    if _pacing is None:
+        _pacing = IbPacing(
+            per_window=getattr(settings, "IB_HISTORY_PER_10_MIN", 60),
+            penalty=getattr(settings, "IB_HISTORY_PACING_PENALTY", 60),
+        )
+    return _pacing
+
+
+class IbClientPool:
+    """
+    A few IBConnections with consecutive client IDs, connected together and
+    disconnected on exit. Connections that fail to connect are left out.
+    """
+
+    def __init__(self, size=None, host=None, port=None, base_client_id=None, connection_factory=IBConnection):
+        self.size = size or getattr(settings, "IB_HISTORY_CLIENTS", 3)
+        self.host = host or getattr(settings, "IB_HOST", "127.0.0.1")
+        self.port = port or getattr(settings, "IB_PORT", 7496)
+        self.base_client_id = base_client_id or getattr(settings, "IB_HISTORY_CLIENT_ID", 100)
+        self.connection_factory = connection_factory
+        self.connections = []
+
+    async def __aenter__(self):
+        candidates = [self.connection_factory(client_id=self.base_client_id + i) for i in range(self.size)]
+        results = await asyncio.gather(*(c.connect(self.host, self.port) for c in candidates), return_exceptions=True)
+        for conn, result in zip(candidates, results):
+            if isinstance(result, Exception):
+                logger.error(f"IB client {conn.client_id} failed to connect: {result}")
+            else:
+                self.connections.append(conn)
+        if not self.connections:
+            raise ConnectionError(f"No IB connection to {self.host}:{self.port}")
+        return self
+
+    async def __aexit__(self, *exc):
+        for conn in self.connections:
+            await conn.disconnect()
+        self.connections = []
+
+
+async def fetch_bars(ib, contract, chunk_end, duration, bar_size, what_to_show="TRADES", use_rth=True):
+    """
+    One paced reqHistoricalData call. Raises PacingViolation if IB rejects it
+    anyway and RequestTimedOut if IB never answers; [] means IB said there is no data.
+    """
+    pacing = get_pacing()
+    contract_key = (contract.conId or contract.symbol, contract.exchange, what_to_show)
+    await pacing.acquire(contract_key, contract_key + (chunk_end, duration, bar_size, use_rth))
+    started = time.monotonic()
+    try:
+        bars = await ib.reqHistoricalDataAsync(
+            contract,
+            endDateTime=chunk_end,
+            durationStr=duration,
+            barSizeSetting=bar_size,
+            whatToShow=what_to_show,
+            useRTH=use_rth,
+            formatDate=2,
+            timeout=REQUEST_TIMEOUT,
+        )
+    except RequestError as e:
+        message = e.message.lower()
+        if e.code == 162 and "pacing violation" in message:
+            logger.warning(f"IB pacing violation for {contract.symbol}; holding requests")
+            pacing.violation()
+            raise PacingViolation(contract.symbol)
+        if e.code == 162 and "returned no data" in message:
+            return []
+        raise
+    # ib_insync cancels a request that times out and returns an empty list
+    # instead of raising. With RaiseRequestErrors set, a real empty answer is
+    # error 162 above, so an empty result after the full timeout is a timeout.
+    if not bars and time.monotonic() - started >= REQUEST_TIMEOUT:
+        logger.warning(f"IB history request for {contract.symbol} ending {chunk_end} timed out")
+        raise RequestTimedOut(contract.symbol)
+    pacing.success()
+    return bars
+
+
+async def resume_point(symbol, bar_size, range_start):
+    """Same rule as the Fyers backfill: saved progress counts only if it covers the requested start."""
+    progress = await BackfillProgress.objects.filter(provider="ib", symbol=symbol, resolution=bar_size).afirst()
+    if progress and progress.range_start <= range_start:
+        return progress.range_start, progress.completed_through
+    return range_start, range_start
+
+
+async def save_progress(symbol, bar_size, range_start, completed_through):
+    await BackfillProgress.objects.aupdate_or_create(
+        provider="ib", symbol=symbol, resolution=bar_size,
+        defaults={"range_start": range_start, "completed_through": completed_through},
+    )
+
+
+async def backfill_symbol(conn, symbol, start, end, bar_size="1 day", what_to_show="TRADES", use_rth=True,
+                          range_start=None):
+    """Backfill one symbol over [start, end] on one connection. Returns rows written."""
+    range_start = range_start or start
+    contract = conn.get_stock_contract(symbol)
+    await conn.ib.qualifyContractsAsync(contract)
+    written = 0
+    try:
+        for chunk_end, duration in plan_chunks(start, end, bar_size):
+            bars = await fetch_bars(conn.ib, contract, chunk_end, duration, bar_size, what_to_show, use_rth)
+            metrics.backfill_rows.inc("ib", symbol, amount=len(bars))
+            rows = bar_rows(symbol, bars)
+            if rows:
+                await db.insert_candles(IB.model_name, rows, source=IB.name)
+            await save_progress(symbol, bar_size, range_start, chunk_end)
+            written += len(rows)
+    except RetryableRequest as e:
+        e.written = written
+        raise
+    return written
+
+
+async def backfill(symbols, connections, days=365, end=None, bar_size="1 day", what_to_show="TRADES", use_rth=True):
+    """
+    Backfill symbols over connected IBConnections, one symbol per connection at
+    a time. A symbol hit by a pacing violation or a timeout goes back on the
+    queue and resumes from its saved progress. Returns {symbol: rows written}.
+    """
+    end = end or datetime.now(timezone.utc)
+    default_start = end - timedelta(days=days)
+    jobs = asyncio.Queue()
+    for symbol in dict.fromkeys(symbols):
+        jobs.put_nowait((symbol, 0))
+    results = {}
+
+    async def worker(conn):
+        # Failed requests raise instead of quietly returning no bars.
+        conn.ib.RaiseRequestErrors = True
+        while not jobs.empty():
+            symbol, requeues = jobs.get_nowait()
+            results.setdefault(symbol, 0)
+            try:
+                range_start, start = await resume_point(symbol, bar_size, default_start)
+                results[symbol] += await backfill_symbol(
+                    conn, symbol, start, end, bar_size, what_to_show, use_rth, range_start
+                )
+                logger.info(f"Backfilled {results[symbol]} bars for {symbol}")
+            except RetryableRequest as e:
+                results[symbol] += e.written
+                if requeues < MAX_REQUEUES:
+                    jobs.put_nowait((symbol, requeues + 1))
+                else:
+                    logger.error(f"Giving up on {symbol} after {requeues + 1} failed attempts (last: {e})")
+            except Exception as e:
+                logger.exception(f"Error fetching historical data for {symbol}: {e}")
+
+    await asyncio.gather(*(worker(conn) for conn in connections))
+    return results
@@ -0,0 +1,302 @@
+"""
+Local stand-in for TWS / IB Gateway used to exercise the IB history backfill
+and the live IB feed without an IB account. StubIB implements the part of
+ib_insync.IB that IBConnection, ib_history and ib_feed use:
+
+    connectAsync, isConnected, disconnect, qualifyContractsAsync,
+    reqHistoricalDataAsync, errorEvent, RaiseRequestErrors,
+    reqRealTimeBars, cancelRealTimeBars, reqMktData, cancelMktData,
+    pendingTickersEvent, disconnectedEvent
+
+Every StubIB attached to one StubGateway shares its pacing state, the way all
+clients of a real gateway do. The gateway enforces IB's historical-data
+pacing rules and the per-bar-size duration limits, answering violations with
+error 162 like TWS, and serves a seeded random walk of bars on weekdays.
+History requests for symbols in gateway.stalled are never answered; like
+ib_insync, the stub then returns an empty list once the timeout passes.
+Streaming subscriptions get a trade every tick_interval seconds, reflected in
+the ticker, and a real-time bar every bar_interval seconds (5 on TWS).
+While gateway.down is set, connections are refused and drop_clients()
+disconnects every attached client, as a gateway restart would.
+"""
+import asyncio
+import collections
+import logging
+import math
+import random
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+
+from eventkit import Event
+from ib_insync import BarData, RealTimeBar, RealTimeBarList, RequestError, Ticker
+
+logger = logging.getLogger(__name__)
+
+PACING_VIOLATION_TEXT = "Historical Market Data Service error message:Historical data request pacing violation"
+NO_DATA_TEXT = "Historical Market Data Service error message:HMDS query returned no data"
+TOO_LONG_TEXT = "Historical Market Data Service error message:Time length exceed max."
+
+DURATION_UNITS = {"S": 1, "D": 86400, "W": 7 * 86400, "M": 30 * 86400, "Y": 365 * 86400}
+
+BAR_SECONDS = {
+    "1 secs": 1, "5 secs": 5, "10 secs": 10, "15 secs": 15, "30 secs": 30,
+    "1 min": 60, "2 mins": 120, "3 mins": 180, "5 mins": 300, "15 mins": 900,
+    "30 mins": 1800, "1 hour": 3600, "1 day": 86400,
+}
+
+# Longest duration (in seconds) the gateway accepts per bar size.
+MAX_DURATION_SECONDS = {
+    "1 secs": 1800, "5 secs": 3600, "10 secs": 14400, "15 secs": 14400, "30 secs": 28800,
+    "1 min": 86400, "2 mins": 2 * 86400, "3 mins": 7 * 86400, "5 mins": 7 * 86400,
+    "15 mins": 14 * 86400, "30 mins": 31 * 86400, "1 hour": 31 * 86400, "1 day": 366 * 86400,
+}
+
+
+def duration_seconds(duration):
+    """'2 W' -> 1209600"""
+    count, unit = duration.split()
+    return int(count) * DURATION_UNITS[unit]
+
+
+@dataclass
+class StubPacing:
+    identical_gap: float = 15.0      # seconds before the same request may be repeated
+    per_contract: int = 6            # requests for one contract/exchange/tick type ...
+    contract_window: float = 2.0     # ... within this many seconds
+    per_window: int = 60             # requests in total ...
+    window: float = 600.0            # ... within this many seconds
+
+
+class StubGateway:
+    def __init__(self, pacing=None, latency=0.02, seed=42, tick_interval=0.1, bar_interval=5.0):
+        self.pacing = pacing or StubPacing()
+        self.latency = latency
+        self.seed = seed
+        self.tick_interval = tick_interval
+        self.bar_interval = bar_interval
+        self._prices = {}
+        self.stalled = set()
+        self.down = False
+        self.client_ids = set()
+        self.clients = set()  # connected StubIBs
+        self.requests = 0
+        self.violations = 0
+        self._sent = {}
+        self._by_contract = collections.defaultdict(collections.deque)
+        self._all = collections.deque()
+        self._next_con_id = 1000
+        self._con_ids = {}
+
+    def drop_clients(self):
+        """Disconnect every client, firing their disconnectedEvent."""
+        for client in list(self.clients):
+            client.disconnect()
+
+    def con_id(self, symbol):
+        if symbol not in self._con_ids:
+            self._next_con_id += 1
+            self._con_ids[symbol] = self._next_con_id
+        return self._con_ids[symbol]
+
+    def trade(self, symbol):
+        """Next (price, size) of the symbol's live random walk."""
+        rng, price = self._prices.get(symbol) or (random.Random(zlib.crc32(symbol.encode()) ^ self.seed), None)
+        if price is None:
+            price = rng.uniform(20, 500)
+        price = round(max(0.01, price * (1 + rng.gauss(0, 0.0005))), 2)
+        self._prices[symbol] = (rng, price)
+        return price, rng.randint(1, 500)
+
+    def check_pacing(self, contract_key, request_key):
+        """Record a request; return False if it breaks one of the pacing rules."""
+        now = time.monotonic()
+        rules = self.pacing
+        self.requests += 1
+        recent = self._by_contract[contract_key]
+        for stamps, window in ((recent, rules.contract_window), (self._all, rules.window)):
+            while stamps and now - stamps[0] >= window:
+                stamps.popleft()
+        violated = (
+            now - self._sent.get(request_key, -math.inf) < rules.identical_gap
+            or len(recent) >= rules.per_contract
+            or len(self._all) >= rules.per_window
+        )
+        self._sent[request_key] = now
+        recent.append(now)
+        self._all.append(now)
+        if violated:
+            self.violations += 1
+        return not violated
+
+    def bars(self, symbol, end, seconds, bar_size):
+        step = BAR_SECONDS[bar_size]
+        last = int(end.timestamp()) // step * step
+        first = int(end.timestamp()) - seconds
+        rng = random.Random(zlib.crc32(symbol.encode()) ^ self.seed)
+        base = rng.uniform(20, 500)
+        bars = []
+        for t in range(last - (last - first) // step * step, last + 1, step):
+            when = datetime.fromtimestamp(t, timezone.utc)
+            if when.weekday() >= 5 or t <= first:
+                continue
+            # Same bar for the same symbol and time whichever request returns it.
+            r = random.Random((zlib.crc32(symbol.encode()) << 32) ^ t)
+            close = round(base * (1 + 0.2 * math.sin(t / 2_592_000)) * (1 + r.uniform(-0.01, 0.01)), 2)
+            open_ = round(close * (1 + r.uniform(-0.005, 0.005)), 2)
+            high = round(max(open_, close) * (1 + r.uniform(0, 0.005)), 2)
+            low = round(min(open_, close) * (1 - r.uniform(0, 0.005)), 2)
+            bars.append(BarData(
+                date=when.date() if step == 86400 else when,
+                open=open_, high=high, low=low, close=close,
+                volume=r.randint(1_000, 1_000_000), average=round((high + low + close) / 3, 2), barCount=r.randint(10, 5000),
+            ))
+        return bars
+
+
+class StubIB:
+    def __init__(self, gateway):
+        self.gateway = gateway
+        self.client_id = None
+        self.errorEvent = Event("errorEvent")
+        self.pendingTickersEvent = Event("pendingTickersEvent")
+        self.disconnectedEvent = Event("disconnectedEvent")
+        self.RaiseRequestErrors = False
+        self._next_req_id = 1
+        self._tickers = {}
+        self._bars = {}
+        self._stream_task = None
+
+    async def connectAsync(self, host="127.0.0.1", port=7497, clientId=1, timeout=4, **kwargs):
+        await asyncio.sleep(self.gateway.latency)
+        if self.gateway.down:
+            raise ConnectionRefusedError(f"Gateway at {host}:{port} is down")
+        if clientId in self.gateway.client_ids:
+            raise ConnectionError(f"Client id {clientId} already in use")
+        self.gateway.client_ids.add(clientId)
+        self.gateway.clients.add(self)
+        self.client_id = clientId
+        return self
+
+    def isConnected(self):
+        return self.client_id is not None
+
+    def disconnect(self):
+        if not self.isConnected():
+            return
+        self.gateway.client_ids.discard(self.client_id)
+        self.gateway.clients.discard(self)
+        self.client_id = None
+        if self._stream_task:
+            self._stream_task.cancel()
+            self._stream_task = None
+        self.disconnectedEvent.emit()
+
+    async def qualifyContractsAsync(self, *contracts):
+        for contract in contracts:
+            contract.conId = self.gateway.con_id(contract.symbol)
+        return list(contracts)
+
+    def _fail(self, req_id, code, message, contract):
+        self.errorEvent.emit(req_id, code, message, contract)
+        if self.RaiseRequestErrors:
+            raise RequestError(req_id, code, message)
+        return []
+
+    async def reqHistoricalDataAsync(self, contract, endDateTime, durationStr, barSizeSetting, whatToShow,
+                                     useRTH, formatDate=1, keepUpToDate=False, chartOptions=(), timeout=60):
+        if not self.isConnected():
+            raise ConnectionError("Not connected")
+        req_id, self._next_req_id = self._next_req_id, self._next_req_id + 1
+        await asyncio.sleep(self.gateway.latency)
+        end = endDateTime if isinstance(endDateTime, datetime) else datetime.now(timezone.utc)
+        if isinstance(endDateTime, date) and not isinstance(endDateTime, datetime):
+            end = datetime(endDateTime.year, endDateTime.month, endDateTime.day, tzinfo=timezone.utc)
+        contract_key = (contract.conId or contract.symbol, contract.exchange, whatToShow)
+        request_key = contract_key + (end, durationStr, barSizeSetting, useRTH)
+        if not self.gateway.check_pacing(contract_key, request_key):
+            return self._fail(req_id, 162, PACING_VIOLATION_TEXT, contract)
+        if contract.symbol in self.gateway.stalled:
+            await asyncio.sleep(timeout)
+            return []
+        seconds = duration_seconds(durationStr)
+        if seconds > MAX_DURATION_SECONDS[barSizeSetting]:
+            return self._fail(req_id, 162, TOO_LONG_TEXT, contract)
+        bars = self.gateway.bars(contract.symbol, end, seconds, barSizeSetting)
+        if not bars:
+            return self._fail(req_id, 162, NO_DATA_TEXT, contract)
+        if formatDate == 1 and barSizeSetting != "1 day":
+            bars = [BarData(**{**vars(bar), "date": bar.date.replace(tzinfo=None)}) for bar in bars]
+        return bars
+
+    def reqMktData(self, contract, genericTickList="", snapshot=False, regulatorySnapshot=False, mktDataOptions=()):
+        ticker = self._tickers[contract.symbol] = Ticker(contract=contract)
+        self._ensure_streaming()
+        return ticker
+
+    def cancelMktData(self, contract):
+        self._tickers.pop(contract.symbol, None)
+
+    def reqRealTimeBars(self, contract, barSize, whatToShow, useRTH, realTimeBarsOptions=()):
+        bars = self._bars[contract.symbol] = RealTimeBarList()
+        bars.contract = contract
+        bars.barSize = barSize
+        bars.whatToShow = whatToShow
+        bars.useRTH = useRTH
+        self._ensure_streaming()
+        return bars
+
+    def cancelRealTimeBars(self, bars):
+        self._bars.pop(bars.contract.symbol, None)
+
+    def _ensure_streaming(self):
+        if self._stream_task is None or self._stream_task.done():
+            self._stream_task = asyncio.get_running_loop().create_task(self._stream())
+
+    async def _stream(self):
+        gateway = self.gateway
+        pending = {}  # symbol -> [open, high, low, close, volume] of the bar in progress
+        next_bar = time.monotonic() + gateway.bar_interval
+        while self.isConnected() and (self._tickers or self._bars):
+            await asyncio.sleep(gateway.tick_interval)
+            now = datetime.now(timezone.utc)
+            changed = set()
+            for symbol in set(self._tickers) | set(self._bars):
+                price, size = gateway.trade(symbol)
+                bar = pending.get(symbol)
+                if bar is None:
+                    pending[symbol] = [price, price, price, price, size]
+                else:
+                    bar[1], bar[2], bar[3], bar[4] = max(bar[1], price), min(bar[2], price), price, bar[4] + size
+                ticker = self._tickers.get(symbol)
+                if ticker is not None:
+                    ticker.time = now
+                    ticker.last, ticker.lastSize = price, size
+                    ticker.bid, ticker.ask = round(price - 0.01, 2), round(price + 0.01, 2)
+                    changed.add(ticker)
+            if changed:
+                self.pendingTickersEvent.emit(changed)
+            if time.monotonic() >= next_bar:
+                next_bar += gateway.bar_interval
+                for symbol, bars in list(self._bars.items()):
+                    bar = pending.get(symbol)
+                    if bar:
+                        open_, high, low, close, volume = bar
+                        bars.append(RealTimeBar(
+                            time=now, endTime=-1, open_=open_, high=high, low=low, close=close,
+                            volume=volume, wap=round((high + low + close) / 3, 2), count=1,
+                        ))
+                        bars.updateEvent.emit(bars, True)
+                pending.clear()
+
+
+_gateway = None
+
+
+def get_gateway():
+    """Process-wide gateway, so every stubbed connection shares its pacing state."""
+    global _gateway
+    if _gateway is None:
+        _gateway = StubGateway()
+    return _gateway
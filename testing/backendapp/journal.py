@@ -0,0 +1,252 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from backendapp import metrics
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - only needed when the journal is enabled
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Segment layout: a sequence of independent zstd frames ("blocks"). Each block
+# decompresses to records of  <int64 receive_ts_us><uint32 length><payload>.
+# A sibling .idx file holds one fixed-size entry per block so readers can seek
+# by time without decompressing earlier blocks.
+RECORD_HEADER = struct.Struct("<qI")
+INDEX_ENTRY = struct.Struct("<qqQII")  # first_ts, last_ts, offset, compressed_len, frames
+
+journal_frames = metrics.registry.counter(
+    "journal_frames_total", "Raw upstream frames written to the feed journal.", ("source",)
+)
+journal_dropped = metrics.registry.counter(
+    "journal_dropped_total", "Raw frames dropped because the journal queue was full.", ("source",)
+)
+journal_bytes = metrics.registry.counter(
+    "journal_compressed_bytes_total", "Compressed bytes written to journal segments.", ("source",)
+)
+
+_STOP = object()
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise ImportError("The feed journal needs the 'zstandard' package (pip install zstandard)")
+
+
+def _encode(frame):
+    if isinstance(frame, bytes):
+        return frame
+    if isinstance(frame, str):
+        return frame.encode()
+    return json.dumps(frame, separators=(",", ":")).encode()
+
+
+class FeedJournal:
+    """
+    Append-only journal of raw upstream frames.
+
+    append() only enqueues; a background thread serializes, compresses and
+    writes blocks, rotating segments by age or size. When the queue is full
+    frames are dropped (and counted) rather than blocking the caller.
+    """
+
+    def __init__(self, directory, source, segment_seconds=3600, segment_bytes=256 * 1024 * 1024,
+                 block_frames=2048, block_seconds=1.0, level=3, queue_size=100_000):
+        _require_zstd()
+        self.source = source
+        self.directory = Path(directory) / source
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_seconds = segment_seconds
+        self.segment_bytes = segment_bytes
+        self.block_frames = block_frames
+        self.block_seconds = block_seconds
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._segment = None
+        self._index = None
+        self._segment_started = 0.0
+        self._segment_seq = 0
+        self._thread = threading.Thread(target=self._run, name=f"journal-{source}", daemon=True)
+        self._thread.start()
+
+    def append(self, frame, received_us=None):
+        """Queue a raw frame (bytes, str or a decoded JSON object) with its receive time."""
+        if received_us is None:
+            received_us = time.time_ns() // 1000
+        try:
+            self._queue.put_nowait((received_us, frame))
+        except queue.Full:
+            journal_dropped.inc(self.source)
+
+    def close(self, timeout=5):
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    # --- writer thread ---
+
+    def _run(self):
+        block = []
+        block_started = time.monotonic()
+        while True:
+            timeout = max(0.0, self.block_seconds - (time.monotonic() - block_started))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush(block)
+                self._close_segment()
+                return
+            if item is not None:
+                block.append(item)
+            if len(block) >= self.block_frames or (block and time.monotonic() - block_started >= self.block_seconds):
+                try:
+                    self._flush(block)
+                except Exception as e:
+                    logger.exception(f"Error writing journal block for {self.source}: {e}")
+                block = []
+                block_started = time.monotonic()
+            elif not block:
+                block_started = time.monotonic()
+
+    def _flush(self, block):
+        if not block:
+            return
+        parts = []
+        for received_us, frame in block:
+            payload = _encode(frame)
+            parts.append(RECORD_HEADER.pack(received_us, len(payload)))
+            parts.append(payload)
+        compressed = self._compressor.compress(b"".join(parts))
+        self._rotate_if_needed()
+        offset = self._segment.tell()
+        self._segment.write(compressed)
+        self._segment.flush()
+        self._index.write(INDEX_ENTRY.pack(block[0][0], block[-1][0], offset, len(compressed), len(block)))
+        self._index.flush()
+        journal_frames.inc(self.source, amount=len(block))
+        journal_bytes.inc(self.source, amount=len(compressed))
+
+    def _rotate_if_needed(self):
+        if self._segment is not None:
+            age = time.monotonic() - self._segment_started
+            if age < self.segment_seconds and self._segment.tell() < self.segment_bytes:
+                return
+            self._close_segment()
+        self._segment_seq += 1
+        name = time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + f"-{os.getpid()}-{self._segment_seq:04d}"
+        self._segment = open(self.directory / f"{name}.zst", "ab")
+        self._index = open(self.directory / f"{name}.idx", "ab")
+        self._segment_started = time.monotonic()
+
+    def _close_segment(self):
+        for handle in (self._segment, self._index):
+            if handle is not None:
+                handle.close()
+        self._segment = None
+        self._index = None
+
+
+class JournalReader:
+    """Seek-by-time reader over a source's journal segments."""
+
+    def __init__(self, directory, source):
+        _require_zstd()
+        self.directory = Path(directory) / source
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def segments(self):
+        return sorted(self.directory.glob("*.zst"))
+
+    @staticmethod
+    def read_index(segment):
+        index_path = segment.with_suffix(".idx")
+        if not index_path.exists():
+            return []
+        data = index_path.read_bytes()
+        usable = len(data) - len(data) % INDEX_ENTRY.size  # ignore a torn trailing entry
+        return [INDEX_ENTRY.unpack_from(data, pos) for pos in range(0, usable, INDEX_ENTRY.size)]
+
+    def iter_frames(self, start_us=None, end_us=None):
+        """Yield (received_us, payload_bytes) in write order within [start_us, end_us]."""
+        for segment in self.segments():
+            index = self.read_index(segment)
+            if not index:
+                continue
+            if start_us is not None and index[-1][1] < start_us:
+                continue
+            if end_us is not None and index[0][0] > end_us:
+                break
+            # Blocks are in time order, so bisect on each block's last timestamp.
+            first = 0
+            if start_us is not None:
+                first = bisect.bisect_left([entry[1] for entry in index], start_us)
+            with open(segment, "rb") as f:
+                for first_ts, last_ts, offset, length, _ in index[first:]:
+                    if end_us is not None and first_ts > end_us:
+                        return
+                    f.seek(offset)
+                    compressed = f.read(length)
+                    if len(compressed) < length:
+                        # The index entry outlived its block (e.g. a crash before the segment hit disk).
+                        logger.warning(f"Journal segment {segment.name} ends inside the block at {offset}; skipping the rest")
+                        break
+                    raw = self._decompressor.decompress(compressed)
+                    pos = 0
+                    while pos < len(raw):
+                        received_us, size = RECORD_HEADER.unpack_from(raw, pos)
+                        pos += RECORD_HEADER.size
+                        payload = raw[pos:pos + size]
+                        pos += size
+                        if start_us is not None and received_us < start_us:
+                            continue
+                        if end_us is not None and received_us > end_us:
+                            continue
+                        yield received_us, payload
+
+    def iter_json(self, start_us=None, end_us=None):
+        for received_us, payload in self.iter_frames(start_us, end_us):
+            yield received_us, json.loads(payload)
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(source):
+    """Return the journal for `source`, or None when FEED_JOURNAL_DIR is not configured."""
+    directory = getattr(settings, "FEED_JOURNAL_DIR", None)
+    if not directory:
+        return None
+    journal = _journals.get(source)
+    if journal is None:
+        with _journals_lock:
+            journal = _journals.get(source)
+            if journal is None:
+                journal = FeedJournal(
+                    directory, source,
+                    segment_seconds=getattr(settings, "FEED_JOURNAL_SEGMENT_SECONDS", 3600),
+                )
+                _journals[source] = journal
+    return journal
+
+
+@atexit.register
+def _close_journals():
+    for journal in list(_journals.values()):
+        journal.close()
@@ -0,0 +1,131 @@
+import time
+import threading
+
+# Pipeline stages an update passes through, in order. Each recorded latency is
+# the time between a stage and the one before it; "end_to_end" covers the whole
+# path from the exchange event to the frame being handed to the client socket.
+STAGES = ("exchange_event", "socket_receive", "state_merge", "flush_start", "send_complete")
+END_TO_END = "end_to_end"
+
+# 2**SUB_BITS sub-buckets per power of two gives ~3% worst-case value error.
+SUB_BITS = 5
+_HALF = 1 << (SUB_BITS - 1)
+_MAX_SHIFT = 40  # values up to ~2**45 microseconds (about a year)
+
+
+def now_us():
+    """Wall-clock time in microseconds, comparable with exchange timestamps."""
+    return time.time_ns() // 1000
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of non-negative integer latencies (microseconds)."""
+
+    __slots__ = ("counts", "total", "sum", "max_value")
+
+    def __init__(self):
+        self.counts = [0] * ((_MAX_SHIFT + 2) * _HALF)
+        self.total = 0
+        self.sum = 0  # exact, for the summary's _sum
+        self.max_value = 0
+
+    @staticmethod
+    def _index(value):
+        if value < (1 << SUB_BITS):
+            return value
+        shift = value.bit_length() - SUB_BITS
+        return shift * _HALF + (value >> shift)
+
+    @staticmethod
+    def _upper_bound(index):
+        if index < (1 << SUB_BITS):
+            return index
+        shift = (index >> (SUB_BITS - 1)) - 1
+        mantissa = index - shift * _HALF
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value):
+        if value < 0:
+            value = 0  # clock skew between us and the exchange
+        index = self._index(value)
+        if index >= len(self.counts):
+            index = len(self.counts) - 1
+        self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+        if value > self.max_value:
+            self.max_value = value
+
+    def percentile(self, pct):
+        """Return the highest value equivalent to the given percentile (0-100)."""
+        if not self.total:
+            return 0
+        target = max(1, int(round(self.total * pct / 100.0)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            seen += count
+            if seen >= target:
+                return min(self._upper_bound(index), self.max_value)
+        return self.max_value
+
+    def summary(self):
+        return {
+            "count": self.total,
+            "sum_us": self.sum,
+            "p50_us": self.percentile(50),
+            "p99_us": self.percentile(99),
+            "p999_us": self.percentile(99.9),
+            "max_us": self.max_value,
+        }
+
+
+class LatencyTracker:
+    """Per-stage, per-symbol latency histograms for the streaming pipeline."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def _histogram(self, stage, symbol):
+        key = (stage, symbol)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def record(self, stage, symbol, micros):
+        self._histogram(stage, symbol).record(micros)
+        self._histogram(stage, "*").record(micros)
+
+    def record_path(self, symbol, stamps):
+        """
+        Record one update's journey. `stamps` holds microsecond timestamps in
+        STAGES order; missing trailing stages are allowed.
+        """
+        previous = stamps[0]
+        for stage, stamp in zip(STAGES[1:], stamps[1:]):
+            if stamp is None:
+                break
+            self.record(stage, symbol, stamp - previous)
+            previous = stamp
+        if len(stamps) == len(STAGES) and stamps[-1] is not None:
+            self.record(END_TO_END, symbol, stamps[-1] - stamps[0])
+
+    def snapshot(self, symbol=None):
+        """Return {stage: {symbol: summary}} for every recorded histogram."""
+        result = {}
+        for (stage, sym), histogram in list(self._histograms.items()):
+            if symbol is not None and sym not in (symbol, "*"):
+                continue
+            result.setdefault(stage, {})[sym] = histogram.summary()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+
+latency_tracker = LatencyTracker()
@@ -0,0 +1,179 @@
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+from backendapp import metrics
+
+logger = logging.getLogger(__name__)
+
+loop_lag = metrics.registry.histogram(
+    "event_loop_lag_seconds", "Delay between a scheduled wake-up and when the loop ran it.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+slow_callbacks = metrics.registry.counter(
+    "event_loop_slow_callbacks_total", "Loop callbacks that ran longer than the slow threshold.", ("name",)
+)
+
+
+def describe_callback(handle):
+    """Return a readable name for whatever a loop Handle is about to run."""
+    callback = getattr(handle, "_callback", None)
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        coro_name = getattr(coro, "__qualname__", None) or repr(coro)
+        return f"{owner.get_name()}:{coro_name}"
+    if owner is not None:
+        return f"{type(owner).__qualname__}.{getattr(callback, '__name__', '?')}"
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+class LoopMonitor:
+    """
+    Samples event-loop lag and, optionally, records callbacks that block the loop.
+
+    Lag sampling always runs. Slow-callback detection is opt-in
+    (LOOP_SLOW_CALLBACK_HOOK): it replaces asyncio.events.Handle._run for the
+    whole process, so every callback on every stock asyncio loop pays two
+    perf_counter() calls, though only the monitored loop's offenders are
+    recorded. uvloop runs callbacks in C without Handle._run, so there the
+    hook is skipped and only lag is sampled.
+    """
+
+    def __init__(self, interval=0.5, slow_callback_ms=100, history=200, hook_callbacks=False):
+        self.interval = interval
+        self.slow_callback = slow_callback_ms / 1000.0
+        self.hook_callbacks = hook_callbacks
+        self.recent_slow = collections.deque(maxlen=history)
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.loop = None
+        self.loop_thread_id = None
+        self._task = None
+        self._original_run = None
+
+    def start(self, loop=None):
+        loop = loop or asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self.loop is loop:
+            return
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        if self.hook_callbacks:
+            self._install_slow_callback_hook(loop)
+        self._task = loop.create_task(self._sample_lag(), name="loop-lag-monitor")
+        logger.info("Event loop monitor started (interval=%ss, slow=%sms, callback hook %s)",
+                    self.interval, self.slow_callback * 1000, "on" if self._original_run else "off")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._original_run is not None:
+            asyncio.events.Handle._run = self._original_run
+            self._original_run = None
+
+    async def _sample_lag(self):
+        try:
+            while True:
+                expected = time.perf_counter() + self.interval
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, time.perf_counter() - expected)
+                self.last_lag = lag
+                if lag > self.max_lag:
+                    self.max_lag = lag
+                loop_lag.observe(value=lag)
+        except asyncio.CancelledError:
+            pass
+
+    def _install_slow_callback_hook(self, loop):
+        if self._original_run is not None:
+            return
+        if not isinstance(loop, asyncio.BaseEventLoop):
+            logger.warning("Slow-callback hook needs a stock asyncio loop, not %s; sampling lag only",
+                           type(loop).__qualname__)
+            return
+        original_run = asyncio.events.Handle._run
+        monitor = self
+
+        def _timed_run(handle):
+            start = time.perf_counter()
+            try:
+                return original_run(handle)
+            finally:
+                elapsed = time.perf_counter() - start
+                if elapsed >= monitor.slow_callback and handle._loop is monitor.loop:
+                    monitor._record_slow(handle, elapsed)
+
+        self._original_run = original_run
+        asyncio.events.Handle._run = _timed_run
+
+    def _record_slow(self, handle, elapsed):
+        try:
+            name = describe_callback(handle)
+        except Exception:
+            name = "<unknown>"
+        slow_callbacks.inc(name)
+        self.recent_slow.append({"name": name, "duration_ms": round(elapsed * 1000, 3), "at": time.time()})
+        logger.warning("Slow event loop callback %s took %.1f ms", name, elapsed * 1000)
+
+    def stats(self):
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "callback_hook": self._original_run is not None,
+            "interval_s": self.interval,
+            "slow_callback_ms": self.slow_callback * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "recent_slow_callbacks": list(self.recent_slow),
+        }
+
+
+loop_monitor = LoopMonitor(
+    interval=getattr(settings, "LOOP_MONITOR_INTERVAL", 0.5),
+    slow_callback_ms=getattr(settings, "LOOP_SLOW_CALLBACK_MS", 100),
+    hook_callbacks=getattr(settings, "LOOP_SLOW_CALLBACK_HOOK", False),
+)
+
+
+class LoopMonitorMiddleware:
+    """ASGI middleware that starts the loop monitor on the server's event loop."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        loop_monitor.start()
+        return await self.app(scope, receive, send)
+
+
+def _frame_stack(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    stack.reverse()
+    return ";".join(stack)
+
+
+def sample_profile(seconds, interval=0.005, thread_ids=None):
+    """
+    Sample Python stacks for `seconds` and return them in collapsed-stack
+    format ("frame;frame;frame count" per line), which flamegraph.pl and
+    speedscope load directly. Defaults to all threads except the sampler.
+    """
+    own_id = threading.get_ident()
+    counts = collections.Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (thread_ids is not None and thread_id not in thread_ids):
+                continue
+            counts[_frame_stack(frame)] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {count}" for stack, count in counts.most_common()) + "\n"
@@ -0,0 +1,23 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+from backendapp.fyers_ws import fetch_and_save_historical_data
+
+
+class Command(BaseCommand):
+    help = "Backfill Fyers 5m history for the registry's Fyers symbols (or --symbols) under the shared rate limiter, resuming saved progress"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--symbols", nargs="+", default=None, help="Fyers symbols, e.g. NSE:SBIN-EQ")
+        parser.add_argument("--days", type=int, default=100, help="How far back to go (default 100)")
+
+    def handle(self, *args, **opts):
+        started = time.perf_counter()
+        results = asyncio.run(fetch_and_save_historical_data(opts["symbols"], days=opts["days"]))
+        failed = [symbol for symbol, rows in results.items() if not rows]
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(results.values())} rows for {len(results)} symbols in {time.perf_counter() - started:.1f}s"
+            + (f"; no rows for {len(failed)}: {', '.join(failed[:10])}" if failed else "")
+        ))
@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+from backendapp import ib_history, symbols as symbol_registry
+from backendapp.ib_stub import StubGateway, StubIB
+from backendapp.websockets.ibapi_ws import IBConnection
+
+
+class Command(BaseCommand):
+    help = "Backfill IB history for the registry's IB symbols (or --symbols) over a pool of client IDs under the IB pacing model"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--symbols", nargs="+", default=None)
+        parser.add_argument("--days", type=int, default=3650, help="How far back to go (default 10 years)")
+        parser.add_argument("--bar-size", default="1 day", choices=sorted(ib_history.MAX_DURATION))
+        parser.add_argument("--what", default="TRADES", help="whatToShow (default TRADES)")
+        parser.add_argument("--all-hours", action="store_true", help="Include data outside regular trading hours")
+        parser.add_argument("--clients", type=int, default=None, help="Connections in the pool (default IB_HISTORY_CLIENTS)")
+        parser.add_argument("--host", default=None)
+        parser.add_argument("--port", type=int, default=None)
+        parser.add_argument("--stub", action="store_true", help="Run against the in-process IB stub instead of TWS")
+
+    def handle(self, *args, **opts):
+        symbols = [s.upper() for s in opts["symbols"]] if opts["symbols"] else None
+        factory = IBConnection
+        if opts["stub"]:
+            gateway = StubGateway()
+            factory = lambda client_id: IBConnection(client_id=client_id, ib=StubIB(gateway))
+
+        async def run():
+            nonlocal symbols
+            symbols = symbols or await symbol_registry.enabled("ib")
+            async with ib_history.IbClientPool(opts["clients"], opts["host"], opts["port"], connection_factory=factory) as pool:
+                return await ib_history.backfill(
+                    symbols, pool.connections, days=opts["days"], bar_size=opts["bar_size"],
+                    what_to_show=opts["what"], use_rth=not opts["all_hours"],
+                )
+
+        started = time.perf_counter()
+        results = asyncio.run(run())
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(results.values())} bars for {len(results)} symbols in {time.perf_counter() - started:.1f}s"
+        ))
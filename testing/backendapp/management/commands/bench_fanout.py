@@ -0,0 +1,219 @@
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backendapp import metrics
+from backendapp.data_list import CRYPTO_SYMBOLS
+from backendapp.latency import LatencyHistogram
+
+
+def _rss_bytes():
+    """Current resident set size; falls back to peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark WebSocket fan-out: drive the ASGI application with N simulated clients "
+        "on the in-memory channel layer against a synthetic upstream, and store results as JSON. "
+        "Runs the consumer in direct ingest mode, where every client opens its own upstream "
+        "sockets, so large levels measure upstream socket count as much as fan-out."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", default="10,100,1000,10000", help="Comma-separated client counts")
+        parser.add_argument("--duration", type=float, default=15.0, help="Measurement window per level (s)")
+        parser.add_argument("--warmup", type=float, default=3.0, help="Seconds to wait after connecting")
+        parser.add_argument("--connect-concurrency", type=int, default=200)
+        parser.add_argument("--connect-timeout", type=float, default=30.0)
+        parser.add_argument("--path", default="/ws/binance/")
+        parser.add_argument("--tick-rate", type=float, default=10.0, help="Synthetic ticks/s per stream")
+        parser.add_argument("--upstream-url", default=None,
+                            help="Use an already running fake exchange (http://host:port) instead of an in-process one")
+        parser.add_argument("--port", type=int, default=9950, help="Port for the in-process fake exchange")
+        parser.add_argument("--output-dir", default=str(Path(settings.BASE_DIR) / "benchmarks"),
+                            help="Where result JSON goes (default: benchmarks/, which git ignores)")
+        parser.add_argument("--baseline", default=None, help="Previous result JSON to compare against")
+
+    def handle(self, *args, **options):
+        upstream = options["upstream_url"] or f"http://127.0.0.1:{options['port']}"
+        settings.BINANCE_API_URL = upstream.rstrip("/") + "/api"
+        settings.BINANCE_STREAM_URL = upstream.replace("http", "ws", 1).rstrip("/") + "/"
+        settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+        # Shard workers are separate processes and can't reach an in-memory layer.
+        settings.BINANCE_INGEST = "direct"
+        from channels.layers import channel_layers
+        channel_layers.backends = {}
+
+        levels = [int(n) for n in options["clients"].split(",") if n.strip()]
+        result = asyncio.run(self._run(levels, options))
+
+        output_dir = Path(options["output_dir"])
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = output_dir / f"fanout-{stamp}.json"
+        path.write_text(json.dumps(result, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Results written to {path}"))
+
+        if options["baseline"]:
+            self._compare(json.loads(Path(options["baseline"]).read_text()), result)
+
+    async def _run(self, levels, options):
+        from backendproject.asgi import application
+
+        runner = None
+        if not options["upstream_url"]:
+            from backendapp.fake_exchange import FakeExchangeConfig, start_fake_exchange
+            config = FakeExchangeConfig(symbols=CRYPTO_SYMBOLS, tick_rate=options["tick_rate"], rate_limit_weight=0)
+            _, runner = await start_fake_exchange(config, port=options["port"])
+
+        result = {
+            "benchmark": "websocket_fanout",
+            "consumer": "BinanceConsumer",
+            "path": options["path"],
+            "revision": _git_revision(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "symbols": len(CRYPTO_SYMBOLS),
+            "tick_rate": options["tick_rate"],
+            "in_process_upstream": runner is not None,
+            # Each client opens one upstream socket per symbol in direct mode, so
+            # upstream_sockets grows with clients; this is not a shared-feed fan-out.
+            "ingest": "direct",
+            "levels": [],
+        }
+        try:
+            for clients in levels:
+                self.stdout.write(f"Running {clients} clients...")
+                level = await self._run_level(application, clients, options)
+                result["levels"].append(level)
+                self.stdout.write(
+                    f"  connected={level['connected']} updates/s={level['updates_per_s']:.0f} "
+                    f"p50={level['latency_ms']['p50']}ms p99={level['latency_ms']['p99']}ms "
+                    f"rss/client={level['rss_kb_per_client']:.1f}KB cpu/update={level['cpu_us_per_update']:.1f}us "
+                    f"upstream sockets={level['upstream_sockets']}"
+                )
+        finally:
+            if runner is not None:
+                await runner.cleanup()
+        return result
+
+    async def _run_level(self, application, clients, options):
+        from channels.testing import WebsocketCommunicator
+
+        headers = [(b"origin", b"http://localhost"), (b"host", b"localhost")]
+        semaphore = asyncio.Semaphore(options["connect_concurrency"])
+        communicators = []
+        failures = 0
+
+        async def open_client():
+            nonlocal failures
+            async with semaphore:
+                communicator = WebsocketCommunicator(application, options["path"], headers=headers)
+                try:
+                    connected, _ = await communicator.connect(timeout=options["connect_timeout"])
+                except Exception:
+                    connected = False
+                if connected:
+                    communicators.append(communicator)
+                else:
+                    failures += 1
+
+        rss_before = _rss_bytes()
+        connect_started = time.perf_counter()
+        await asyncio.gather(*(open_client() for _ in range(clients)))
+        connect_seconds = time.perf_counter() - connect_started
+        await asyncio.sleep(options["warmup"])
+        rss_after = _rss_bytes()
+        upstream_sockets = int(sum(value for _, _, _, value in metrics.upstream_sockets.samples()))
+
+        histogram = LatencyHistogram()
+        counts = {"frames": 0, "updates": 0}
+        deadline = time.monotonic() + options["duration"]
+
+        async def read_client(communicator):
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    text = await communicator.receive_from(timeout=remaining)
+                except Exception:
+                    return
+                received_ms = time.time() * 1000
+                payload = json.loads(text)
+                if "ping" in payload:
+                    continue
+                counts["frames"] += 1
+                for update in payload.values():
+                    counts["updates"] += 1
+                    event_ms = update.get("timestamp") if isinstance(update, dict) else None
+                    if event_ms:
+                        histogram.record(int((received_ms - event_ms) * 1000))
+
+        cpu_started = time.process_time()
+        wall_started = time.perf_counter()
+        await asyncio.gather(*(read_client(c) for c in communicators))
+        wall = time.perf_counter() - wall_started
+        cpu = time.process_time() - cpu_started
+
+        await asyncio.gather(*(c.disconnect(timeout=10) for c in communicators), return_exceptions=True)
+
+        connected = len(communicators)
+        summary = histogram.summary()
+        return {
+            "clients": clients,
+            "connected": connected,
+            "failed": failures,
+            "upstream_sockets": upstream_sockets,
+            "connect_seconds": round(connect_seconds, 3),
+            "duration_s": round(wall, 3),
+            "frames_per_s": counts["frames"] / wall if wall else 0,
+            "updates_per_s": counts["updates"] / wall if wall else 0,
+            "latency_ms": {
+                "p50": summary["p50_us"] / 1000,
+                "p99": summary["p99_us"] / 1000,
+                "p999": summary["p999_us"] / 1000,
+                "max": summary["max_us"] / 1000,
+            },
+            "rss_kb_per_client": (rss_after - rss_before) / 1024 / connected if connected else 0,
+            "cpu_us_per_update": cpu * 1e6 / counts["updates"] if counts["updates"] else 0,
+        }
+
+    def _compare(self, baseline, current):
+        self.stdout.write(f"Compared with {baseline.get('revision')} ({baseline.get('created_at')}):")
+        previous = {level["clients"]: level for level in baseline.get("levels", [])}
+        for level in current["levels"]:
+            old = previous.get(level["clients"])
+            if not old:
+                continue
+            for key, better in (("updates_per_s", "higher"), ("cpu_us_per_update", "lower"), ("rss_kb_per_client", "lower")):
+                before, after = old[key], level[key]
+                change = (after - before) / before * 100 if before else 0
+                self.stdout.write(f"  {level['clients']:>6} clients {key}: {before:.1f} -> {after:.1f} ({change:+.1f}%, {better} is better)")
+            before, after = old["latency_ms"]["p99"], level["latency_ms"]["p99"]
+            self.stdout.write(f"  {level['clients']:>6} clients p99 latency: {before}ms -> {after}ms")
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backendapp.data_list import CRYPTO_SYMBOLS
+from backendapp.management.commands.bench_fanout import _git_revision
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark local order books: apply cost of depth diffs offline, then N symbols' "
+        "depth@100ms streams against the fake exchange (resyncs, conflated pushes, CPU). "
+        "Results are stored as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--symbols", type=int, default=25)
+        parser.add_argument("--duration", type=float, default=20.0, help="Live measurement window (s)")
+        parser.add_argument("--warmup", type=float, default=3.0, help="Seconds to let the books sync first")
+        parser.add_argument("--events", type=int, default=20000, help="Diffs applied in the offline run")
+        parser.add_argument("--depth-changes", type=int, default=20, help="Level changes per 100ms diff")
+        parser.add_argument("--depth-gap-every", type=float, default=0.0,
+                            help="Have the fake exchange drop a diff per stream this often (s) to exercise resyncs")
+        parser.add_argument("--upstream-url", default=None,
+                            help="Use an already running fake exchange (http://host:port) instead of an in-process one")
+        parser.add_argument("--port", type=int, default=9951, help="Port for the in-process fake exchange")
+        parser.add_argument("--output-dir", default=str(Path(settings.BASE_DIR) / "benchmarks"))
+
+    def handle(self, *args, **options):
+        upstream = options["upstream_url"] or f"http://127.0.0.1:{options['port']}"
+        settings.BINANCE_API_URL = upstream.rstrip("/") + "/api"
+        settings.BINANCE_STREAM_URL = upstream.replace("http", "ws", 1).rstrip("/") + "/"
+        settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+        from channels.layers import channel_layers
+        channel_layers.backends = {}
+
+        count = options["symbols"]
+        symbols = CRYPTO_SYMBOLS[:count] + [f"SYN{i}USDT" for i in range(max(0, count - len(CRYPTO_SYMBOLS)))]
+        result = {
+            "benchmark": "order_book",
+            "revision": _git_revision(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "symbols": len(symbols),
+            "depth_changes": options["depth_changes"],
+            "offline": self._offline(options),
+            "live": asyncio.run(self._live(symbols, options)),
+        }
+        offline, live = result["offline"], result["live"]
+        self.stdout.write(
+            f"Offline: {offline['us_per_diff']:.1f}us/diff, {offline['us_per_level']:.2f}us/level, "
+            f"top-20 read {offline['us_per_top20']:.1f}us, matches exchange book: {offline['matches']}"
+        )
+        self.stdout.write(
+            f"Live: {live['synced']}/{len(symbols)} books synced, {live['diffs_per_s']:.0f} diffs/s, "
+            f"{live['resyncs']} resyncs, {live['pushes_per_s']:.0f} pushes/s, cpu {live['cpu_percent']:.0f}%"
+        )
+
+        output_dir = Path(options["output_dir"])
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = output_dir / f"orderbook-{stamp}.json"
+        path.write_text(json.dumps(result, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Results written to {path}"))
+
+    def _offline(self, options):
+        """Replay the fake exchange's own diffs into an OrderBook and check it ends up identical."""
+        from backendapp.fake_exchange import DEPTH_STEP_MS, DepthState
+        from backendapp.fixed_point import step_decimals
+        from backendapp.order_book import OrderBook
+
+        depth = DepthState("BTCUSDT", 43000.0, seed=42, levels=1000, changes=options["depth_changes"])
+        snapshot = depth.snapshot(5000)
+        events = []
+        now_ms = depth.stepped_ms
+        while len(events) < options["events"]:
+            now_ms += DEPTH_STEP_MS * 50
+            depth.advance(now_ms)
+            events.extend(depth.events)
+            depth.events.clear()
+        decimals = step_decimals(f"{depth.tick:.8f}")
+        book = OrderBook("BTCUSDT", decimals, 8)
+        book.load(snapshot)
+        levels = sum(len(event["b"]) + len(event["a"]) for event in events)
+        started = time.perf_counter()
+        for event in events:
+            book.apply(event)
+        elapsed = time.perf_counter() - started
+        reads = 10000
+        read_started = time.perf_counter()
+        for _ in range(reads):
+            book.top(20)
+        read_elapsed = time.perf_counter() - read_started
+        expected = depth.snapshot(5000)
+        bids, asks = book.top(5000)
+        return {
+            "diffs": len(events),
+            "levels": levels,
+            "book_levels": len(book.bids) + len(book.asks),
+            "us_per_diff": elapsed * 1e6 / len(events),
+            "us_per_level": elapsed * 1e6 / levels if levels else 0,
+            "us_per_top20": read_elapsed * 1e6 / reads,
+            "matches": (
+                book.last_update_id == expected["lastUpdateId"]
+                and [[float(p), float(q)] for p, q in bids] == [[float(p), float(q)] for p, q in expected["bids"]]
+                and [[float(p), float(q)] for p, q in asks] == [[float(p), float(q)] for p, q in expected["asks"]]
+            ),
+        }
+
+    async def _live(self, symbols, options):
+        from channels.layers import get_channel_layer
+
+        from backendapp.order_book import OrderBookFeed, group_name
+
+        runner = None
+        if not options["upstream_url"]:
+            from backendapp.fake_exchange import FakeExchangeConfig, start_fake_exchange
+            config = FakeExchangeConfig(
+                symbols=symbols, rate_limit_weight=0,
+                depth_changes=options["depth_changes"], depth_gap_every=options["depth_gap_every"],
+            )
+            _, runner = await start_fake_exchange(config, port=options["port"])
+
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        pushes = 0
+        counting = False
+
+        async def drain():
+            nonlocal pushes
+            while True:
+                await layer.receive(channel)
+                if counting:
+                    pushes += 1
+
+        feed = OrderBookFeed()
+        drainer = asyncio.create_task(drain())
+        try:
+            for symbol in symbols:
+                symbol, depth = await feed.acquire(symbol, 20)
+                await layer.group_add(group_name(symbol, depth), channel)
+            await asyncio.sleep(options["warmup"])
+            diffs, resyncs = feed.diffs, feed.resyncs
+            counting = True
+            cpu_started = time.process_time()
+            wall_started = time.perf_counter()
+            await asyncio.sleep(options["duration"])
+            wall = time.perf_counter() - wall_started
+            cpu = time.process_time() - cpu_started
+            counting = False
+            diffs, resyncs = feed.diffs - diffs, feed.resyncs - resyncs
+            synced = len(feed.books)
+            for symbol in symbols:
+                await feed.release(symbol, 20)
+        finally:
+            drainer.cancel()
+            if runner is not None:
+                await runner.cleanup()
+        return {
+            "in_process_upstream": runner is not None,
+            "push_interval_s": feed.push_interval,
+            "synced": synced,
+            "duration_s": round(wall, 3),
+            "diffs_per_s": diffs / wall,
+            "resyncs": resyncs,
+            "pushes_per_s": pushes / wall,
+            # Includes the in-process fake exchange generating and serializing the diffs.
+            "cpu_percent": cpu / wall * 100,
+            "cpu_us_per_diff": cpu * 1e6 / diffs if diffs else 0,
+        }
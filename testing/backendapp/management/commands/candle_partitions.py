@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from backendapp.partitions import (
+    CANDLE_TABLES, ensure_partitions, forget_cached_state, list_partitions, month_start, partition_name,
+)
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly partitions for the candle tables and detach or drop old ones (Postgres only)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=3, help="Months to create past the current one")
+        parser.add_argument("--retain", type=int, default=None,
+                            help="Keep this many past months; older partitions are detached")
+        parser.add_argument("--drop", action="store_true", help="Drop old partitions instead of detaching them")
+        parser.add_argument("--tables", nargs="+", default=list(CANDLE_TABLES))
+        parser.add_argument("--list", action="store_true", help="Only print the current partitions")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning is only available on PostgreSQL")
+
+        now = datetime.now(timezone.utc)
+        with connection.cursor() as cursor:
+            for table in opts["tables"]:
+                if table not in CANDLE_TABLES:
+                    raise CommandError(f"Unknown candle table {table}")
+                if opts["list"]:
+                    for name, bound in list_partitions(cursor, table):
+                        self.stdout.write(f"{table}: {name} {bound}")
+                    continue
+
+                ensure_partitions(cursor, table, now, now + timedelta(days=31 * opts["ahead"]))
+
+                if opts["retain"] is None:
+                    continue
+                cutoff = month_start(now)
+                for _ in range(opts["retain"]):
+                    cutoff = month_start(cutoff - timedelta(days=1))
+                prefix = partition_name(table, cutoff)[:-6]
+                for name, _ in list_partitions(cursor, table):
+                    suffix = name[len(prefix):]
+                    if not name.startswith(prefix) or not suffix.isdigit() or suffix >= f"{cutoff:%Y%m}":
+                        continue
+                    cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+                    if opts["drop"]:
+                        cursor.execute(f'DROP TABLE "{name}"')
+                        self.stdout.write(f"Dropped {name}")
+                    else:
+                        self.stdout.write(f"Detached {name} (now a standalone table)")
+                forget_cached_state()
+
+        if not opts["list"]:
+            self.stdout.write(self.style.SUCCESS("Partitions up to date"))
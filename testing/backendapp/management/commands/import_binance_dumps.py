@@ -0,0 +1,231 @@
+import asyncio
+import io
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import repeat
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from backendapp import db
+from backendapp.fixed_point import format_scaled
+from backendapp.models import Binance_Data
+from backendapp.partitions import month_start, next_month
+
+# Imports the monthly/daily kline archives from data.binance.vision, e.g.
+# BTCUSDT-5m-2023-01.zip or BTCUSDT-5m-2023-01-15.zip, each holding one CSV:
+# open_time, open, high, low, close, volume, close_time, ...
+DUMP_NAME = re.compile(r"^(?P<symbol>[A-Z0-9]+)-(?P<interval>\d+[smhdwM])-(?P<year>\d{4})-(?P<month>\d{2})(?:-(?P<day>\d{2}))?\.zip$")
+
+UNIT_MS = {"s": 1_000, "m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+
+def interval_ms(interval):
+    if interval.endswith("M"):
+        return None  # calendar months, no fixed length
+    return int(interval[:-1]) * UNIT_MS[interval[-1]]
+
+
+def dump_range(match):
+    """[start, end) covered by a dump file, from its name."""
+    start = datetime(int(match["year"]), int(match["month"]), int(match["day"] or 1), tzinfo=timezone.utc)
+    end = start + timedelta(days=1) if match["day"] else next_month(month_start(start))
+    return start, end
+
+
+def parse_dump(path, symbol, stored_ms, copy_text, decimals, limits):
+    """
+    Decompress, parse and de-duplicate one archive (runs in a worker process).
+
+    The six columns are parsed straight into float64 arrays (open times up to
+    2**53 are exact), and OHLCV is scaled to integers at the candle columns'
+    `decimals`, rounded half-up as the numeric columns would. Rows with a
+    scaled value at or past its column's limit (10**max_digits) are rejected,
+    since one such row aborts a whole COPY. Rows whose open time is in
+    stored_ms are dropped. Returns (rows, skipped, rejected_ms, payload) where
+    rejected_ms lists the rejected open times and payload is COPY text bytes
+    when copy_text is set, else (open_time_ms, scaled ohlcv).
+    """
+    with zipfile.ZipFile(path) as archive:
+        raw = archive.read(archive.namelist()[0])
+    if not raw.strip():
+        return 0, 0, [], (b"" if copy_text else (np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.int64)))
+    # Some archives (futures) start with a header row.
+    skip = 0 if raw[:1].isdigit() else 1
+    table = np.loadtxt(io.BytesIO(raw), delimiter=",", dtype=np.float64, usecols=range(6), skiprows=skip, ndmin=2)
+    open_times = table[:, 0].astype(np.int64)
+    # Spot archives switched open_time to microseconds in 2025.
+    if open_times.size and open_times.max() >= 10 ** 14:
+        open_times //= 1000
+    # Round off float noise (1.005 * 100 = 100.49999...) before rounding half-up.
+    scaled = np.floor(np.round(table[:, 1:6] * 10 ** decimals, 6) + 0.5)
+    # Checked on the floats, before anything too large for int64 is cast.
+    fits = (np.isfinite(scaled) & (np.abs(scaled) < np.asarray(limits, dtype=np.float64))).all(axis=1)
+    rejected_ms = open_times[~fits].tolist()
+    open_times, scaled = open_times[fits], scaled[fits].astype(np.int64)
+
+    skipped = 0
+    if stored_ms.size:
+        keep = ~np.isin(open_times, stored_ms)
+        skipped = int(keep.size - keep.sum())
+        open_times, scaled = open_times[keep], scaled[keep]
+
+    if not copy_text:
+        return len(open_times), skipped, rejected_ms, (open_times, scaled)
+    return len(open_times), skipped, rejected_ms, encode_copy_text(symbol, open_times, scaled, decimals)
+
+
+def encode_copy_text(symbol, open_times, scaled, decimals):
+    """COPY text rows in CANDLE_COLUMNS order, built column-wise with numpy string ufuncs."""
+    text = np.dtypes.StringDType()
+    if decimals:
+        whole, frac = np.divmod(scaled, 10 ** decimals)
+        fields = np.strings.add(whole.astype(text), np.strings.add(".", np.strings.zfill(frac.astype(text), decimals)))
+    else:
+        fields = scaled.astype(text)
+    stamps = np.datetime_as_string(open_times.astype("datetime64[ms]"), unit="ms").astype(text)
+    rows = np.strings.add(np.strings.add(f"{symbol}\t", stamps), "+00")
+    for column in range(fields.shape[1]):
+        rows = np.strings.add(np.strings.add(rows, "\t"), fields[:, column])
+    return ("\n".join(rows.tolist()) + "\n").encode() if len(rows) else b""
+
+
+class Command(BaseCommand):
+    help = "Import a directory of Binance public kline dump zips into Binance_Data"
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory searched recursively for *.zip kline dumps")
+        parser.add_argument("--interval", default="5m", help="Only import dumps of this interval (default 5m)")
+        parser.add_argument("--symbols", nargs="+", default=None, help="Only import these symbols")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Parser processes")
+        parser.add_argument("--batch-size", type=int, default=50_000,
+                            help="Rows per bulk insert when COPY is unavailable (SQLite)")
+
+    def handle(self, *args, **opts):
+        if not os.path.isdir(opts["directory"]):
+            raise CommandError(f"{opts['directory']} is not a directory")
+        symbols = {s.upper() for s in opts["symbols"]} if opts["symbols"] else None
+
+        dumps = []
+        for root, _, names in os.walk(opts["directory"]):
+            for name in names:
+                match = DUMP_NAME.match(name)
+                if not match or match["interval"] != opts["interval"]:
+                    continue
+                if symbols and match["symbol"] not in symbols:
+                    continue
+                dumps.append((os.path.join(root, name), match))
+        if not dumps:
+            self.stdout.write(self.style.WARNING("No matching dump files found"))
+            return
+        dumps.sort(key=lambda item: item[0])
+        self.check_schema({match["symbol"] for _, match in dumps})
+
+        self.stdout.write(f"Importing {len(dumps)} files with {opts['workers']} workers")
+        stats = asyncio.run(self.import_all(dumps, opts))
+        elapsed = stats["elapsed"] or 1e-9
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {stats['rows']} rows stored from {stats['files']} files "
+            f"({stats['skipped_files']} already present, {stats['skipped_rows']} duplicate rows) "
+            f"in {elapsed:.1f}s, {stats['rows'] / elapsed:,.0f} rows/sec"
+        ))
+        if stats["rejected_rows"]:
+            self.stdout.write(self.style.WARNING(
+                f"{stats['rejected_rows']} rows were rejected for values too large for their columns"
+            ))
+        if stats["lost_rows"]:
+            raise CommandError(
+                f"{stats['lost_rows']} parsed rows were not stored; they collide with existing rows "
+                f"on the table's primary key"
+            )
+
+    def check_schema(self, symbols):
+        """Refuse to import when the table's key can't hold these symbols side by side."""
+        key = db.primary_key_columns("Binance_Data")
+        if "symbol" in key:
+            return
+        others = set(Binance_Data.objects.exclude(symbol__in=symbols).values_list("symbol", flat=True).distinct()[:5])
+        if len(symbols) > 1 or others:
+            raise CommandError(
+                f"{Binance_Data._meta.db_table} is keyed on ({', '.join(key)}) alone, so rows of different symbols "
+                f"at the same timestamp collide and all but one are dropped ({', '.join(sorted(symbols | others))}). "
+                f"Import into Postgres, where migration 0002 keys candles on (symbol, timestamp)."
+            )
+
+    async def import_all(self, dumps, opts):
+        loop = asyncio.get_running_loop()
+        stats = {
+            "files": 0, "skipped_files": 0, "rows": 0, "skipped_rows": 0, "rejected_rows": 0, "lost_rows": 0,
+            "elapsed": 0.0,
+        }
+        # Bound how many parsed files sit in memory waiting for the database.
+        in_flight = asyncio.Semaphore(opts["workers"] * 2)
+        step = interval_ms(opts["interval"])
+        copy_text = db.supports_copy_text()
+        decimals = Binance_Data._meta.get_field("close_price").decimal_places
+        # Largest scaled value each of open, high, low, close and volume can store.
+        limits = [10 ** Binance_Data._meta.get_field(column).max_digits for column in db.CANDLE_COLUMNS[2:]]
+        started = time.perf_counter()
+
+        async def import_one(pool, path, match):
+            async with in_flight:
+                symbol = match["symbol"]
+                start, end = dump_range(match)
+                existing = await db.timestamps_between("Binance_Data", symbol, start, end)
+                expected = (end - start) // timedelta(milliseconds=step) if step else None
+                if expected and len(existing) >= expected:
+                    stats["skipped_files"] += 1
+                    return
+
+                stored_ms = np.fromiter((int(t.timestamp() * 1000) for t in existing), dtype=np.int64)
+                count, skipped, rejected_ms, payload = await loop.run_in_executor(
+                    pool, parse_dump, path, symbol, stored_ms, copy_text, decimals, limits
+                )
+                stats["skipped_rows"] += skipped
+                if rejected_ms:
+                    stats["rejected_rows"] += len(rejected_ms)
+                    first = ", ".join(
+                        datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat() for ms in rejected_ms[:5]
+                    )
+                    self.stdout.write(self.style.WARNING(
+                        f"{os.path.basename(path)}: rejected {len(rejected_ms)} rows out of column range "
+                        f"(open times {first}{', ...' if len(rejected_ms) > 5 else ''})"
+                    ))
+                if count and copy_text:
+                    # Fast path: the worker already encoded the rows, one COPY per file.
+                    await db.copy_candle_text("Binance_Data", payload, count, start, end)
+                elif count:
+                    open_times, scaled = payload
+                    timestamps = [t.replace(tzinfo=timezone.utc) for t in open_times.astype("datetime64[ms]").astype(object)]
+                    values = [[format_scaled(v, decimals) for v in scaled[:, i].tolist()] for i in range(5)]
+                    rows = list(zip(repeat(symbol), timestamps, *values))
+                    for offset in range(0, len(rows), opts["batch_size"]):
+                        await db.insert_candles("Binance_Data", rows[offset:offset + opts["batch_size"]])
+                # Inserts skip conflicts silently, so count what is actually in the range now.
+                stored = len(await db.timestamps_between("Binance_Data", symbol, start, end)) - len(existing)
+                stats["files"] += 1
+                stats["rows"] += stored
+                stats["lost_rows"] += count - stored
+
+        async def report_progress():
+            while True:
+                await asyncio.sleep(5)
+                elapsed = time.perf_counter() - started
+                done = stats["files"] + stats["skipped_files"]
+                self.stdout.write(
+                    f"{done}/{len(dumps)} files, {stats['rows']} rows, {stats['rows'] / elapsed:,.0f} rows/sec"
+                )
+
+        reporter = asyncio.create_task(report_progress())
+        try:
+            with ProcessPoolExecutor(max_workers=opts["workers"]) as pool:
+                await asyncio.gather(*(import_one(pool, path, match) for path, match in dumps))
+        finally:
+            reporter.cancel()
+            await db.get_backend().close()
+        stats["elapsed"] = time.perf_counter() - started
+        return stats
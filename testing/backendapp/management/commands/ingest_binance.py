@@ -0,0 +1,107 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from backendapp.data_list import CRYPTO_SYMBOLS
+
+
+def _worker_main(worker_id, symbols, static_members, duration, in_memory_layer, results):
+    """Entry point of one spawned worker process."""
+    import django
+    django.setup()
+    from django.conf import settings
+    from backendapp.binance_shard import ShardWorker
+
+    if in_memory_layer:
+        settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+    async def run():
+        worker = ShardWorker(
+            worker_id, symbols, static_members=static_members,
+            heartbeat_interval=getattr(settings, "BINANCE_SHARD_HEARTBEAT", 2.0),
+            member_timeout=3 * getattr(settings, "BINANCE_SHARD_HEARTBEAT", 2.0),
+        )
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        if duration:
+            loop.call_later(duration, worker.stop)
+        started = time.monotonic()
+        await worker.run()
+        owned = len(worker.ring.assign(worker.symbols).get(worker_id, ()))
+        results.put((worker_id, owned, worker.ticks, time.monotonic() - started))
+
+    asyncio.run(run())
+
+
+class Command(BaseCommand):
+    help = (
+        "Run sharded Binance ingestion: N worker processes, each streaming the consistent-hash "
+        "slice of the symbol list it owns and publishing to the channel layer. Run it on more "
+        "hosts to add workers; slices rebalance as workers join and leave. Set "
+        "BINANCE_INGEST=sharded on the web processes so /ws/binance/ clients read from it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--worker-prefix", default=socket.gethostname(),
+                            help="Worker IDs are <prefix>-<n>; must be unique across hosts")
+        parser.add_argument("--symbols", type=int, default=0,
+                            help="Use the first N of CRYPTO_SYMBOLS plus synthetic ones, matching "
+                                 "`run_fake_exchange --symbols`, instead of following the symbol registry")
+        parser.add_argument("--static", action="store_true",
+                            help="Split among this command's own processes by a fixed member list instead of "
+                                 "discovering workers through the channel layer")
+        parser.add_argument("--in-memory-layer", action="store_true",
+                            help="Publish to a per-process in-memory channel layer that nobody reads "
+                                 "(ingestion benchmarks with --static and --duration, no Redis needed)")
+        parser.add_argument("--duration", type=float, default=0,
+                            help="Stop after this many seconds and report ticks/s per worker (0 = run forever)")
+
+    def handle(self, *args, **options):
+        symbols = None
+        count = options["symbols"]
+        if count:
+            symbols = CRYPTO_SYMBOLS[:count] + [f"SYN{i}USDT" for i in range(max(0, count - len(CRYPTO_SYMBOLS)))]
+        worker_ids = [f"{options['worker_prefix']}-{n}" for n in range(max(1, options["processes"]))]
+        static_members = worker_ids if options["static"] else None
+
+        # Spawned, not forked: each worker sets Django up and builds its own event loop and channel layer.
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=_worker_main, name=worker_id,
+                args=(worker_id, symbols, static_members, options["duration"], options["in_memory_layer"], results),
+            )
+            for worker_id in worker_ids
+        ]
+        for process in processes:
+            process.start()
+        target = f"{len(symbols)} symbols" if symbols else "the registry's Binance symbols"
+        self.stdout.write(self.style.SUCCESS(
+            f"Started {len(processes)} shard workers for {target}: {', '.join(worker_ids)}"
+        ))
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # The workers got the same SIGINT and leave the ring on their own.
+            for process in processes:
+                process.join()
+
+        reports = []
+        while not results.empty():
+            reports.append(results.get())
+        total = 0.0
+        for worker_id, owned, ticks, seconds in sorted(reports):
+            rate = ticks / seconds if seconds else 0
+            total += rate
+            self.stdout.write(f"  {worker_id}: {owned} symbols, {ticks} ticks, {rate:.0f} ticks/s")
+        if reports:
+            self.stdout.write(f"Total: {total:.0f} ticks/s across {len(reports)} workers")
@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backendapp.journal import JournalReader
+
+
+def _parse_time(value):
+    if value is None:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1_000_000)
+
+
+class Command(BaseCommand):
+    help = "Print journaled raw frames for a source as JSON lines, optionally limited to a time range."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Journal source, e.g. binance or fyers")
+        parser.add_argument("--dir", default=None, help="Journal directory (default: FEED_JOURNAL_DIR)")
+        parser.add_argument("--from", dest="start", default=None, help="ISO-8601 start time (UTC if naive)")
+        parser.add_argument("--to", dest="end", default=None, help="ISO-8601 end time (UTC if naive)")
+        parser.add_argument("--limit", type=int, default=0)
+
+    def handle(self, *args, **options):
+        directory = options["dir"] or getattr(settings, "FEED_JOURNAL_DIR", None)
+        if not directory:
+            raise CommandError("No journal directory: pass --dir or set FEED_JOURNAL_DIR")
+        reader = JournalReader(directory, options["source"])
+        written = 0
+        for received_us, payload in reader.iter_frames(_parse_time(options["start"]), _parse_time(options["end"])):
+            self.stdout.write(f'{{"received_us":{received_us},"frame":{payload.decode()}}}')
+            written += 1
+            if options["limit"] and written >= options["limit"]:
+                break
@@ -0,0 +1,61 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from backendapp.data_list import CRYPTO_SYMBOLS
+from backendapp.fake_exchange import FakeExchangeConfig, start_fake_exchange
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local fake Binance exchange (REST + WebSocket) for offline benchmarks. "
+        "Point the app at it with BINANCE_API_URL=http://HOST:PORT/api and "
+        "BINANCE_STREAM_URL=ws://HOST:PORT/"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=9900)
+        parser.add_argument("--symbols", type=int, default=0,
+                            help="Number of symbols to serve (default: CRYPTO_SYMBOLS). Extra ones are synthetic.")
+        parser.add_argument("--tick-rate", type=float, default=10.0, help="Events per second per stream")
+        parser.add_argument("--latency-ms", type=float, default=0.0)
+        parser.add_argument("--jitter-ms", type=float, default=0.0)
+        parser.add_argument("--disconnect-every", type=float, default=0.0,
+                            help="Force-close every WebSocket after this many seconds (0 = never)")
+        parser.add_argument("--rate-limit-weight", type=int, default=6000,
+                            help="REST weight allowed per minute before 429s (0 = unlimited)")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--depth-levels", type=int, default=200, help="Initial order book levels per side")
+        parser.add_argument("--depth-changes", type=int, default=20, help="Level changes per 100ms depth diff")
+        parser.add_argument("--depth-gap-every", type=float, default=0.0,
+                            help="Drop one depth diff per stream this often, in seconds, to force resyncs (0 = never)")
+
+    def handle(self, *args, **options):
+        symbols = list(CRYPTO_SYMBOLS)
+        count = options["symbols"]
+        if count:
+            symbols = symbols[:count] + [f"SYN{i}USDT" for i in range(max(0, count - len(symbols)))]
+        config = FakeExchangeConfig(
+            symbols=symbols,
+            tick_rate=options["tick_rate"],
+            latency_ms=options["latency_ms"],
+            jitter_ms=options["jitter_ms"],
+            disconnect_every=options["disconnect_every"],
+            rate_limit_weight=options["rate_limit_weight"],
+            seed=options["seed"],
+            depth_levels=options["depth_levels"],
+            depth_changes=options["depth_changes"],
+            depth_gap_every=options["depth_gap_every"],
+        )
+        asyncio.run(self._serve(config, options["host"], options["port"]))
+
+    async def _serve(self, config, host, port):
+        _, runner = await start_fake_exchange(config, host, port)
+        self.stdout.write(self.style.SUCCESS(
+            f"Fake exchange on http://{host}:{port} ({len(config.symbols)} symbols, {config.tick_rate} ticks/s)"
+        ))
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
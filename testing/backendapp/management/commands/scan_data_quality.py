@@ -0,0 +1,74 @@
+import json
+import time
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from backendapp.quality import SCAN_SOURCES, interval_seconds, scan_symbol
+
+
+class Command(BaseCommand):
+    help = "Scan stored candles for gaps, duplicates, placeholder runs and bad OHLC rows; writes a JSON range report"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", choices=sorted(SCAN_SOURCES), default="binance")
+        parser.add_argument("--symbols", nargs="+", default=None, help="Symbols to scan (default: all in the table)")
+        parser.add_argument("--interval", default="5m", help="Expected candle interval (default 5m)")
+        parser.add_argument("--session-tz", default=None,
+                            help="Ignore gaps spanning a local date change in this timezone "
+                                 "(default: the source's exchange timezone; 'none' to disable)")
+        parser.add_argument("--min-placeholder-run", type=int, default=3,
+                            help="Identical OHLCV rows in a row before they count as placeholders")
+        parser.add_argument("--chunk-size", type=int, default=200_000)
+        parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+
+    def handle(self, *args, **opts):
+        scan = SCAN_SOURCES[opts["source"]]
+        model_name, source = scan["model"], scan["source"]
+        try:
+            interval = interval_seconds(opts["interval"])
+        except (KeyError, ValueError):
+            raise CommandError(f"Unsupported interval {opts['interval']}")
+        # Exchange-hours sources: gaps across a local date change are market closures.
+        if opts["session_tz"] == "none":
+            tz = None
+        elif opts["session_tz"]:
+            try:
+                tz = ZoneInfo(opts["session_tz"])
+            except (ValueError, ZoneInfoNotFoundError):
+                raise CommandError(f"Unknown timezone {opts['session_tz']}")
+        else:
+            tz = scan["session_tz"]
+
+        symbols = opts["symbols"]
+        if not symbols:
+            rows = apps.get_model("backendapp", model_name).objects.all()
+            if source is not None:
+                rows = rows.filter(source=source)
+            symbols = list(rows.values_list("symbol", flat=True).distinct().order_by("symbol"))
+
+        report = {
+            "source": opts["source"],
+            "interval": opts["interval"],
+            "session_tz": tz.key if tz else None,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "symbols": {},
+        }
+        for symbol in symbols:
+            started = time.perf_counter()
+            result = scan_symbol(
+                model_name, symbol.upper(), interval, tz, opts["min_placeholder_run"], opts["chunk_size"], source,
+            )
+            report["symbols"][symbol.upper()] = result
+            found = ", ".join(f"{kind}={count}" for kind, count in result["counts"].items() if count) or "clean"
+            self.stderr.write(f"{symbol.upper()}: {result['rows']} rows in {time.perf_counter() - started:.2f}s ({found})")
+
+        text = json.dumps(report, indent=1)
+        if opts["output"]:
+            with open(opts["output"], "w") as f:
+                f.write(text)
+            self.stderr.write(self.style.SUCCESS(f"Report written to {opts['output']}"))
+        else:
+            self.stdout.write(text)
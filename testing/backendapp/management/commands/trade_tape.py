@@ -0,0 +1,48 @@
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backendapp.trade_tape import TapeReader
+
+
+def _parse_time(value, default):
+    if value is None:
+        return default
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+class Command(BaseCommand):
+    help = "Summarize a symbol's aggTrade tape over a time range: trades, storage per trade, VWAP and volume profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument("symbol")
+        parser.add_argument("--dir", default=None, help="Tape directory (default: TRADE_TAPE_DIR)")
+        parser.add_argument("--from", dest="start", default=None, help="ISO-8601 start time (UTC if naive; default: an hour ago)")
+        parser.add_argument("--to", dest="end", default=None, help="ISO-8601 end time (UTC if naive; default: now)")
+        parser.add_argument("--bucket", default=None, help="Volume profile price width, e.g. 10 (default: 20 buckets)")
+
+    def handle(self, *args, **options):
+        directory = options["dir"] or getattr(settings, "TRADE_TAPE_DIR", None)
+        if not directory:
+            raise CommandError("No tape directory: pass --dir or set TRADE_TAPE_DIR")
+        now_ms = int(time.time() * 1000)
+        end_ms = _parse_time(options["end"], now_ms)
+        start_ms = _parse_time(options["start"], end_ms - 3_600_000)
+        reader = TapeReader(directory)
+        started = time.perf_counter()
+        tape = reader.read(options["symbol"].upper(), start_ms, end_ms)
+        elapsed = time.perf_counter() - started
+        stored = reader.stored_bytes(tape.symbol, start_ms, end_ms)
+        self.stdout.write(f"{tape.symbol}: {len(tape)} trades read in {elapsed * 1000:.1f}ms")
+        if not len(tape):
+            return
+        # Whole hour files count toward storage, so this is exact only for whole-hour ranges.
+        self.stdout.write(f"Stored: {stored} bytes in hour files, {stored / len(tape):.2f} bytes/trade")
+        self.stdout.write(f"Volume: {tape.volume()}  VWAP: {tape.vwap():.{tape.price_scale}f}")
+        for level in tape.volume_profile(options["bucket"], buckets=20):
+            self.stdout.write(f"  {level['price']:>18}  {level['volume']:>20}  buy {level['buy_volume']}")
@@ -0,0 +1,273 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Minimal in-process metrics registry rendered in the Prometheus text format.
+# Updating a series is a single dict operation so it can sit on the hot path;
+# all formatting work happens at scrape time.
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return labels
+
+    def samples(self):
+        for key, value in list(self._values.items()):
+            yield self.name, key, None, value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, *labels, amount=1):
+        values = self._values
+        values[labels] = values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        # Optional callable returning {label_tuple: value}, evaluated at scrape time.
+        self._callback = callback
+
+    def set(self, *labels, value):
+        self._values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        values = self._values
+        values[labels] = values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def samples(self):
+        if self._callback is not None:
+            try:
+                for key, value in self._callback().items():
+                    yield self.name, key, None, value
+            except Exception:
+                return
+        else:
+            yield from super().samples()
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, *labels, value):
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values.setdefault(labels, [[0] * len(self.buckets), 0, 0.0])
+        counts = state[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        state[1] += 1
+        state[2] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*labels, value=time.perf_counter() - start)
+
+    def samples(self):
+        for key, (counts, count, total) in list(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", key, (("le", _format_value(float(bound))),), cumulative
+            yield f"{self.name}_count", key, None, count
+            yield f"{self.name}_sum", key, None, total
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                return self._metrics[metric.name]
+            self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector):
+        """Register a callable returning extra exposition lines at scrape time."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self.register(Gauge(name, documentation, labelnames, callback=callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets=buckets))
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collector in list(self._collectors):
+            try:
+                lines.extend(collector())
+            except Exception:
+                continue
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# --- Streaming pipeline series ---
+
+# Consumers register themselves here so queue depths can be read at scrape time.
+_live_consumers = {}
+# Queues owned by shared feeds rather than a single consumer: {(consumer, queue): queue}
+_shared_queues = {}
+
+
+def track_consumer(kind, consumer):
+    _live_consumers.setdefault(kind, set()).add(consumer)
+    connected_clients.inc(kind)
+
+
+def untrack_consumer(kind, consumer):
+    consumers = _live_consumers.get(kind)
+    if consumers and consumer in consumers:
+        consumers.discard(consumer)
+        connected_clients.dec(kind)
+
+
+def track_queue(kind, name, queue):
+    _shared_queues[(kind, name)] = queue
+
+
+def untrack_queue(kind, name):
+    _shared_queues.pop((kind, name), None)
+
+
+def _queue_depths():
+    depths = {key: queue.qsize() for key, queue in list(_shared_queues.items())}
+    for kind, consumers in list(_live_consumers.items()):
+        for consumer in list(consumers):
+            for queue_name in ("_send_queue", "_queue", "_channel_queue"):
+                queue = getattr(consumer, queue_name, None)
+                if queue is not None:
+                    key = (kind, queue_name.strip("_"))
+                    depths[key] = depths.get(key, 0) + queue.qsize()
+            key = (kind, "pending_updates")
+            depths[key] = depths.get(key, 0) + len(getattr(consumer, "latest_updates", None) or ())
+    return depths
+
+
+connected_clients = registry.gauge(
+    "ws_connected_clients", "WebSocket clients currently connected.", ("consumer",)
+)
+queue_depth = registry.gauge(
+    "ws_queue_depth", "Items waiting in consumer queues and update buffers.",
+    ("consumer", "queue"), callback=_queue_depths,
+)
+upstream_sockets = registry.gauge(
+    "upstream_sockets_open", "Upstream market-data sockets currently open.", ("provider",)
+)
+upstream_reconnects = registry.counter(
+    "upstream_reconnects_total", "Upstream socket reconnect attempts.", ("provider", "symbol")
+)
+messages_in = registry.counter(
+    "stream_messages_in_total", "Upstream messages received.", ("provider", "symbol")
+)
+messages_out = registry.counter(
+    "stream_messages_out_total", "Symbol updates delivered to clients.", ("provider", "symbol")
+)
+messages_dropped = registry.counter(
+    "stream_messages_dropped_total", "Symbol updates dropped before reaching a client.", ("provider", "symbol")
+)
+db_batch_rows = registry.histogram(
+    "db_batch_rows", "Rows per database write batch.", ("table",), buckets=SIZE_BUCKETS
+)
+db_write_seconds = registry.histogram(
+    "db_write_seconds", "Database write batch latency.", ("table",)
+)
+backfill_rows = registry.counter(
+    "backfill_rows_total", "Historical rows fetched by backfill jobs.", ("provider", "symbol")
+)
+
+
+@contextmanager
+def observe_db_write(table, rows):
+    db_batch_rows.observe(table, value=rows)
+    with db_write_seconds.time(table):
+        yield
+
+
+def _latency_collector():
+    from backendapp.latency import latency_tracker
+
+    name = "stream_latency_microseconds"
+    lines = [f"# HELP {name} Pipeline stage latency percentiles.", f"# TYPE {name} summary"]
+    for stage, symbols in latency_tracker.snapshot().items():
+        for symbol, summary in symbols.items():
+            base = (("stage", stage), ("symbol", symbol))
+            for quantile, field in (("0.5", "p50_us"), ("0.99", "p99_us"), ("0.999", "p999_us")):
+                labels = _format_labels((), (), base + (("quantile", quantile),))
+                lines.append(f"{name}{labels} {summary[field]}")
+            lines.append(f"{name}_sum{_format_labels((), (), base)} {summary['sum_us']}")
+            lines.append(f"{name}_count{_format_labels((), (), base)} {summary['count']}")
+    return lines
+
+
+registry.add_collector(_latency_collector)
@@ -0,0 +1,89 @@
+# Range-partition the candle tables by month on Postgres.
+#
+# Each table is rebuilt as a partitioned table keyed on "timestamp". Postgres
+# requires the primary key of a partitioned table to include the partition
+# key, so the physical primary key becomes (symbol, timestamp) under the name
+# of the existing unique constraint. That also lets different symbols share a
+# timestamp. Other databases are skipped.
+#
+# The Django model state is deliberately left alone: Django 5.1 has no way to
+# declare a composite primary key, so the models still say timestamp is the
+# primary key while Postgres says (symbol, timestamp). Consequences:
+#   - per-row save()/delete() and get(pk=...) would hit every symbol at that
+#     timestamp; CandleModel refuses save()/delete(), and the code only uses
+#     bulk_create(ignore_conflicts=True) and filter();
+#   - a later autodetected migration that alters these tables' primary key or
+#     timestamp column would target "<table>_pkey", which no longer exists on
+#     Postgres; write such changes as RunSQL by hand.
+
+from datetime import datetime, timedelta, timezone
+
+from django.db import migrations
+
+from backendapp.partitions import (
+    CANDLE_TABLES, create_partition_sql, default_partition_name, forget_cached_state, months_between,
+)
+
+UNIQUE_CONSTRAINTS = {
+    "binancedata": "unique_Binance_Data_symbol_timestamp",
+    "HistoryData": "unique_historydata_symbol_timestamp",
+    "IbApi_Data": "unique_IbApi_Data_symbol_timestamp",
+}
+
+
+def partition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    now = datetime.now(timezone.utc)
+    with schema_editor.connection.cursor() as cursor:
+        for table in CANDLE_TABLES:
+            legacy = f"{table}_legacy"
+            constraint = UNIQUE_CONSTRAINTS[table]
+            cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+            cursor.execute(f'ALTER TABLE "{legacy}" DROP CONSTRAINT IF EXISTS "{constraint}"')
+            cursor.execute(
+                f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS, '
+                f'CONSTRAINT "{constraint}" PRIMARY KEY ("symbol", "timestamp")) '
+                f'PARTITION BY RANGE ("timestamp")'
+            )
+            cursor.execute(f'SELECT MIN("timestamp"), MAX("timestamp") FROM "{legacy}"')
+            first, last = cursor.fetchone()
+            start = min(first or now, now)
+            end = max(last or now, now) + timedelta(days=92)  # three months ahead
+            for month in months_between(start, end):
+                cursor.execute(create_partition_sql(table, month))
+            cursor.execute(f'CREATE TABLE "{default_partition_name(table)}" PARTITION OF "{table}" DEFAULT')
+            cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}" ON CONFLICT DO NOTHING')
+            cursor.execute(f'DROP TABLE "{legacy}"')
+    forget_cached_state()
+
+
+def unpartition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in CANDLE_TABLES:
+            partitioned = f"{table}_partitioned"
+            constraint = UNIQUE_CONSTRAINTS[table]
+            cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{partitioned}"')
+            cursor.execute(f'ALTER TABLE "{partitioned}" DROP CONSTRAINT "{constraint}"')
+            cursor.execute(
+                f'CREATE TABLE "{table}" (LIKE "{partitioned}" INCLUDING DEFAULTS, '
+                f'CONSTRAINT "{table}_pkey" PRIMARY KEY ("timestamp"), '
+                f'CONSTRAINT "{constraint}" UNIQUE ("symbol", "timestamp"))'
+            )
+            # The original primary key is the timestamp alone, so rows sharing a timestamp collapse.
+            cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{partitioned}" ON CONFLICT DO NOTHING')
+            cursor.execute(f'DROP TABLE "{partitioned}" CASCADE')
+    forget_cached_state()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backendapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backendapp', '0002_partition_candle_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=20)),
+                ('symbol', models.CharField(max_length=20)),
+                ('resolution', models.CharField(max_length=10)),
+                ('range_start', models.DateTimeField()),
+                ('completed_through', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'backfill_progress',
+                'constraints': [models.UniqueConstraint(fields=('provider', 'symbol', 'resolution'), name='unique_backfill_progress_provider_symbol_resolution')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backendapp', '0003_backfill_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historydata',
+            name='source',
+            field=models.CharField(db_default='fyers', max_length=10),
+        ),
+    ]
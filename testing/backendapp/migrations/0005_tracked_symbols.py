@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:46
+
+from django.db import migrations, models
+
+
+def seed_symbols(apps, schema_editor):
+    """Start the registry from the lists in data_list, which used to be the only source."""
+    from backendapp.data_list import CRYPTO_SYMBOLS, FYERS_SYMBOLS, IB_SYMBOLS
+
+    TrackedSymbol = apps.get_model('backendapp', 'TrackedSymbol')
+    rows = []
+    for provider, symbols in (('binance', CRYPTO_SYMBOLS), ('fyers', FYERS_SYMBOLS), ('ib', IB_SYMBOLS)):
+        for symbol in dict.fromkeys(symbols):
+            rows.append(TrackedSymbol(provider=provider, symbol=symbol))
+    TrackedSymbol.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backendapp', '0004_historydata_source'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackedSymbol',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=20)),
+                ('symbol', models.CharField(max_length=40)),
+                ('enabled', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'tracked_symbols',
+                'ordering': ['provider', 'id'],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'symbol'), name='unique_tracked_symbols_provider_symbol')],
+            },
+        ),
+        migrations.RunPython(seed_symbols, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,30 @@
 from django.db import models
 
-class HistoryData(models.Model):
+
+class CandleModel(models.Model):
+    """
+    Base for the candle tables. The model state keys them on timestamp alone,
+    but on Postgres migration 0002 rebuilds them with PRIMARY KEY (symbol,
+    timestamp), which Django 5.1 cannot declare. Rows are written with
+    bulk_create(ignore_conflicts=True) and read with filter(); per-instance
+    save() and delete() would address every symbol at that timestamp, so they
+    are refused. get(pk=...) is ambiguous for the same reason, so the admin
+    only lists them (CandleAdmin).
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        raise NotImplementedError(f"{type(self).__name__} rows are written with bulk_create(ignore_conflicts=True)")
+
+    def delete(self, *args, **kwargs):
+        raise NotImplementedError(f"Delete {type(self).__name__} rows with filter(symbol=..., timestamp=...).delete()")
+
+
+class HistoryData(CandleModel):
+    # Shared by Fyers and IB candles; source is the provider name (see providers.py).
+    source = models.CharField(max_length=10, db_default="fyers")
     symbol = models.CharField(max_length=20)  
     timestamp = models.DateTimeField(primary_key=True)          
     open_price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -18,7 +42,7 @@ class HistoryData(models.Model):
             )
         ]
 
-class Binance_Data(models.Model):
+class Binance_Data(CandleModel):
     symbol = models.CharField(max_length=20)  
     timestamp = models.DateTimeField(primary_key=True)          
     open_price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -36,7 +60,7 @@ class Binance_Data(models.Model):
             )
         ]
         
-class IbApi_Data(models.Model):
+class IbApi_Data(CandleModel):
     symbol = models.CharField(max_length=20)  
     timestamp = models.DateTimeField(primary_key=True)          
     open_price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -52,4 +76,45 @@ class IbApi_Data(models.Model):
                 fields=['symbol', 'timestamp'],
                 name='unique_IbApi_Data_symbol_timestamp'
             )
-        ]
\ No newline at end of file
+        ]
+
+
+class BackfillProgress(models.Model):
+    """How far a provider's history backfill has got for one symbol, so interrupted runs resume."""
+    provider = models.CharField(max_length=20)
+    symbol = models.CharField(max_length=20)
+    resolution = models.CharField(max_length=10)
+    range_start = models.DateTimeField()
+    completed_through = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'backfill_progress'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['provider', 'symbol', 'resolution'],
+                name='unique_backfill_progress_provider_symbol_resolution'
+            )
+        ]
+
+
+class TrackedSymbol(models.Model):
+    """One symbol a live feed subscribes to; managed at runtime through backendapp.symbols."""
+    provider = models.CharField(max_length=20)
+    symbol = models.CharField(max_length=40)
+    enabled = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'tracked_symbols'
+        ordering = ['provider', 'id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['provider', 'symbol'],
+                name='unique_tracked_symbols_provider_symbol'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.provider}:{self.symbol}"
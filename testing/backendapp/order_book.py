@@ -0,0 +1,271 @@
+import asyncio
+import json
+import logging
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from sortedcontainers import SortedDict
+
+from backendapp import metrics, symbols as symbol_registry
+from backendapp.binance_client import create_client, create_socket_manager
+from backendapp.feed_supervisor import supervisor
+from backendapp.fixed_point import binance_scales, format_scaled, to_scaled
+
+logger = logging.getLogger(__name__)
+
+# Local Binance order books built from <symbol>@depth@100ms diff streams.
+# A book starts from a REST depth snapshot. Diffs at or below the snapshot's
+# lastUpdateId are dropped. The first diff applied must cover
+# lastUpdateId + 1, and every later diff must start at the previous one's
+# u + 1. Anything else means updates were lost, for example while the socket
+# manager reconnected underneath us, so the book is rebuilt from a new
+# snapshot on the same socket. Reconnecting is left to the feed supervisor,
+# and each new socket starts again from a fresh snapshot. Levels are
+# fixed-point ints in SortedDicts, so applying a level is O(log n) and
+# reading the top N is O(log n + N).
+#
+# Clients subscribe to one symbol at a depth tier (5, 10 or 20 levels) and
+# join that tier's group. Every ORDER_BOOK_PUSH_INTERVAL the publisher
+# serializes each changed book once per subscribed tier and skips tiers whose
+# levels did not change, so clients get at most one frame per interval
+# however fast the diffs arrive.
+
+TIERS = (5, 10, 20)
+
+book_diffs = metrics.registry.counter(
+    "orderbook_diffs_total", "Depth diff events applied to local order books.", ("symbol",)
+)
+book_resyncs = metrics.registry.counter(
+    "orderbook_resyncs_total", "Order book rebuilds from a new snapshot after an update ID gap.", ("symbol",)
+)
+
+
+def tier(depth):
+    """Smallest published depth with at least `depth` levels; the deepest one beyond that."""
+    for size in TIERS:
+        if depth <= size:
+            return size
+    return TIERS[-1]
+
+
+def group_name(symbol, depth):
+    return f"orderbook.{symbol}.{depth}"
+
+
+class BookGap(Exception):
+    pass
+
+
+class OrderBook:
+    """
+    One symbol's price levels as fixed-point ints. Asks are keyed by price and
+    bids by negated price, so both sides iterate best level first.
+    """
+
+    def __init__(self, symbol, price_scale, qty_scale):
+        self.symbol = symbol
+        self.price_scale = price_scale
+        self.qty_scale = qty_scale
+        self.bids = SortedDict()
+        self.asks = SortedDict()
+        self.last_update_id = 0
+        self.event_time = None
+        self.version = 0  # bumped by every change, so publishers can skip untouched books
+
+    def load(self, snapshot):
+        """A REST depth snapshot replaces the book."""
+        self.bids.clear()
+        self.asks.clear()
+        self._update(self.bids, snapshot["bids"], -1)
+        self._update(self.asks, snapshot["asks"], 1)
+        self.last_update_id = snapshot["lastUpdateId"]
+        self.version += 1
+
+    def apply(self, event):
+        """
+        Apply a depthUpdate event. Returns False for one the book already
+        contains and raises BookGap when update IDs were skipped.
+        """
+        last = event["u"]
+        if last <= self.last_update_id:
+            return False
+        # A diff straddling lastUpdateId only happens right after a snapshot; afterwards U is always the previous u + 1.
+        if event["U"] > self.last_update_id + 1:
+            raise BookGap(f"{self.symbol} expected update {self.last_update_id + 1}, got {event['U']}..{last}")
+        self._update(self.bids, event["b"], -1)
+        self._update(self.asks, event["a"], 1)
+        self.last_update_id = last
+        self.event_time = event.get("E")
+        self.version += 1
+        return True
+
+    def _update(self, side, levels, sign):
+        p, q = self.price_scale, self.qty_scale
+        for price, qty in levels:
+            key = sign * to_scaled(price, p)
+            qty = to_scaled(qty, q)
+            if qty:
+                side[key] = qty
+            else:
+                side.pop(key, None)
+
+    def top(self, n):
+        """The best n levels per side as [[price, qty], ...] decimal strings."""
+        p, q = self.price_scale, self.qty_scale
+        return (
+            [[format_scaled(-key, p), format_scaled(qty, q)] for key, qty in self.bids.items()[:n]],
+            [[format_scaled(key, p), format_scaled(qty, q)] for key, qty in self.asks.items()[:n]],
+        )
+
+    def message(self, bids, asks):
+        return json.dumps({
+            "symbol": self.symbol, "lastUpdateId": self.last_update_id, "E": self.event_time,
+            "bids": bids, "asks": asks,
+        })
+
+
+class OrderBookFeed:
+    """
+    The books clients of this process subscribed to. acquire() starts
+    maintaining a symbol's book on its first subscriber and release() stops it
+    after the last one; the Binance client and the publisher task live while
+    any book does.
+    """
+
+    def __init__(self, push_interval=None, snapshot_limit=None):
+        self.push_interval = push_interval or getattr(settings, "ORDER_BOOK_PUSH_INTERVAL", 0.25)
+        self.snapshot_limit = snapshot_limit or getattr(settings, "ORDER_BOOK_SNAPSHOT_LIMIT", 1000)
+        self.books = {}  # symbol -> OrderBook in sync with the stream
+        self.streams = {}  # symbol -> supervised maintain stream
+        self.refs = {}  # (symbol, tier) -> subscribers
+        self.pushed = {}  # symbol -> book version last published
+        self.sent = {}  # (symbol, tier) -> (bids, asks) last published
+        self.client = None
+        self.bm = None
+        self.publisher = None
+        self.diffs = 0
+        self.resyncs = 0
+        self._lock = None
+
+    def _get_lock(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def acquire(self, symbol, depth):
+        """Count a subscriber; returns (symbol, tier). Raises SymbolRejected for symbols Binance does not trade."""
+        async with self._get_lock():
+            if self.client is None:
+                self.client = await create_client()
+                self.bm = create_socket_manager(self.client)
+                self.publisher = asyncio.create_task(self._publish())
+            try:
+                symbol = await symbol_registry.validate("binance", symbol, self.client)
+            except Exception:
+                if not self.refs:
+                    await self._stop()
+                raise
+            key = (symbol, tier(depth))
+            self.refs[key] = self.refs.get(key, 0) + 1
+            if symbol not in self.streams:
+                self.streams[symbol] = self._supervise(symbol)
+            return key
+
+    async def release(self, symbol, depth):
+        async with self._get_lock():
+            key = (symbol, depth)
+            if key not in self.refs:
+                return
+            self.refs[key] -= 1
+            if self.refs[key]:
+                return
+            del self.refs[key]
+            self.sent.pop(key, None)
+            if not any(s == symbol for s, _ in self.refs):
+                self.streams.pop(symbol).cancel()
+                self.books.pop(symbol, None)
+                self.pushed.pop(symbol, None)
+            if not self.refs:
+                await self._stop()
+
+    async def _stop(self):
+        tasks = [stream.task for stream in self.streams.values()] + [self.publisher]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.streams.clear()
+        self.books.clear()
+        self.pushed.clear()
+        await self.client.close_connection()
+        self.client = self.bm = self.publisher = None
+
+    def view(self, symbol, depth):
+        """Current top-`depth` message for a new subscriber, or None while the book is not synced yet."""
+        book = self.books.get(symbol)
+        return book.message(*book.top(depth)) if book else None
+
+    # --- upstream ---
+
+    def _supervise(self, symbol):
+        return supervisor.start(
+            "binance", symbol,
+            lambda: self.bm.depth_socket(symbol, interval=100),
+            lambda feed: self._maintain(symbol, feed),
+        )
+
+    async def _maintain(self, symbol, feed):
+        """Keep books[symbol] in sync, resyncing on gaps; the feed supervisor reconnects the socket."""
+        while True:
+            try:
+                await self._follow(symbol, feed)
+            except BookGap as e:
+                logger.warning(f"Order book gap, resyncing: {e}")
+                book_resyncs.inc(symbol)
+                self.resyncs += 1
+
+    async def _follow(self, symbol, feed):
+        """Bootstrap a book from a snapshot, then apply diffs until a gap raises BookGap."""
+        # Diffs keep queueing on the socket while the snapshot is fetched.
+        first = await feed.recv()
+        p, q = binance_scales.get(symbol)
+        book = OrderBook(symbol, p, q)
+        while True:
+            book.load(await self.client.get_order_book(symbol=symbol, limit=self.snapshot_limit))
+            if book.last_update_id >= first["U"]:
+                break
+            await asyncio.sleep(0.1)
+        self.books[symbol] = book
+        event = first
+        while True:
+            if book.apply(event):
+                self.diffs += 1
+                book_diffs.inc(symbol)
+            event = await feed.recv()
+
+    # --- clients ---
+
+    async def _publish(self):
+        layer = get_channel_layer()
+        while True:
+            await asyncio.sleep(self.push_interval)
+            tiers = {}
+            for symbol, depth in list(self.refs):
+                tiers.setdefault(symbol, []).append(depth)
+            for symbol, depths in tiers.items():
+                book = self.books.get(symbol)
+                if book is None or self.pushed.get(symbol) == book.version:
+                    continue
+                self.pushed[symbol] = book.version
+                bids, asks = book.top(max(depths))
+                for depth in depths:
+                    levels = bids[:depth], asks[:depth]
+                    # Changes below this tier's depth leave its view as it was.
+                    if self.sent.get((symbol, depth)) == levels:
+                        continue
+                    self.sent[(symbol, depth)] = levels
+                    try:
+                        await layer.group_send(group_name(symbol, depth), {
+                            "type": "send.book", "symbol": symbol, "text": book.message(*levels),
+                        })
+                    except Exception as e:
+                        logger.error(f"Error publishing {symbol} order book: {e}")
@@ -0,0 +1,144 @@
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Monthly RANGE partitioning of the candle tables on Postgres. Each table gets
+# one partition per calendar month ("<table>_pYYYYMM") plus a DEFAULT
+# partition that catches rows for months nobody created yet. Old months can be
+# detached (and archived or dropped) without touching the rest of the table.
+
+CANDLE_TABLES = ("binancedata", "HistoryData", "IbApi_Data")
+
+# (table, "YYYYMM") pairs known to exist in this process, to skip repeated DDL.
+_known_partitions = set()
+_partitioned_tables = {}
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(moment):
+    return datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def months_between(start, end):
+    """Yield the first instant of every month touching [start, end]."""
+    month = month_start(start)
+    while month <= end:
+        yield month
+        month = next_month(month)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table):
+    return f"{table}_default"
+
+
+def create_partition_sql(table, month):
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, month)}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+    )
+
+
+def move_from_default_sql(table, month):
+    """
+    Statements that create a month partition when the DEFAULT partition
+    already holds rows for that month (plain CREATE fails in that case).
+    Run them inside one transaction.
+    """
+    default = default_partition_name(table)
+    bounds = f"\"timestamp\" >= '{month.isoformat()}' AND \"timestamp\" < '{next_month(month).isoformat()}'"
+    return [
+        f'ALTER TABLE "{table}" DETACH PARTITION "{default}"',
+        create_partition_sql(table, month),
+        f'INSERT INTO "{table}" SELECT * FROM "{default}" WHERE {bounds}',
+        f'DELETE FROM "{default}" WHERE {bounds}',
+        f'ALTER TABLE "{table}" ATTACH PARTITION "{default}" DEFAULT',
+    ]
+
+
+IS_PARTITIONED_SQL = "SELECT relkind = 'p' FROM pg_class WHERE relname = %s AND relkind IN ('r', 'p')"
+# Serializes partition DDL per table so concurrent writers don't race on CREATE TABLE IF NOT EXISTS.
+LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext(%s))"
+
+
+def ensure_partitions(cursor, table, start, end):
+    """Create monthly partitions covering [start, end] using a DB-API cursor (sync)."""
+    from django.db import transaction
+    from django.db.utils import IntegrityError
+
+    if table not in _partitioned_tables:
+        cursor.execute(IS_PARTITIONED_SQL, [table])
+        row = cursor.fetchone()
+        _partitioned_tables[table] = bool(row and row[0])
+    if not _partitioned_tables[table]:
+        return
+    for month in months_between(start, end):
+        key = (table, f"{month:%Y%m}")
+        if key in _known_partitions:
+            continue
+        try:
+            with transaction.atomic():
+                cursor.execute(LOCK_SQL, [table])
+                cursor.execute(create_partition_sql(table, month))
+        except IntegrityError:
+            with transaction.atomic():
+                cursor.execute(LOCK_SQL, [table])
+                for statement in move_from_default_sql(table, month):
+                    cursor.execute(statement)
+        _known_partitions.add(key)
+
+
+async def ensure_partitions_async(conn, table, start, end):
+    """Create monthly partitions covering [start, end] on a psycopg 3 AsyncConnection."""
+    import psycopg
+
+    if table not in _partitioned_tables:
+        cur = await conn.execute(IS_PARTITIONED_SQL, (table,))
+        row = await cur.fetchone()
+        _partitioned_tables[table] = bool(row and row[0])
+    if not _partitioned_tables[table]:
+        return
+    for month in months_between(start, end):
+        key = (table, f"{month:%Y%m}")
+        if key in _known_partitions:
+            continue
+        try:
+            async with conn.transaction():
+                await conn.execute(LOCK_SQL, (table,))
+                await conn.execute(create_partition_sql(table, month))
+        except psycopg.errors.CheckViolation:
+            logger.info(f"Moving {month:%Y-%m} rows out of the default partition of {table}")
+            async with conn.transaction():
+                await conn.execute(LOCK_SQL, (table,))
+                for statement in move_from_default_sql(table, month):
+                    await conn.execute(statement)
+        _known_partitions.add(key)
+
+
+def list_partitions(cursor, table):
+    """Return [(partition_name, bound_expression)] for a partitioned table."""
+    cursor.execute(
+        """
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = %s
+        ORDER BY child.relname
+        """,
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def forget_cached_state():
+    """Drop cached partition knowledge (after detaching or dropping partitions)."""
+    _known_partitions.clear()
+    _partitioned_tables.clear()
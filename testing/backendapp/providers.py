@@ -0,0 +1,190 @@
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from backendapp.fixed_point import binance_scales, format_scaled, to_scaled
+from backendapp.ticks import Candle, Tick
+
+# Provider plugins. A provider knows one market's payloads: how to turn them
+# into Tick/Candle records, how its symbols are stored, which table and
+# source tag its candles go to, and the JSON shape its clients expect. The
+# shared TickPipeline and the history/backfill code take a provider instead
+# of hard-coding any of that, so adding a market means adding a class here
+# and registering it.
+
+
+class Provider:
+    name = None                # source tag: stored with candles, used as the metrics label
+    model_name = None          # candle table
+    session_tz = None          # exchange timezone; gaps within one local date are filled flat
+    # True when tick volume is a running total (e.g. the day's volume), so a
+    # candle's volume is last - first; False when each tick carries its own.
+    cumulative_volume = True
+
+    def storage_symbol(self, symbol):
+        """Feed symbol -> the symbol stored in the candle table."""
+        return symbol
+
+    def tick(self, raw):
+        """Provider payload -> Tick, or None to ignore it."""
+        raise NotImplementedError
+
+    def message(self, tick):
+        """Tick -> the dict sent to this provider's WebSocket clients."""
+        return {
+            "symbol": tick.symbol,
+            "timestamp": tick.ts // 1000 if tick.ts is not None else None,
+            "open_price": tick.open,
+            "high_price": tick.high,
+            "low_price": tick.low,
+            "close_price": tick.price,
+            "volume": tick.volume,
+        }
+
+
+class FyersProvider(Provider):
+    name = "fyers"
+    model_name = "HistoryData"
+    session_tz = ZoneInfo("Asia/Kolkata")
+
+    def storage_symbol(self, symbol):
+        """'NSE:ICICIBANK-EQ' -> 'ICICIBANK'"""
+        return symbol.split(":")[1].split("-")[0] if ":" in symbol else symbol
+
+    def tick(self, message):
+        """Fyers SymbolUpdate: ltp is the price, last_traded_time (s) the time, vol_traded_today the volume."""
+        symbol = message.get("symbol")
+        if symbol is None:
+            return None
+        ts = message.get("last_traded_time")
+        return Tick(
+            self.name, symbol, int(ts) * 1000 if ts is not None else None, message.get("ltp"),
+            volume=message.get("vol_traded_today"),
+            open=message.get("open_price"), high=message.get("high_price"), low=message.get("low_price"),
+        )
+
+
+class BinanceProvider(Provider):
+    name = "binance"
+    model_name = "Binance_Data"
+
+    def storage_symbol(self, symbol):
+        return symbol.upper()
+
+    # Prices and quantities are fixed-point ints scaled by the symbol's exchangeInfo tick/step size.
+
+    def tick(self, raw):
+        """(trade event, kline event) pair from the per-symbol streams; price and OHLCV of the open kline."""
+        trade, kline_event = raw
+        kline = kline_event.get("k", {})
+        symbol = trade.get("s") or kline.get("s")
+        p, q = binance_scales.get(symbol)
+        return Tick(
+            self.name, symbol, trade.get("T"), to_scaled(kline["c"], p),
+            volume=to_scaled(kline["v"], q), open=to_scaled(kline["o"], p),
+            high=to_scaled(kline["h"], p), low=to_scaled(kline["l"], p),
+            price_scale=p, qty_scale=q,
+        )
+
+    def stored_tick(self, row):
+        """Stored candle row (symbol, timestamp, open, high, low, close, volume) -> Tick at its close, for replay."""
+        symbol, timestamp, open_price, high_price, low_price, close_price, volume = row
+        symbol = symbol.upper()
+        p, q = binance_scales.get(symbol)
+        # Stored history can carry more decimals than today's tick/step size; widen the scale rather than drop them.
+        p = max(p, *(_decimals(price) for price in (open_price, high_price, low_price, close_price)))
+        q = max(q, _decimals(volume))
+        # format(..., "f") keeps Decimal columns out of exponent notation
+        return Tick(
+            self.name, symbol, int(timestamp.timestamp() * 1000), to_scaled(format(close_price, "f"), p),
+            volume=to_scaled(format(volume, "f"), q), open=to_scaled(format(open_price, "f"), p),
+            high=to_scaled(format(high_price, "f"), p), low=to_scaled(format(low_price, "f"), p),
+            price_scale=p, qty_scale=q,
+        )
+
+    def candle(self, symbol, kline):
+        """REST kline array -> Candle."""
+        symbol = symbol.upper()
+        p, q = binance_scales.get(symbol)
+        return Candle(
+            self.name, symbol, kline[0] // 1000, to_scaled(kline[1], p), to_scaled(kline[2], p),
+            to_scaled(kline[3], p), to_scaled(kline[4], p), to_scaled(kline[5], q), p, q,
+        )
+
+    def stream_candle(self, symbol, kline):
+        """The "k" object of a kline stream event -> Candle."""
+        p, q = binance_scales.get(symbol)
+        return Candle(
+            self.name, symbol, kline["t"] // 1000, to_scaled(kline["o"], p), to_scaled(kline["h"], p),
+            to_scaled(kline["l"], p), to_scaled(kline["c"], p), to_scaled(kline["v"], q), p, q,
+        )
+
+    def message(self, tick):
+        p, q = tick.price_scale, tick.qty_scale
+        return {
+            "symbol": tick.symbol,
+            "timestamp": tick.ts,
+            "open": format_scaled(tick.open, p),
+            "high": format_scaled(tick.high, p),
+            "low": format_scaled(tick.low, p),
+            "close": format_scaled(tick.price, p),
+            "volume": format_scaled(tick.volume, q),
+        }
+
+
+class IbProvider(Provider):
+    name = "ib"
+    model_name = "HistoryData"
+    session_tz = ZoneInfo("America/New_York")
+    # Quotes carry no volume; each 5-second real-time bar carries its own.
+    cumulative_volume = False
+
+    def tick(self, raw):
+        """A RealTimeBarList with a new bar, or a Ticker with a new quote."""
+        bar = raw[-1] if isinstance(raw, list) else None
+        if bar is not None:
+            return Tick(
+                self.name, raw.contract.symbol, int(bar.time.timestamp() * 1000), bar.close,
+                volume=bar.volume, open=bar.open_, high=bar.high, low=bar.low,
+            )
+        last = _number(raw.last)
+        if last is None or raw.time is None:
+            return None
+        return Tick(
+            self.name, raw.contract.symbol, int(raw.time.timestamp() * 1000), last,
+            bid=_number(raw.bid), ask=_number(raw.ask),
+        )
+
+    def message(self, tick):
+        message = super().message(tick)
+        if tick.bid is not None:
+            message["bid"] = tick.bid
+        if tick.ask is not None:
+            message["ask"] = tick.ask
+        return message
+
+
+def _decimals(value):
+    """Decimal places a stored Decimal column value carries; 0 for ints."""
+    return max(0, -value.as_tuple().exponent) if isinstance(value, Decimal) else 0
+
+
+def _number(value):
+    """ib_insync reports unknown prices as nan."""
+    return None if value is None or value != value else value
+
+
+PROVIDERS = {}
+
+
+def register(provider):
+    PROVIDERS[provider.name] = provider
+    return provider
+
+
+def get_provider(name):
+    return PROVIDERS[name]
+
+
+FYERS = register(FyersProvider())
+BINANCE = register(BinanceProvider())
+IB = register(IbProvider())
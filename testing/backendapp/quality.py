@@ -0,0 +1,215 @@
+from datetime import datetime, timezone
+
+import numpy as np
+from django.apps import apps
+from django.db import connection
+
+from backendapp.providers import IB, PROVIDERS
+
+# Vectorized data-quality checks over one symbol's candle series. The series
+# is read in chunks as float arrays (epoch seconds + OHLCV) and every check is
+# a NumPy pass over the chunk. Each chunk is prefixed with the last row of the
+# previous one so differences across the boundary are not lost, and ranges
+# that touch across boundaries are merged as they are found.
+#
+# Issue kinds:
+#   gap          missing interval slots between two rows
+#   duplicate    more than one row in the same interval slot
+#   misaligned   timestamp not on the interval grid
+#   placeholder  run of rows with identical OHLCV (copied forward, e.g. by
+#                the same-session gap fill in tick_pipeline)
+#   high_low     high < low
+#   ohlc_bounds  open or close outside [low, high]
+#   zero_volume  volume == 0
+
+
+def _scan_sources():
+    """
+    Scannable series by name: the table, the source tag to filter on in
+    tables shared by several providers, and the exchange session timezone.
+    """
+    sources = {}
+    for provider in PROVIDERS.values():
+        model = apps.get_model("backendapp", provider.model_name)
+        shared = any(field.name == "source" for field in model._meta.concrete_fields)
+        sources[provider.name] = {
+            "model": provider.model_name,
+            "source": provider.name if shared else None,
+            "session_tz": provider.session_tz,
+        }
+    # Candles written by the older ibapi_ws path.
+    sources["ibapi"] = {"model": "IbApi_Data", "source": None, "session_tz": IB.session_tz}
+    return sources
+
+
+SCAN_SOURCES = _scan_sources()
+
+UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+ISSUE_KINDS = ("gap", "duplicate", "misaligned", "placeholder", "high_low", "ohlc_bounds", "zero_volume")
+
+
+def interval_seconds(interval):
+    """'5m' -> 300. Raises KeyError/ValueError for anything else."""
+    return int(interval[:-1]) * UNIT_SECONDS[interval[-1]]
+
+
+def _series_sql(table, source=None):
+    where = '"symbol" = %s' if source is None else '"symbol" = %s AND "source" = %s'
+    if connection.vendor == "postgresql":
+        epoch = 'EXTRACT(EPOCH FROM "timestamp")::float8'
+        cast = "::float8"
+        return (
+            f'SELECT {epoch}, "open_price"{cast}, "high_price"{cast}, "low_price"{cast}, "close_price"{cast}, '
+            f'"volume"{cast} FROM "{table}" WHERE {where} ORDER BY "timestamp"'
+        )
+    columns = ", ".join(f'CAST("{c}" AS REAL)' for c in ("open_price", "high_price", "low_price", "close_price", "volume"))
+    return (
+        f"SELECT CAST(strftime('%%s', \"timestamp\") AS REAL), {columns} "
+        f'FROM "{table}" WHERE {where} ORDER BY "timestamp"'
+    )
+
+
+def iter_series(model_name, symbol, chunk_size=200_000, source=None):
+    """
+    Yield (n, 6) float64 arrays of [epoch_s, open, high, low, close, volume]
+    in timestamp order. source limits a shared table to one provider's rows.
+    """
+    table = apps.get_model("backendapp", model_name)._meta.db_table
+    # chunked_cursor() is a server-side cursor on Postgres.
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(_series_sql(table, source), [symbol] if source is None else [symbol, source])
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield np.array(rows, dtype=np.float64)
+
+
+def mask_ranges(mask):
+    """(start_index, end_index) inclusive pairs for each run of True in a boolean array."""
+    if not mask.any():
+        return []
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def local_dates(epochs, tz):
+    """Calendar date (as an integer day number) of each epoch second in a timezone."""
+    offsets = np.array([tz.utcoffset(datetime.fromtimestamp(t, timezone.utc)).total_seconds() for t in epochs])
+    return ((epochs + offsets) // 86400).astype(np.int64)
+
+
+class SeriesScanner:
+    """
+    Accumulates issue ranges for one symbol across chunks.
+
+    interval is in seconds. With session_tz set, gaps whose two ends fall on
+    different local dates are treated as market closures and not reported.
+    """
+
+    def __init__(self, interval, session_tz=None, min_placeholder_run=3):
+        self.interval = interval
+        self.session_tz = session_tz
+        self.min_placeholder_run = min_placeholder_run
+        self.ranges = {kind: [] for kind in ISSUE_KINDS}
+        self.rows = 0
+        self.first = None
+        self.last = None
+        self.carry = None
+
+    def _add_rows(self, kind, ts, offset, start, end, join):
+        """
+        Record rows start..end (chunk-local, offset makes them global). A range
+        starting within `join` rows of the previous one's end is merged into it:
+        join=1 for per-row checks, join=0 for pairwise checks that share a row.
+        """
+        start, end = start + offset, end + offset
+        ranges = self.ranges[kind]
+        if ranges and start - ranges[-1][1] <= join:
+            ranges[-1][1] = end
+            ranges[-1][3] = ts[end - offset]
+        else:
+            ranges.append([start, end, ts[start - offset], ts[end - offset]])
+
+    def feed(self, chunk):
+        if not len(chunk):
+            return
+        offset = self.rows
+        self.rows += len(chunk)
+        if self.first is None:
+            self.first = chunk[0, 0]
+        self.last = chunk[-1, 0]
+
+        ts, opens, highs, lows, closes, volumes = chunk.T
+        for kind, mask in (
+            ("misaligned", ts % self.interval != 0),
+            ("high_low", highs < lows),
+            ("ohlc_bounds", (np.maximum(opens, closes) > highs) | (np.minimum(opens, closes) < lows)),
+            ("zero_volume", volumes == 0),
+        ):
+            for start, end in mask_ranges(mask):
+                self._add_rows(kind, ts, offset, start, end, join=1)
+
+        # Pairwise checks need the last row of the previous chunk.
+        if self.carry is not None:
+            chunk = np.vstack((self.carry, chunk))
+            offset -= 1
+        self.carry = chunk[-1:]
+        if len(chunk) < 2:
+            return
+        ts = chunk[:, 0]
+        slots = ts // self.interval
+        step = np.diff(slots)
+
+        for start, end in mask_ranges(step == 0):
+            self._add_rows("duplicate", ts, offset, start, end + 1, join=0)
+
+        same = np.all(chunk[1:, 1:] == chunk[:-1, 1:], axis=1)
+        for start, end in mask_ranges(same):
+            self._add_rows("placeholder", ts, offset, start, end + 1, join=0)
+
+        gaps = np.flatnonzero(step > 1)
+        if gaps.size and self.session_tz is not None:
+            dates = local_dates(ts[np.concatenate((gaps, gaps + 1))], self.session_tz)
+            gaps = gaps[dates[:gaps.size] == dates[gaps.size:]]
+        for i in gaps.tolist():
+            missing = int(step[i]) - 1
+            # Gaps are slot ranges rather than stored rows: [first missing, last missing, missing, -].
+            self.ranges["gap"].append([(slots[i] + 1) * self.interval, (slots[i] + missing) * self.interval, missing, None])
+
+    def report(self):
+        issues = []
+        counts = {}
+        for kind, ranges in self.ranges.items():
+            if kind == "gap":
+                spans = [(start, end, missing) for start, end, missing, _ in ranges]
+            else:
+                spans = [(ts_start, ts_end, end - start + 1) for start, end, ts_start, ts_end in ranges]
+            if kind == "placeholder":
+                spans = [span for span in spans if span[2] >= self.min_placeholder_run]
+            counts[kind] = int(sum(span[2] for span in spans))
+            issues.extend(
+                {"kind": kind, "from": _iso(start), "to": _iso(end), "rows": int(rows)} for start, end, rows in spans
+            )
+        issues.sort(key=lambda issue: (issue["from"], issue["kind"]))
+        return {
+            "rows": self.rows,
+            "first": _iso(self.first) if self.first is not None else None,
+            "last": _iso(self.last) if self.last is not None else None,
+            "counts": counts,
+            "issues": issues,
+        }
+
+
+def _iso(epoch):
+    return datetime.fromtimestamp(float(epoch), timezone.utc).isoformat()
+
+
+def scan_symbol(model_name, symbol, interval, session_tz=None, min_placeholder_run=3, chunk_size=200_000, source=None):
+    scanner = SeriesScanner(interval, session_tz, min_placeholder_run)
+    for chunk in iter_series(model_name, symbol, chunk_size, source):
+        scanner.feed(chunk)
+    return scanner.report()
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.apps import apps
+from django.db import close_old_connections
+from django.db.models import CharField, Value
+
+from backendapp.providers import BINANCE
+
+logger = logging.getLogger(__name__)
+
+REPLAY_SOURCES = {
+    "binance": "Binance_Data",
+    "history": "HistoryData",
+}
+
+
+class VirtualClock:
+    """
+    Maps historical timestamps onto wall-clock time at a fixed speed-up.
+    speed=None (or 0) means "as fast as possible": sleep_until never waits.
+    """
+
+    def __init__(self, start, speed=1.0):
+        self.start = start
+        self.speed = speed or None
+        self._real_start = time.monotonic()
+        self.current = start
+
+    def now(self):
+        if self.speed is None:
+            return self.current
+        elapsed = (time.monotonic() - self._real_start) * self.speed
+        return datetime.fromtimestamp(self.start.timestamp() + elapsed, tz=timezone.utc)
+
+    async def sleep_until(self, moment):
+        self.current = moment
+        if self.speed is None:
+            return
+        delay = (moment - self.start).total_seconds() / self.speed - (time.monotonic() - self._real_start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _produce_rows(source, symbols, start, end, chunk_size, loop, queue, stop, with_source=False):
+    """Run in a worker thread: stream rows with a server-side cursor into an asyncio queue."""
+    close_old_connections()
+    try:
+        model = apps.get_model("backendapp", REPLAY_SOURCES[source])
+        rows = model.objects.filter(timestamp__gte=start, timestamp__lte=end)
+        if symbols:
+            rows = rows.filter(symbol__in=symbols)
+        columns = ["symbol", "timestamp", "open_price", "high_price", "low_price", "close_price", "volume"]
+        if with_source:
+            # HistoryData tags each row with its provider; single-provider tables get the source name.
+            if not any(field.name == "source" for field in model._meta.fields):
+                rows = rows.annotate(source=Value(source, output_field=CharField()))
+            columns.append("source")
+        rows = rows.order_by("timestamp").values_list(*columns)
+        batch = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                if stop.is_set():
+                    return
+                # Blocks this thread (not the loop) until the consumer catches up.
+                asyncio.run_coroutine_threadsafe(queue.put(batch), loop).result()
+                batch = []
+        if batch and not stop.is_set():
+            asyncio.run_coroutine_threadsafe(queue.put(batch), loop).result()
+    finally:
+        asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+        close_old_connections()
+
+
+async def stream_candle_batches(source, symbols, start, end, chunk_size=2000, max_batches=4, with_source=False):
+    """
+    Async generator over lists of stored candles in timestamp order with bounded memory.
+    with_source=True appends each row's source (e.g. "fyers" or "ib" for the shared table).
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=max_batches)
+    stop = threading.Event()
+    producer = loop.run_in_executor(
+        None, _produce_rows, source, symbols, start, end, chunk_size, loop, queue, stop, with_source
+    )
+    try:
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                break
+            yield batch
+    finally:
+        # Tell the producer to stop reading, and drain so it is never left blocked on put().
+        stop.set()
+        while not producer.done():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                await asyncio.sleep(0.01)
+        await producer
+
+
+async def stream_candles(source, symbols, start, end, chunk_size=2000, max_batches=4):
+    """Async generator over stored candles in timestamp order with bounded memory."""
+    async for batch in stream_candle_batches(source, symbols, start, end, chunk_size, max_batches):
+        for row in batch:
+            yield row
+
+
+async def replay_candles(source, symbols, start, end, speed, on_tick, yield_every=500):
+    """
+    Replay stored candles between start and end through `on_tick(symbol, tick)`
+    on a virtual clock, as the Ticks live Binance data produces. Returns the
+    number of candles replayed.
+    """
+    clock = VirtualClock(start, speed)
+    count = 0
+    async for row in stream_candles(source, symbols, start, end):
+        await clock.sleep_until(row[1])
+        tick = BINANCE.stored_tick(row)
+        on_tick(tick.symbol, tick)
+        count += 1
+        if clock.speed is None and count % yield_every == 0:
+            await asyncio.sleep(0)  # let the flush task run at max speed
+    return count
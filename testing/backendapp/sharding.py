@@ -0,0 +1,56 @@
+import bisect
+import hashlib
+
+# Consistent hashing for splitting a symbol universe across ingestion workers.
+# Every worker is placed on the ring at `replicas` points; a symbol belongs to
+# the first worker point at or after the symbol's own hash. Workers that see
+# the same member list compute the same owners without talking to each other,
+# and a worker joining or leaving only moves the symbols next to its points
+# (about 1/N of them) instead of reshuffling everything.
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, members=(), replicas=128):
+        self.replicas = replicas
+        self.members = set()
+        self._points = []
+        self._owners = []
+        for member in members:
+            self.add(member)
+
+    def add(self, member):
+        if member in self.members:
+            return
+        self.members.add(member)
+        for i in range(self.replicas):
+            point = _hash(f"{member}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, member)
+
+    def remove(self, member):
+        if member not in self.members:
+            return
+        self.members.discard(member)
+        kept = [(p, m) for p, m in zip(self._points, self._owners) if m != member]
+        self._points = [p for p, _ in kept]
+        self._owners = [m for _, m in kept]
+
+    def owner(self, key):
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def assign(self, keys):
+        """{member: [keys]} for every member, including ones that own nothing."""
+        shards = {member: [] for member in self.members}
+        for key in keys:
+            owner = self.owner(key)
+            if owner is not None:
+                shards[owner].append(key)
+        return shards
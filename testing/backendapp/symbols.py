@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import re
+
+from channels.layers import get_channel_layer
+
+from backendapp.binance_client import create_client
+from backendapp.data_list import CRYPTO_SYMBOLS, FYERS_SYMBOLS, IB_SYMBOLS
+from backendapp.fixed_point import binance_scales
+from backendapp.models import TrackedSymbol
+
+logger = logging.getLogger(__name__)
+
+# Runtime symbol registry. The symbols each live feed subscribes to are rows
+# of TrackedSymbol, changed through add()/remove() (the admin and
+# /api/symbols/ both end up here). Every change is published to the
+# "symbol_registry" group as {provider, added, removed}; the watcher below
+# receives it in every process and hands the delta to the feeds that
+# subscribed for that provider, which subscribe/unsubscribe just those
+# symbols on their open connections instead of reconnecting. The lists in
+# data_list only seed the table and stand in when the database is
+# unreachable.
+
+GROUP = "symbol_registry"
+DEFAULTS = {"binance": CRYPTO_SYMBOLS, "fyers": FYERS_SYMBOLS, "ib": IB_SYMBOLS}
+
+_FORMATS = {
+    "binance": re.compile(r"^[A-Z0-9]{2,20}$"),
+    "fyers": re.compile(r"^[A-Z]+:[A-Z0-9&_-]+$"),  # e.g. NSE:BAJAJ-AUTO-EQ
+    "ib": re.compile(r"^[A-Z0-9. ]{1,12}$"),
+}
+
+
+class SymbolRejected(ValueError):
+    pass
+
+
+def normalize(provider, symbol):
+    if provider not in DEFAULTS:
+        raise SymbolRejected(f"Unknown provider {provider!r}")
+    symbol = symbol.strip().upper()
+    if not _FORMATS[provider].match(symbol):
+        raise SymbolRejected(f"{symbol!r} is not a valid {provider} symbol")
+    return symbol
+
+
+async def validate(provider, symbol, client=None):
+    """Normalized symbol, or SymbolRejected. Binance symbols must exist and be TRADING."""
+    symbol = normalize(provider, symbol)
+    if provider != "binance":
+        return symbol
+    own_client = client is None
+    if own_client:
+        client = await create_client()
+    try:
+        status = await binance_scales.lookup(client, symbol)
+    finally:
+        if own_client:
+            await client.close_connection()
+    if status is None:
+        raise SymbolRejected(f"Binance does not list {symbol}")
+    if status != "TRADING":
+        raise SymbolRejected(f"{symbol} is {status} on Binance, not TRADING")
+    return symbol
+
+
+async def enabled(provider):
+    """The provider's enabled symbols in registry order."""
+    try:
+        return [
+            symbol async for symbol in TrackedSymbol.objects.filter(provider=provider, enabled=True)
+            .order_by("id").values_list("symbol", flat=True)
+        ]
+    except Exception as e:
+        logger.error(f"Symbol registry unavailable, using the default {provider} list: {e}")
+        return list(dict.fromkeys(DEFAULTS[provider]))
+
+
+def tradable(symbols):
+    """Drop Binance symbols that the loaded exchangeInfo does not list as TRADING, before any socket is opened."""
+    if not binance_scales.statuses:
+        return list(symbols)
+    kept = [symbol for symbol in symbols if binance_scales.statuses.get(symbol) == "TRADING"]
+    if len(kept) != len(symbols):
+        logger.warning(f"Skipping Binance symbols not TRADING: {sorted(set(symbols) - set(kept))}")
+    return kept
+
+
+async def add(provider, symbol, client=None):
+    """Validate and enable a symbol. Returns (symbol, changed)."""
+    symbol = await validate(provider, symbol, client)
+    row, created = await TrackedSymbol.objects.aget_or_create(provider=provider, symbol=symbol)
+    if not created and row.enabled:
+        return symbol, False
+    if not created:
+        row.enabled = True
+        await row.asave(update_fields=["enabled", "updated_at"])
+    await publish(provider, added=[symbol])
+    return symbol, True
+
+
+async def remove(provider, symbol):
+    """Delete a symbol from the registry. Returns whether it was there."""
+    symbol = symbol.strip().upper()
+    deleted, _ = await TrackedSymbol.objects.filter(provider=provider, symbol=symbol).adelete()
+    if deleted:
+        await publish(provider, removed=[symbol])
+    return bool(deleted)
+
+
+async def publish(provider, added=(), removed=()):
+    await get_channel_layer().group_send(GROUP, {
+        "type": "symbols.changed", "provider": provider, "added": list(added), "removed": list(removed),
+    })
+
+
+class SymbolWatcher:
+    """
+    Delivers registry deltas to this process's feeds. watch() registers an
+    async callback(added, removed) for one provider; the first one starts a
+    task that listens on the registry group. The membership is re-added every
+    refresh_interval seconds so the layer's group_expiry never drops it.
+    """
+
+    def __init__(self, group=GROUP, refresh_interval=3600.0):
+        self.group = group
+        self.refresh_interval = refresh_interval
+        self.callbacks = {}  # provider -> [callback]
+        self.task = None
+
+    def watch(self, provider, callback):
+        self.callbacks.setdefault(provider, []).append(callback)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._listen())
+
+    def unwatch(self, provider, callback):
+        callbacks = self.callbacks.get(provider, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not any(self.callbacks.values()) and self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _listen(self):
+        layer = get_channel_layer()
+        loop = asyncio.get_running_loop()
+        channel = None
+        refresh_at = 0.0
+        try:
+            while True:
+                try:
+                    if channel is None:
+                        channel = await layer.new_channel()
+                        refresh_at = 0.0
+                    if loop.time() >= refresh_at:
+                        await layer.group_add(self.group, channel)
+                        refresh_at = loop.time() + self.refresh_interval
+                    message = await asyncio.wait_for(layer.receive(channel), self.refresh_interval)
+                except asyncio.CancelledError:
+                    raise
+                except asyncio.TimeoutError:
+                    continue
+                except Exception as e:
+                    logger.error(f"Symbol registry watcher lost the channel layer: {e}")
+                    channel = None
+                    await asyncio.sleep(5)
+                    continue
+                if message.get("type") == "symbols.changed":
+                    await self._dispatch(message)
+        finally:
+            if channel is not None:
+                try:
+                    await layer.group_discard(self.group, channel)
+                except Exception:
+                    pass
+
+    async def _dispatch(self, message):
+        provider = message["provider"]
+        logger.info(f"{provider} symbols changed: +{message['added']} -{message['removed']}")
+        for callback in list(self.callbacks.get(provider, ())):
+            try:
+                await callback(message["added"], message["removed"])
+            except Exception as e:
+                logger.exception(f"Error applying {provider} symbol change: {e}")
+
+
+watcher = SymbolWatcher()
@@ -0,0 +1,77 @@
+import asyncio
+import contextlib
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.test import SimpleTestCase
+
+from backendapp.binance_shard import ShardWorker
+
+
+@contextlib.asynccontextmanager
+async def membership(layer, worker):
+    """Run just the discovery half of ShardWorker.run for `worker` on `layer`."""
+    worker.channel = await layer.new_channel()
+    await layer.group_add(worker.membership_group, worker.channel)
+    tasks = [
+        asyncio.create_task(worker._receive_membership(layer)),
+        asyncio.create_task(worker._heartbeat(layer)),
+    ]
+    try:
+        yield worker
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def worker(worker_id):
+    # No symbols, so rebalancing never opens a socket.
+    return ShardWorker(worker_id, symbols=[], heartbeat_interval=0.2, member_timeout=0.6)
+
+
+class ShardMembershipTests(SimpleTestCase):
+    def test_membership_survives_the_group_expiry(self):
+        async def run():
+            # Group entries older than a second or two are dropped by the layer.
+            layer = InMemoryChannelLayer(group_expiry=1)
+            async with membership(layer, worker("w1")) as w1, membership(layer, worker("w2")) as w2:
+                await asyncio.sleep(3)
+                self.assertEqual(set(w1.members), {"w1", "w2"})
+                self.assertEqual(set(w2.members), {"w1", "w2"})
+                self.assertIn(w1.channel, layer.groups[w1.membership_group])
+                self.assertIn(w2.channel, layer.groups[w2.membership_group])
+
+        async_to_sync(run)()
+
+    def test_an_expired_worker_rejoins_on_its_next_heartbeat(self):
+        async def run():
+            layer = InMemoryChannelLayer()
+            async with membership(layer, worker("w1")) as w1, membership(layer, worker("w2")) as w2:
+                await asyncio.sleep(0.5)
+                # What the layer does to a membership past group_expiry.
+                await layer.group_discard(w2.membership_group, w2.channel)
+                await asyncio.sleep(1)
+                self.assertIn(w2.channel, layer.groups[w2.membership_group])
+                self.assertEqual(set(w1.members), {"w1", "w2"})
+                # Left out of the group, w2 would stop hearing w1 and time it out.
+                self.assertEqual(set(w2.members), {"w1", "w2"})
+
+        async_to_sync(run)()
+
+    def test_a_silent_worker_drops_out_and_rejoins(self):
+        async def run():
+            layer = InMemoryChannelLayer()
+            async with membership(layer, worker("w1")) as w1:
+                async with membership(layer, worker("w2")):
+                    await asyncio.sleep(0.5)
+                    self.assertEqual(set(w1.members), {"w1", "w2"})
+                await asyncio.sleep(1)
+                self.assertEqual(set(w1.members), {"w1"})
+                self.assertEqual(w1.ring.members, {"w1"})
+                async with membership(layer, worker("w2")):
+                    await asyncio.sleep(0.5)
+                    self.assertEqual(set(w1.members), {"w1", "w2"})
+                    self.assertEqual(w1.ring.members, {"w1", "w2"})
+
+        async_to_sync(run)()
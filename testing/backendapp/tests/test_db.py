@@ -0,0 +1,108 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from backendapp import db
+from backendapp.models import Binance_Data, HistoryData
+from backendapp.partitions import default_partition_name, forget_cached_state, list_partitions
+
+# Far enough ahead that migration 0002 has not created these months.
+MONTH_END = datetime(2031, 1, 31, 22, 0, tzinfo=timezone.utc)
+
+
+def candle(symbol, when, close="100.50", volume="12.25"):
+    return (symbol, when, Decimal("100.00"), Decimal("101.00"), Decimal("99.00"), Decimal(close), Decimal(volume))
+
+
+def minutes(symbol, count, start=MONTH_END, volume="12.25"):
+    return [candle(symbol, start + timedelta(minutes=i), volume=volume) for i in range(count)]
+
+
+class ThreadPoolBackendTests(TransactionTestCase):
+    """The bulk_create fallback used wherever psycopg's pool is not (SQLite for local runs)."""
+
+    def insert(self, model_name, rows, source=None):
+        backend = db.ThreadPoolBackend()
+
+        async def run():
+            try:
+                await backend.insert_candles(model_name, rows, db._source(model_name, source))
+                # The write ran on one idle worker, which picks this up too; close its connection.
+                await backend._run(connections.close_all)
+            finally:
+                await backend.close()
+        async_to_sync(run)()
+
+    def test_duplicates_are_skipped(self):
+        self.insert("Binance_Data", minutes("BTCUSDT", 5))
+        self.insert("Binance_Data", minutes("BTCUSDT", 8))
+        self.assertEqual(Binance_Data.objects.filter(symbol="BTCUSDT").count(), 8)
+        row = Binance_Data.objects.values(*db.CANDLE_COLUMNS).order_by("timestamp").first()
+        self.assertEqual(db.candle_rows([Binance_Data(**row)])[0], candle("BTCUSDT", MONTH_END))
+
+    def test_source_is_stored_where_the_table_has_one(self):
+        self.insert("HistoryData", minutes("AAPL", 3, volume="1200"), source="ib")
+        self.assertEqual(set(HistoryData.objects.values_list("source", flat=True)), {"ib"})
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "needs a Postgres DATABASE_URL")
+class PostgresBackendTests(TransactionTestCase):
+    def setUp(self):
+        forget_cached_state()
+        self.addCleanup(forget_cached_state)
+
+    def insert(self, model_name, rows, source=None):
+        backend = db.PostgresBackend()
+
+        async def run():
+            try:
+                await backend.insert_candles(model_name, rows, db._source(model_name, source))
+            finally:
+                await backend.close()
+        async_to_sync(run)()
+
+    def test_copy_creates_month_partitions_and_keys_on_symbol_and_timestamp(self):
+        # Two symbols at the same minutes, across a month boundary, through COPY.
+        rows = minutes("BTCUSDT", db.COPY_THRESHOLD) + minutes("ETHUSDT", db.COPY_THRESHOLD)
+        self.insert("Binance_Data", rows)
+        self.assertEqual(Binance_Data.objects.count(), 2 * db.COPY_THRESHOLD)
+
+        with connection.cursor() as cursor:
+            partitions = dict(list_partitions(cursor, "binancedata"))
+            cursor.execute(f'SELECT COUNT(*) FROM "{default_partition_name("binancedata")}"')
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertIn("binancedata_p203101", partitions)
+        self.assertIn("binancedata_p203102", partitions)
+        self.assertEqual(db.primary_key_columns("Binance_Data"), ["symbol", "timestamp"])
+
+        # The staging merge skips rows already stored.
+        self.insert("Binance_Data", rows)
+        self.assertEqual(Binance_Data.objects.count(), 2 * db.COPY_THRESHOLD)
+
+    def test_copy_and_executemany_tag_the_source(self):
+        self.insert("HistoryData", minutes("AAPL", db.COPY_THRESHOLD, volume="1200"), source="ib")
+        self.insert("HistoryData", minutes("NSE:SBIN-EQ", 3, volume="1200"), source="fyers")
+        counts = {
+            source: HistoryData.objects.filter(source=source).count() for source in ("ib", "fyers")
+        }
+        self.assertEqual(counts, {"ib": db.COPY_THRESHOLD, "fyers": 3})
+
+
+class CandleAdminTests(TransactionTestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        Binance_Data.objects.bulk_create([Binance_Data(**dict(zip(db.CANDLE_COLUMNS, row))) for row in minutes("BTCUSDT", 3)])
+
+    def test_candles_are_listed_read_only(self):
+        response = self.client.get(reverse("admin:backendapp_binance_data_changelist"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "BTCUSDT", count=3)
+        self.assertNotContains(response, reverse("admin:backendapp_binance_data_add"))
+        self.assertNotContains(response, "/change/")
+        self.assertEqual(self.client.get(reverse("admin:backendapp_binance_data_add")).status_code, 403)
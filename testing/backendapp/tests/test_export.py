@@ -0,0 +1,96 @@
+import gzip
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pyarrow as pa
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, SimpleTestCase, TransactionTestCase
+
+from backendapp.export import accepts_gzip
+from backendapp.models import Binance_Data, HistoryData
+from backendapp.views import _parse_export_time
+
+START = datetime(2024, 6, 10, 4, 0, tzinfo=timezone.utc)
+DEFAULT = object()
+
+
+class ParseExportTimeTests(SimpleTestCase):
+    def test_formats(self):
+        ist = datetime(2024, 6, 10, 9, 30, tzinfo=timezone(timedelta(hours=5, minutes=30)))
+        for value in (
+            "2024-06-10T09:30:00+05:30",
+            "2024-06-10T09:30:00 05:30",  # "+" left unencoded in the query string
+            "2024-06-10T09:30 05:30",
+            "2024-06-10T09:30:00.000 0530",
+            "2024-06-10 09:30:00 05:30",
+            "2024-06-10T04:00:00Z",
+            "2024-06-10T04:00:00",
+            "1717992000000",
+        ):
+            with self.subTest(value=value):
+                self.assertEqual(_parse_export_time(value, DEFAULT), ist)
+        self.assertEqual(_parse_export_time("2024-06-10T09:30:00-04:00", DEFAULT), START + timedelta(hours=9, minutes=30))
+        self.assertIs(_parse_export_time("", DEFAULT), DEFAULT)
+
+    def test_a_space_is_still_the_date_time_separator(self):
+        self.assertEqual(_parse_export_time("2024-06-10 04:00", DEFAULT), START)
+        with self.assertRaises(ValueError):
+            _parse_export_time("2024-06-10T09:30:00 5:30", DEFAULT)
+
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip("gzip, deflate, br"))
+        self.assertTrue(accepts_gzip("*;q=0.5"))
+        self.assertFalse(accepts_gzip("gzip;q=0"))
+        self.assertFalse(accepts_gzip("br"))
+
+
+class ExportViewTests(TransactionTestCase):
+    def setUp(self):
+        candle = dict(open_price=Decimal("10.00"), high_price=Decimal("11.00"), low_price=Decimal("9.00"),
+                      close_price=Decimal("10.50"))
+        HistoryData.objects.bulk_create([
+            HistoryData(source="fyers", symbol="ABC", timestamp=START, volume=100, **candle),
+            HistoryData(source="ib", symbol="ABC", timestamp=START + timedelta(minutes=5), volume=200, **candle),
+            HistoryData(source="fyers", symbol="XYZ", timestamp=START + timedelta(minutes=10), volume=300, **candle),
+        ])
+        Binance_Data.objects.bulk_create([
+            Binance_Data(symbol="BTCUSDT", timestamp=START, volume=Decimal("1.25"), **candle),
+        ])
+
+    def export(self, path, headers=None, **params):
+        async def run():
+            response = await AsyncClient().get(path, params, headers=headers or {})
+            if not response.streaming:
+                return response, response.content
+            return response, b"".join([chunk async for chunk in response.streaming_content])
+        return async_to_sync(run)()
+
+    def test_csv_rows_carry_their_source(self):
+        response, body = self.export("/api/export/abc", source="history", **{"from": "2024-06-10T09:30:00 05:30"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body.decode().splitlines(), [
+            "symbol,timestamp,open_price,high_price,low_price,close_price,volume,source",
+            "ABC,2024-06-10T04:00:00+00:00,10.00,11.00,9.00,10.50,100,fyers",
+            "ABC,2024-06-10T04:05:00+00:00,10.00,11.00,9.00,10.50,200,ib",
+        ])
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="ABC-history.csv"')
+
+    def test_single_provider_tables_are_tagged_with_the_source(self):
+        response, body = self.export("/api/export/BTCUSDT", {"Accept-Encoding": "gzip"}, format="csv")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            gzip.decompress(body).decode().splitlines()[1],
+            "BTCUSDT,2024-06-10T04:00:00+00:00,10.00,11.00,9.00,10.50,1.25,binance",
+        )
+
+    def test_arrow_has_a_source_column(self):
+        _, body = self.export("/api/export/ABC", source="history", format="arrow")
+        table = pa.ipc.open_stream(body).read_all()
+        self.assertEqual(table.column_names[-1], "source")
+        self.assertEqual(table.column("source").to_pylist(), ["fyers", "ib"])
+
+    def test_bad_requests(self):
+        response, _ = self.export("/api/export/ABC", source="nope")
+        self.assertEqual(response.status_code, 400)
+        response, _ = self.export("/api/export/ABC", source="history", to="yesterday")
+        self.assertEqual(response.status_code, 400)
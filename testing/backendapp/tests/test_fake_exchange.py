@@ -0,0 +1,73 @@
+import contextlib
+import json
+
+import aiohttp
+from binance.exceptions import BinanceAPIException
+from django.test import SimpleTestCase, override_settings
+
+from backendapp.binance_client import create_client
+from backendapp.fake_exchange import HISTORY_START_MS, FakeExchangeConfig, start_fake_exchange
+
+
+class FakeExchangeTests(SimpleTestCase):
+    @contextlib.asynccontextmanager
+    async def serve(self, **config):
+        """The fake exchange on a free port; yields its base URL."""
+        _, runner = await start_fake_exchange(FakeExchangeConfig(**config), port=0)
+        try:
+            host, port = runner.addresses[0][:2]
+            yield f"http://{host}:{port}"
+        finally:
+            await runner.cleanup()
+
+    async def get(self, url, **params):
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, params=params) as response:
+                return response.status, await response.json()
+
+    async def test_klines_are_reproducible_and_aligned(self):
+        async with self.serve(symbols=["BTCUSDT"]) as base:
+            params = {"symbol": "BTCUSDT", "interval": "5m", "startTime": HISTORY_START_MS + 1, "limit": 3}
+            status, first = await self.get(f"{base}/api/v3/klines", **params)
+            _, second = await self.get(f"{base}/api/v3/klines", **params)
+            self.assertEqual(status, 200)
+            self.assertEqual(first, second)
+            self.assertEqual([row[0] for row in first], [HISTORY_START_MS + 300_000 * i for i in (1, 2, 3)])
+            self.assertEqual(first[0][6], first[0][0] + 299_999)
+
+    async def test_unknown_symbol_is_rejected_like_binance(self):
+        async with self.serve(symbols=["BTCUSDT"]) as base:
+            status, body = await self.get(f"{base}/api/v3/exchangeInfo", symbol="NOPEUSDT")
+            self.assertEqual(status, 400)
+            self.assertEqual(body["code"], -1121)
+
+    async def test_request_weight_limit_answers_429(self):
+        async with self.serve(symbols=["BTCUSDT"], rate_limit_weight=3) as base:
+            statuses = [(await self.get(f"{base}/api/v3/ping"))[0] for _ in range(4)]
+            self.assertEqual(statuses, [200, 200, 200, 429])
+
+    async def test_combined_stream_wraps_events(self):
+        async with self.serve(symbols=["ETHUSDT"], tick_rate=50) as base:
+            async with aiohttp.ClientSession() as session:
+                url = base.replace("http", "ws", 1) + "/stream?streams=ethusdt@aggTrade/ethusdt@kline_1m"
+                async with session.ws_connect(url) as ws:
+                    frames = [json.loads((await ws.receive(timeout=5)).data) for _ in range(4)]
+            self.assertEqual({frame["stream"] for frame in frames}, {"ethusdt@aggTrade", "ethusdt@kline_1m"})
+            trades = [frame["data"] for frame in frames if frame["stream"] == "ethusdt@aggTrade"]
+            self.assertEqual(trades[0]["e"], "aggTrade")
+            self.assertEqual(trades[0]["s"], "ETHUSDT")
+
+    async def test_python_binance_client_talks_to_it(self):
+        async with self.serve(symbols=["BTCUSDT"]) as base:
+            with override_settings(BINANCE_API_URL=f"{base}/api"):
+                client = await create_client()
+            try:
+                info = await client.get_exchange_info()
+                self.assertEqual([s["symbol"] for s in info["symbols"]], ["BTCUSDT"])
+                klines = await client.get_klines(symbol="BTCUSDT", interval="1m", limit=5)
+                self.assertEqual(len(klines), 5)
+                with self.assertRaises(BinanceAPIException) as raised:
+                    await client.get_klines(symbol="NOPEUSDT", interval="1m")
+                self.assertEqual(raised.exception.code, -1121)
+            finally:
+                await client.close_connection()
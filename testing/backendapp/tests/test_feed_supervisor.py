@@ -0,0 +1,181 @@
+import asyncio
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from backendapp import feed_supervisor
+from backendapp.feed_supervisor import BACKOFF, LIVE, STOPPED, FeedSupervisor, backoff_delay
+
+
+class StubSocket:
+    """Serves queued events, then either drops (raises) or goes silent."""
+
+    def __init__(self, events, drop=True):
+        self.events = list(events)
+        self.drop = drop
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.closed = True
+
+    async def recv(self):
+        if self.events:
+            await asyncio.sleep(0)
+            return {"e": "trade", "E": self.events.pop(0)}
+        if self.drop:
+            raise ConnectionError("socket dropped")
+        await asyncio.Event().wait()
+
+
+class StubFeed:
+    """connect() hands out the next socket; the handler records every event time."""
+
+    def __init__(self, *sockets):
+        self.sockets = list(sockets)
+        self.opened = []
+        self.received = []
+        self.windows = []
+        self.backfilled = asyncio.Event()
+
+    def connect(self):
+        socket = self.sockets.pop(0)
+        self.opened.append(socket)
+        return socket
+
+    async def handler(self, stream):
+        while True:
+            self.received.append((await stream.recv())["E"])
+
+    async def backfill(self, since_ms, until_ms):
+        self.windows.append((since_ms, until_ms))
+        self.backfilled.set()
+
+
+def supervisor(**overrides):
+    options = dict(reconnect_rate=100, stale_after=5, dead_after=10, gap_after=60, backoff_base=0.01, backoff_cap=0.05)
+    return FeedSupervisor(**{**options, **overrides})
+
+
+class BackoffTests(SimpleTestCase):
+    def test_delay_is_uniform_up_to_the_capped_exponential(self):
+        with mock.patch.object(feed_supervisor.random, "uniform", side_effect=lambda low, high: high) as uniform:
+            delays = [backoff_delay(attempt, base=0.5, cap=30) for attempt in range(8)]
+        self.assertEqual(delays, [0.5, 1, 2, 4, 8, 16, 30, 30])
+        self.assertTrue(all(call.args[0] == 0 for call in uniform.call_args_list))
+        # Huge attempt counts don't overflow the exponent.
+        self.assertLessEqual(backoff_delay(10_000, base=0.5, cap=30), 30)
+
+    def test_delays_are_jittered(self):
+        delays = [backoff_delay(4, base=0.5, cap=30) for _ in range(500)]
+        self.assertTrue(all(0 <= delay <= 8 for delay in delays))
+        self.assertLess(min(delays), 1)
+        self.assertGreater(max(delays), 7)
+        self.assertGreater(len(set(delays)), 490)
+
+
+class AdmitTests(SimpleTestCase):
+    def test_reconnects_are_spaced_across_streams(self):
+        async def run():
+            feeds = supervisor(reconnect_rate=20)
+
+            async def admitted():
+                await feeds.admit()
+                return time.monotonic()
+            return sorted(await asyncio.gather(*(admitted() for _ in range(5))))
+
+        times = async_to_sync(run)()
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        for gap in gaps:
+            self.assertGreaterEqual(gap, 0.04)
+        self.assertGreaterEqual(times[-1] - times[0], 0.19)
+
+    def test_an_idle_supervisor_admits_at_once(self):
+        async def run():
+            feeds = supervisor(reconnect_rate=1)
+            started = time.monotonic()
+            await feeds.admit()
+            return time.monotonic() - started
+        self.assertLess(async_to_sync(run)(), 0.05)
+
+
+class SupervisedStreamTests(SimpleTestCase):
+    def test_drop_reconnects_and_backfills_the_missed_window(self):
+        async def run():
+            feed = StubFeed(StubSocket([1_000, 2_000]), StubSocket([9_000, 10_000], drop=False))
+            feeds = supervisor()
+            stream = feeds.start("binance", "BTCUSDT", feed.connect, feed.handler, feed.backfill)
+            try:
+                await asyncio.wait_for(feed.backfilled.wait(), 2)
+                while len(feed.received) < 4:
+                    await asyncio.sleep(0.01)
+                self.assertEqual(feed.windows, [(2_000, 9_000)])
+                self.assertEqual(feed.received, [1_000, 2_000, 9_000, 10_000])
+                self.assertEqual((stream.state, stream.attempt, stream.reconnects), (LIVE, 0, 1))
+                self.assertTrue(feed.opened[0].closed)
+                self.assertEqual(feeds.status()["states"][LIVE], 1)
+            finally:
+                stream.cancel()
+                await asyncio.gather(stream.task, return_exceptions=True)
+            self.assertEqual(stream.state, STOPPED)
+            self.assertNotIn(stream, feeds.streams)
+
+        with self.assertLogs("backendapp.feed_supervisor", "ERROR"):
+            async_to_sync(run)()
+
+    def test_an_event_time_gap_is_backfilled_without_a_reconnect(self):
+        async def run():
+            feed = StubFeed(StubSocket([1_000, 2_000, 30_000], drop=False))
+            stream = supervisor(gap_after=5).start("binance", "BTCUSDT", feed.connect, feed.handler, feed.backfill)
+            try:
+                await asyncio.wait_for(feed.backfilled.wait(), 2)
+                self.assertEqual(feed.windows, [(2_000, 30_000)])
+                self.assertEqual(stream.reconnects, 0)
+            finally:
+                stream.cancel()
+                await asyncio.gather(stream.task, return_exceptions=True)
+
+        async_to_sync(run)()
+
+    def test_a_silent_socket_is_reopened_after_dead_after(self):
+        async def run():
+            feed = StubFeed(StubSocket([1_000], drop=False), StubSocket([2_000], drop=False))
+            stream = supervisor(stale_after=0.05, dead_after=0.15).start(
+                "binance", "BTCUSDT", feed.connect, feed.handler, feed.backfill,
+            )
+            try:
+                while len(feed.received) < 2:
+                    await asyncio.sleep(0.01)
+                self.assertEqual(stream.reconnects, 1)
+                # The first event after a reconnect always checks for a hole.
+                await asyncio.wait_for(feed.backfilled.wait(), 2)
+                self.assertEqual(feed.windows, [(1_000, 2_000)])
+            finally:
+                stream.cancel()
+                await asyncio.gather(stream.task, return_exceptions=True)
+
+        with self.assertLogs("backendapp.feed_supervisor", "ERROR") as logs:
+            async_to_sync(run)()
+        self.assertIn("no messages for", logs.output[0])
+
+    def test_failures_back_off_until_the_stream_is_live_again(self):
+        async def run():
+            feed = StubFeed(StubSocket([]), StubSocket([]), StubSocket([5_000], drop=False))
+            stream = supervisor().start("binance", "BTCUSDT", feed.connect, feed.handler)
+            states = []
+            try:
+                while not feed.received:
+                    states.append(stream.state)
+                    await asyncio.sleep(0.001)
+                self.assertIn(BACKOFF, states)
+                self.assertEqual((stream.reconnects, stream.attempt, stream.state), (2, 0, LIVE))
+            finally:
+                stream.cancel()
+                await asyncio.gather(stream.task, return_exceptions=True)
+
+        with self.assertLogs("backendapp.feed_supervisor", "ERROR"):
+            async_to_sync(run)()
@@ -0,0 +1,93 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from backendapp import fixed_point
+from backendapp.fixed_point import (
+    DEFAULT_DECIMALS, UNLISTED_RECHECK, SymbolScales, format_scaled, step_decimals, to_scaled,
+)
+
+
+def symbol_info(symbol, tick="0.01000000", step="0.00001000", status="TRADING"):
+    return {"symbol": symbol, "status": status, "filters": [
+        {"filterType": "PRICE_FILTER", "tickSize": tick},
+        {"filterType": "LOT_SIZE", "stepSize": step},
+    ]}
+
+
+class FakeClient:
+    def __init__(self):
+        self.full = 0
+
+    async def get_exchange_info(self):
+        self.full += 1
+        return {"symbols": [
+            symbol_info("BTCUSDT"),
+            symbol_info("SHIBUSDT", tick="0.00000001", step="1.00000000"),
+            symbol_info("LUNAUSDT", status="BREAK"),
+        ]}
+
+
+class ScaledTextTests(SimpleTestCase):
+    def test_step_decimals(self):
+        self.assertEqual(step_decimals("0.01000000"), 2)
+        self.assertEqual(step_decimals("1.00000000"), 0)
+        self.assertEqual(step_decimals("0.00000001"), 8)
+
+    def test_to_scaled(self):
+        self.assertEqual(to_scaled("43000.01000000", 2), 4300001)
+        self.assertEqual(to_scaled("0.5", 3), 500)
+        self.assertEqual(to_scaled("12", 2), 1200)
+        self.assertEqual(to_scaled("7.000", 0), 7)
+
+    def test_dropped_digits_are_warned_about(self):
+        with mock.patch.object(fixed_point, "_last_dropped_warning", None):
+            with self.assertNoLogs("backendapp.fixed_point"):
+                self.assertEqual(to_scaled("43000.01000000", 2), 4300001)
+            with self.assertLogs("backendapp.fixed_point", "WARNING") as logs:
+                self.assertEqual(to_scaled("1.239", 2), 123)  # truncated, not rounded
+                self.assertEqual(to_scaled("1.231", 2), 123)
+            # One warning a minute, however many values are affected.
+            self.assertEqual(len(logs.output), 1)
+            self.assertIn("1.239 past 2 decimals", logs.output[0])
+
+    def test_format_scaled(self):
+        self.assertEqual(format_scaled(4300001, 2), "43000.01")
+        self.assertEqual(format_scaled(5, 3), "0.005")
+        self.assertEqual(format_scaled(-5, 3), "-0.005")
+        self.assertEqual(format_scaled(42, 0), "42")
+
+    def test_round_trip(self):
+        for text, decimals in (("0.00000001", 8), ("98765.4321", 4), ("100", 0)):
+            self.assertEqual(format_scaled(to_scaled(text, decimals), decimals), text)
+
+
+class SymbolScalesTests(SimpleTestCase):
+    def test_load_reads_filters_and_caches(self):
+        scales, client = SymbolScales(ttl=60), FakeClient()
+        async_to_sync(scales.load)(client)
+        async_to_sync(scales.load)(client)
+        self.assertEqual(client.full, 1)
+        self.assertEqual(scales.get("BTCUSDT"), (2, 5))
+        self.assertEqual(scales.get("SHIBUSDT"), (8, 0))
+        self.assertEqual(scales.get("NEWUSDT"), (DEFAULT_DECIMALS, DEFAULT_DECIMALS))
+
+    def test_lookup_reads_the_full_exchange_info(self):
+        scales, client = SymbolScales(ttl=60), FakeClient()
+        self.assertEqual(async_to_sync(scales.lookup)(client, "BTCUSDT"), "TRADING")
+        self.assertEqual(async_to_sync(scales.lookup)(client, "LUNAUSDT"), "BREAK")
+        self.assertEqual(client.full, 1)
+        scales.loaded_at -= 61
+        async_to_sync(scales.lookup)(client, "BTCUSDT")
+        self.assertEqual(client.full, 2)
+
+    def test_unlisted_symbols_recheck_at_most_once_a_minute(self):
+        scales, client = SymbolScales(ttl=3600), FakeClient()
+        async_to_sync(scales.load)(client)
+        for _ in range(3):
+            self.assertIsNone(async_to_sync(scales.lookup)(client, "NEWUSDT"))
+        self.assertEqual(client.full, 1)
+        scales.loaded_at -= UNLISTED_RECHECK + 1
+        self.assertIsNone(async_to_sync(scales.lookup)(client, "NEWUSDT"))
+        self.assertEqual(client.full, 2)
@@ -0,0 +1,126 @@
+import contextlib
+import io
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TransactionTestCase
+
+from backendapp import fyers_backfill
+from backendapp.fyers_backfill import RateLimiter
+from backendapp.models import BackfillProgress, HistoryData
+
+END = datetime(2024, 6, 10, tzinfo=timezone.utc)
+
+
+class RateLimiterTests(SimpleTestCase):
+    def acquire_times(self, limiter, count):
+        async def run():
+            started = time.monotonic()
+            times = []
+            for _ in range(count):
+                await limiter.acquire()
+                times.append(time.monotonic() - started)
+            return times
+        return async_to_sync(run)()
+
+    def test_every_window_is_enforced(self):
+        # 2 per 0.1s and 3 per 0.5s: the third call waits for the short window, the fourth for the long one.
+        times = self.acquire_times(RateLimiter([(2, 0.1), (3, 0.5)]), 4)
+        self.assertLess(times[1], 0.05)
+        self.assertGreaterEqual(times[2], 0.09)
+        self.assertLess(times[2], 0.3)
+        self.assertGreaterEqual(times[3], 0.49)
+
+    def test_windows_slide(self):
+        limiter = RateLimiter([(2, 0.2)])
+        times = self.acquire_times(limiter, 4)
+        # Each call frees up 0.2s after the call it replaces, not after the window's start.
+        self.assertAlmostEqual(times[2] - times[0], 0.2, delta=0.05)
+        self.assertAlmostEqual(times[3] - times[1], 0.2, delta=0.05)
+
+    def test_penalize_holds_every_caller(self):
+        limiter = RateLimiter([(100, 1.0)])
+        limiter.penalize(0.2)
+        self.assertGreaterEqual(self.acquire_times(limiter, 1)[0], 0.19)
+
+    def test_shared_between_event_loops(self):
+        limiter = RateLimiter([(3, 0.3)])
+        times = []
+
+        def worker():
+            times.extend(self.acquire_times(limiter, 2))
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(times), 4)
+        self.assertGreaterEqual(max(times), 0.29)
+
+
+class FakeFyers:
+    """history() answers every range with one candle at its start."""
+
+    def __init__(self):
+        self.requests = []
+
+    def history(self, data):
+        self.requests.append((data["range_from"], data["range_to"]))
+        return {"s": "ok", "candles": [[data["range_from"], 100.0, 101.0, 99.0, 100.5, 1000]]}
+
+
+class ResumeTests(TransactionTestCase):
+    def backfill(self, days=150):
+        client = FakeFyers()
+        with mock.patch.object(fyers_backfill, "get_client", return_value=client), \
+                contextlib.redirect_stdout(io.StringIO()):
+            results = async_to_sync(fyers_backfill.backfill)(["NSE:SBIN-EQ"], "id", "token", days=days, end=END)
+        return client, results
+
+    def progress(self):
+        return BackfillProgress.objects.get(provider="fyers", symbol="SBIN")
+
+    def test_a_fresh_backfill_saves_progress_per_chunk(self):
+        client, results = self.backfill()
+        start = END - timedelta(days=150)
+        self.assertEqual(client.requests, [
+            (int(start.timestamp()), int((start + timedelta(days=100)).timestamp())),
+            (int((start + timedelta(days=100)).timestamp()), int(END.timestamp())),
+        ])
+        self.assertEqual(results, {"NSE:SBIN-EQ": 2})
+        self.assertEqual((self.progress().range_start, self.progress().completed_through), (start, END))
+        self.assertEqual(set(HistoryData.objects.values_list("source", flat=True)), {"fyers"})
+
+    def test_an_interrupted_backfill_resumes_where_it_stopped(self):
+        start = END - timedelta(days=150)
+        stopped = start + timedelta(days=100)
+        BackfillProgress.objects.create(
+            provider="fyers", symbol="SBIN", resolution=fyers_backfill.RESOLUTION,
+            range_start=start, completed_through=stopped,
+        )
+        client, results = self.backfill()
+        self.assertEqual(client.requests, [(int(stopped.timestamp()), int(END.timestamp()))])
+        self.assertEqual(results, {"NSE:SBIN-EQ": 1})
+        # The range keeps its original start.
+        self.assertEqual((self.progress().range_start, self.progress().completed_through), (start, END))
+
+    def test_progress_not_covering_the_start_is_ignored(self):
+        # A later run asks for more history than the saved range covers.
+        BackfillProgress.objects.create(
+            provider="fyers", symbol="SBIN", resolution=fyers_backfill.RESOLUTION,
+            range_start=END - timedelta(days=10), completed_through=END,
+        )
+        client, _ = self.backfill(days=50)
+        self.assertEqual(client.requests, [(int((END - timedelta(days=50)).timestamp()), int(END.timestamp()))])
+        self.assertEqual(self.progress().range_start, END - timedelta(days=50))
+
+    def test_a_completed_range_fetches_nothing(self):
+        BackfillProgress.objects.create(
+            provider="fyers", symbol="SBIN", resolution=fyers_backfill.RESOLUTION,
+            range_start=END - timedelta(days=150), completed_through=END,
+        )
+        client, results = self.backfill()
+        self.assertEqual((client.requests, results), ([], {"NSE:SBIN-EQ": 0}))
@@ -0,0 +1,111 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.test import TransactionTestCase, override_settings
+
+from backendapp.feed_supervisor import BACKOFF, LIVE, supervisor
+from backendapp.ib_feed import IbFeed
+from backendapp.ib_stub import StubGateway, StubIB
+from backendapp.websockets.ibapi_ws import IBConnection
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    IB_BROADCAST_INTERVAL=0.05,
+)
+class IbFeedTests(TransactionTestCase):
+    """IbFeed end to end against the in-process StubIB gateway, with fast supervisor backoff."""
+
+    def setUp(self):
+        self.gateway = StubGateway(latency=0, tick_interval=0.02, bar_interval=0.2)
+        self.feed = IbFeed(lambda: IBConnection(client_id=77, ib=StubIB(self.gateway)), symbols=["AAPL", "MSFT"])
+        for name, value in (("backoff_base", 0.02), ("backoff_cap", 0.1), ("reconnect_rate", 100.0)):
+            patch = mock.patch.object(supervisor, name, value)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def wait_for(self, condition, timeout=3.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            if asyncio.get_running_loop().time() > deadline:
+                self.fail("timed out waiting for the feed")
+            await asyncio.sleep(0.01)
+
+    async def live(self):
+        await self.wait_for(lambda: self.feed.stream.state == LIVE and self.feed.connection is not None)
+
+    def test_publishes_grouped_updates_for_every_symbol(self):
+        async def run():
+            layer = get_channel_layer()
+            channel = await layer.new_channel()
+            await layer.group_add(self.feed.group, channel)
+            await self.feed.acquire()
+            try:
+                await self.live()
+                seen = set()
+                while seen != {"AAPL", "MSFT"}:
+                    message = await asyncio.wait_for(layer.receive(channel), 3)
+                    self.assertEqual(message["type"], "send.ibapi")
+                    self.assertEqual(set(json.loads(message["text"])), set(message["symbols"]))
+                    seen.update(message["symbols"])
+                self.assertEqual(set(json.loads(self.feed.snapshot_text())), {"AAPL", "MSFT"})
+            finally:
+                await self.feed.release()
+            self.assertEqual(self.gateway.client_ids, set())
+            self.assertIsNone(self.feed.stream)
+            self.assertIsNone(self.feed.snapshot_text())
+        async_to_sync(run)()
+
+    def test_retries_until_the_gateway_accepts(self):
+        async def run():
+            self.gateway.down = True
+            await self.feed.acquire()
+            try:
+                await self.wait_for(lambda: self.feed.stream.attempt >= 2)
+                self.assertIsNone(self.feed.connection)
+                self.gateway.down = False
+                await self.live()
+                self.assertEqual(self.feed.stream.attempt, 0)
+                self.assertEqual(sorted(self.feed.streams), ["AAPL", "MSFT"])
+            finally:
+                await self.feed.release()
+        async_to_sync(run)()
+
+    def test_reconnects_and_resubscribes_after_a_disconnect(self):
+        async def run():
+            await self.feed.acquire()
+            try:
+                await self.live()
+                first = self.feed.connection
+                self.gateway.drop_clients()
+                await asyncio.sleep(0)
+                self.assertIn(self.feed.stream.state, (BACKOFF, "connecting"))
+                await self.wait_for(lambda: self.feed.connection not in (None, first))
+                await self.live()
+                self.assertEqual(self.feed.stream.reconnects, 1)
+                self.assertEqual(sorted(self.feed.streams), ["AAPL", "MSFT"])
+                self.assertEqual(self.gateway.client_ids, {77})
+            finally:
+                await self.feed.release()
+        async_to_sync(run)()
+
+    def test_symbol_changes_apply_to_the_open_connection(self):
+        async def run():
+            await self.feed.acquire()
+            try:
+                await self.live()
+                connection = self.feed.connection
+                await self.feed.on_symbols(["IBM"], ["MSFT"])
+                self.assertIs(self.feed.connection, connection)
+                self.assertEqual(sorted(self.feed.streams), ["AAPL", "IBM"])
+                self.assertEqual(sorted(connection.ib._bars), ["AAPL", "IBM"])
+                # A reconnect subscribes the current set.
+                self.gateway.drop_clients()
+                await self.wait_for(lambda: self.feed.connection not in (None, connection))
+                self.assertEqual(sorted(self.feed.streams), ["AAPL", "IBM"])
+            finally:
+                await self.feed.release()
+        async_to_sync(run)()
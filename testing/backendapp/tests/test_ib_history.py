@@ -0,0 +1,141 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TransactionTestCase
+
+from backendapp import ib_history
+from backendapp.fyers_backfill import RateLimiter
+from backendapp.ib_history import IbClientPool, IbPacing, backfill, duration_str, plan_chunks
+from backendapp.ib_stub import StubGateway, StubIB, StubPacing
+from backendapp.models import BackfillProgress, HistoryData
+from backendapp.websockets.ibapi_ws import IBConnection
+
+END = datetime(2024, 6, 28, tzinfo=timezone.utc)
+
+
+class PlanChunksTests(SimpleTestCase):
+    def test_full_chunks_use_the_longest_duration_and_the_rest_is_exact(self):
+        start = END - timedelta(days=800)
+        chunks = plan_chunks(start, END, "1 day")
+        self.assertEqual([duration for _, duration in chunks], ["1 Y", "1 Y", "70 D"])
+        self.assertEqual([chunk_end for chunk_end, _ in chunks], [
+            start + timedelta(days=365), start + timedelta(days=730), END,
+        ])
+
+    def test_short_spans_are_given_in_seconds(self):
+        self.assertEqual(plan_chunks(END - timedelta(hours=2), END, "1 min"), [(END, "7200 S")])
+        self.assertEqual(duration_str(timedelta(days=1, seconds=1)), "2 D")
+
+    def test_empty_range_has_no_chunks(self):
+        self.assertEqual(plan_chunks(END, END, "1 hour"), [])
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_waits_for_the_window(self):
+        async def run():
+            limiter = RateLimiter([(2, 0.2)])
+            started = time.monotonic()
+            for _ in range(3):
+                await limiter.acquire()
+            return time.monotonic() - started
+        self.assertGreaterEqual(async_to_sync(run)(), 0.19)
+
+    def test_penalize_holds_every_caller(self):
+        async def run():
+            limiter = RateLimiter([(100, 1)])
+            limiter.penalize(0.2)
+            started = time.monotonic()
+            await limiter.acquire()
+            return time.monotonic() - started
+        self.assertGreaterEqual(async_to_sync(run)(), 0.19)
+
+
+class IbPacingTests(SimpleTestCase):
+    def pacing(self, **rules):
+        return IbPacing(**{"per_window": 60, "window": 600, "per_contract": 6, "contract_window": 2,
+                           "identical_gap": 15, "penalty": 60, "margin": 0, **rules})
+
+    def timed(self, pacing, requests):
+        async def run():
+            started = time.monotonic()
+            for contract_key, request_key in requests:
+                await pacing.acquire(contract_key, request_key)
+            return time.monotonic() - started
+        return async_to_sync(run)()
+
+    def test_identical_requests_wait_for_the_gap(self):
+        pacing = self.pacing(identical_gap=0.2)
+        self.assertGreaterEqual(self.timed(pacing, [("A", "A1"), ("A", "A1")]), 0.19)
+        self.assertLess(self.timed(pacing, [("A", "A2"), ("A", "A3")]), 0.1)
+
+    def test_per_contract_limit_leaves_other_contracts_alone(self):
+        pacing = self.pacing(per_contract=2, contract_window=0.2)
+        self.assertLess(self.timed(pacing, [("A", 1), ("A", 2), ("B", 3), ("B", 4)]), 0.1)
+        self.assertGreaterEqual(self.timed(pacing, [("C", 5), ("C", 6), ("C", 7)]), 0.19)
+
+    def test_violations_back_off_longer_each_time(self):
+        pacing = self.pacing(penalty=10)
+        pacing.violation()
+        first = pacing.limiter._blocked_until - time.monotonic()
+        pacing.violation()
+        second = pacing.limiter._blocked_until - time.monotonic()
+        self.assertAlmostEqual(first, 10, delta=0.5)
+        self.assertAlmostEqual(second, 20, delta=0.5)
+        pacing.success()
+        self.assertEqual(pacing.violations, 0)
+
+
+class StubBackfillTests(TransactionTestCase):
+    """ib_history.backfill end to end against the in-process StubIB gateway."""
+
+    def setUp(self):
+        # Repeats of a timed-out request may go after 0.3s instead of IB's 15s.
+        self.gateway = StubGateway(pacing=StubPacing(identical_gap=0.3), latency=0)
+        patches = [
+            mock.patch.object(ib_history, "_pacing", IbPacing(identical_gap=0.3, penalty=0.2, margin=0.01)),
+            mock.patch.object(ib_history, "REQUEST_TIMEOUT", 0.2),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def run_backfill(self, symbols, days, **kwargs):
+        def connect(client_id):
+            return IBConnection(client_id=client_id, ib=StubIB(self.gateway))
+
+        async def run():
+            async with IbClientPool(size=2, base_client_id=500, connection_factory=connect) as pool:
+                return await backfill(symbols, pool.connections, days=days, end=END, **kwargs)
+        return async_to_sync(run)()
+
+    def progress(self, symbol):
+        return BackfillProgress.objects.filter(provider="ib", symbol=symbol).first()
+
+    def test_writes_every_chunk_and_records_progress(self):
+        results = self.run_backfill(["AAPL"], days=800)
+        self.assertGreater(results["AAPL"], 500)
+        self.assertEqual(HistoryData.objects.filter(symbol="AAPL").count(), results["AAPL"])
+        self.assertEqual(self.progress("AAPL").completed_through, END)
+        # A second run resumes at the end and asks for nothing.
+        requests = self.gateway.requests
+        self.assertEqual(self.run_backfill(["AAPL"], days=800), {"AAPL": 0})
+        self.assertEqual(self.gateway.requests, requests)
+
+    def test_timed_out_requests_save_no_progress(self):
+        self.gateway.stalled.add("MSFT")
+        with mock.patch.object(ib_history, "MAX_REQUEUES", 1):
+            results = self.run_backfill(["AAPL", "MSFT"], days=30)
+        self.assertEqual(results["MSFT"], 0)
+        self.assertIsNone(self.progress("MSFT"))
+        self.assertEqual(self.progress("AAPL").completed_through, END)
+
+    def test_pacing_violations_are_retried_from_saved_progress(self):
+        # The gateway is stricter than the client's model, so it rejects some requests.
+        self.gateway.pacing = StubPacing(identical_gap=0.3, per_contract=2, contract_window=0.5)
+        results = self.run_backfill(["AAPL"], days=365 * 4 + 1)
+        self.assertGreater(self.gateway.violations, 0)
+        self.assertEqual(self.progress("AAPL").completed_through, END)
+        self.assertEqual(HistoryData.objects.filter(symbol="AAPL").count(), results["AAPL"])
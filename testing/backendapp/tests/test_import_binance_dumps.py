@@ -0,0 +1,100 @@
+import io
+import os
+import tempfile
+import zipfile
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from backendapp.management.commands.import_binance_dumps import DUMP_NAME, dump_range, encode_copy_text, parse_dump
+from backendapp.models import Binance_Data
+
+# numeric(10,2) prices and numeric(30,2) volume, as in Binance_Data
+LIMITS = [10 ** 10] * 4 + [10 ** 30]
+T0 = 1704067200000  # 2024-01-01T00:00:00Z
+
+
+def kline(open_time, o="42000.00", h="42100.50", l="41900.005", c="42050.10", v="12.345"):
+    return f"{open_time},{o},{h},{l},{c},{v},{open_time + 299_999},0,0,0,0,0"
+
+
+def write_dump(directory, name, lines):
+    path = os.path.join(directory, name)
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(name.replace(".zip", ".csv"), "\n".join(lines) + "\n")
+    return path
+
+
+class ParseDumpTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def parse(self, lines, stored_ms=(), copy_text=False):
+        path = write_dump(self.dir, "BTCUSDT-5m-2024-01.zip", lines)
+        return parse_dump(path, "BTCUSDT", np.array(stored_ms, dtype=np.int64), copy_text, 2, LIMITS)
+
+    def test_scales_half_up_and_skips_stored_rows(self):
+        count, skipped, rejected, (open_times, scaled) = self.parse(
+            [kline(T0), kline(T0 + 300_000, l="1.005")], stored_ms=[T0],
+        )
+        self.assertEqual((count, skipped, rejected), (1, 1, []))
+        self.assertEqual(open_times.tolist(), [T0 + 300_000])
+        # 1.005 * 100 is 100.4999... in binary; the column would store 1.01.
+        self.assertEqual(scaled.tolist(), [[4200000, 4210050, 101, 4205010, 1235]])
+
+    def test_header_row_and_microsecond_open_times(self):
+        count, _, _, (open_times, _) = self.parse(["open_time,open,high,low,close,volume", kline(T0 * 1000)])
+        self.assertEqual(count, 1)
+        self.assertEqual(open_times.tolist(), [T0])
+
+    def test_rows_out_of_column_range_are_rejected(self):
+        count, _, rejected, (open_times, scaled) = self.parse([
+            kline(T0),
+            kline(T0 + 300_000, h="100000000.00"),        # 10 digits before the point: numeric(10,2) holds 8
+            kline(T0 + 600_000, v="99999999999999999999999999999.99"),
+            kline(T0 + 900_000, v="1e40"),                # would also overflow int64
+        ])
+        self.assertEqual(count, 1)
+        self.assertEqual(rejected, [T0 + 300_000, T0 + 600_000, T0 + 900_000])
+        self.assertEqual(open_times.tolist(), [T0])
+
+    def test_copy_text_rows(self):
+        count, _, _, payload = self.parse([kline(T0, v="0.5")], copy_text=True)
+        self.assertEqual(count, 1)
+        self.assertEqual(
+            payload, b"BTCUSDT\t2024-01-01T00:00:00.000+00\t42000.00\t42100.50\t41900.01\t42050.10\t0.50\n",
+        )
+
+    def test_encode_without_decimals(self):
+        text = encode_copy_text("X", np.array([T0]), np.array([[1, 2, 3, 4, 5]]), 0)
+        self.assertEqual(text, b"X\t2024-01-01T00:00:00.000+00\t1\t2\t3\t4\t5\n")
+
+    def test_dump_names(self):
+        monthly = DUMP_NAME.match("BTCUSDT-5m-2024-02.zip")
+        daily = DUMP_NAME.match("BTCUSDT-5m-2024-02-29.zip")
+        self.assertEqual(dump_range(monthly), (
+            datetime(2024, 2, 1, tzinfo=timezone.utc), datetime(2024, 3, 1, tzinfo=timezone.utc),
+        ))
+        self.assertEqual(dump_range(daily)[1], datetime(2024, 3, 1, tzinfo=timezone.utc))
+        self.assertIsNone(DUMP_NAME.match("BTCUSDT-5m-2024-02.csv"))
+
+
+class ImportCommandTests(TransactionTestCase):
+    def test_import_reports_rejected_rows_and_stores_the_rest(self):
+        with tempfile.TemporaryDirectory() as directory:
+            write_dump(directory, "BTCUSDT-5m-2024-01-01.zip", [
+                kline(T0), kline(T0 + 300_000, v="1e40"), kline(T0 + 600_000, c="42060.20"),
+            ])
+            out = io.StringIO()
+            call_command("import_binance_dumps", directory, "--workers", "1", stdout=out)
+        self.assertIn("rejected 1 rows out of column range (open times 2024-01-01T00:05:00+00:00)", out.getvalue())
+        self.assertIn("2 rows stored", out.getvalue())
+        self.assertEqual(
+            list(Binance_Data.objects.order_by("timestamp").values_list("close_price", flat=True)),
+            [Decimal("42050.10"), Decimal("42060.20")],
+        )
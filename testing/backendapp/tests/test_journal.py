@@ -0,0 +1,85 @@
+import tempfile
+
+from django.test import SimpleTestCase
+
+from backendapp.journal import INDEX_ENTRY, FeedJournal, JournalReader
+
+T0 = 1_717_977_600_000_000  # 2024-06-10T00:00:00Z in microseconds
+
+
+class JournalTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def write(self, frames, **options):
+        """Write (offset_us, frame) pairs; by default every two frames make a block in a segment of its own."""
+        options = {"block_frames": 2, "segment_bytes": 1, **options}
+        journal = FeedJournal(self.dir, "binance", **options)
+        for offset, frame in frames:
+            journal.append(frame, received_us=T0 + offset)
+        journal.close()
+        return JournalReader(self.dir, "binance")
+
+    def read(self, reader, start=None, end=None):
+        return [
+            (received_us - T0, payload)
+            for received_us, payload in reader.iter_frames(
+                None if start is None else T0 + start, None if end is None else T0 + end,
+            )
+        ]
+
+    def test_round_trip_across_rotated_segments(self):
+        frames = [(i * 10, {"e": "trade", "i": i}) for i in range(7)]
+        reader = self.write(frames)
+        self.assertEqual(len(reader.segments()), 4)
+        self.assertEqual([len(reader.read_index(segment)) for segment in reader.segments()], [1, 1, 1, 1])
+        self.assertEqual(
+            [(offset, frame) for offset, frame in reader.iter_json(T0, None)],
+            [(T0 + offset, frame) for offset, frame in frames],
+        )
+
+    def test_iter_frames_seeks_by_time(self):
+        reader = self.write([(i * 10, f"frame-{i}") for i in range(7)])
+        # 25..45 starts inside the second block and ends inside the third segment.
+        self.assertEqual(self.read(reader, 25, 45), [(30, b"frame-3"), (40, b"frame-4")])
+        self.assertEqual(self.read(reader, 20, 20), [(20, b"frame-2")])
+        self.assertEqual(self.read(reader, end=5), [(0, b"frame-0")])
+        self.assertEqual(self.read(reader, 61), [])
+        self.assertEqual(self.read(reader, -100, -1), [])
+
+    def test_blocks_within_one_segment(self):
+        reader = self.write([(i, f"{i}".encode()) for i in range(5)], segment_bytes=1 << 20)
+        (segment,) = reader.segments()
+        self.assertEqual([entry[4] for entry in reader.read_index(segment)], [2, 2, 1])
+        self.assertEqual(self.read(reader, 3), [(3, b"3"), (4, b"4")])
+
+    def test_a_torn_index_entry_is_ignored(self):
+        reader = self.write([(i, f"{i}".encode()) for i in range(4)], segment_bytes=1 << 20)
+        (segment,) = reader.segments()
+        index_path = segment.with_suffix(".idx")
+        data = index_path.read_bytes()
+        self.assertEqual(len(data), 2 * INDEX_ENTRY.size)
+        index_path.write_bytes(data[:-3])
+        # The last block has no complete entry, so the reader cannot see it.
+        self.assertEqual(len(reader.read_index(segment)), 1)
+        self.assertEqual(self.read(reader), [(0, b"0"), (1, b"1")])
+
+    def test_a_truncated_segment_skips_to_the_next_one(self):
+        reader = self.write([(i * 10, f"{i}".encode()) for i in range(6)], segment_bytes=100)
+        first = reader.segments()[0]
+        entries = reader.read_index(first)
+        self.assertGreater(len(entries), 1)
+        # Drop the tail of the first segment's last block; its index entry survives.
+        first.write_bytes(first.read_bytes()[:-1])
+        with self.assertLogs("backendapp.journal", "WARNING"):
+            frames = self.read(reader)
+        complete = sum(entry[4] for entry in entries[:-1])
+        self.assertEqual(frames[:complete], [(i * 10, f"{i}".encode()) for i in range(complete)])
+        self.assertEqual(len(frames), 6 - entries[-1][4])
+
+    def test_a_segment_without_an_index_is_skipped(self):
+        reader = self.write([(0, b"a"), (10, b"b"), (20, b"c")])
+        reader.segments()[0].with_suffix(".idx").unlink()
+        self.assertEqual(self.read(reader), [(20, b"c")])
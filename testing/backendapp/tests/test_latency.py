@@ -0,0 +1,85 @@
+import random
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from backendapp import views
+from backendapp.latency import END_TO_END, LatencyHistogram, LatencyTracker
+
+
+class LatencyHistogramTests(SimpleTestCase):
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 11):
+            histogram.record(value)
+        self.assertEqual(histogram.summary(), {
+            "count": 10, "sum_us": 55, "p50_us": 5, "p99_us": 10, "p999_us": 10, "max_us": 10,
+        })
+
+    def test_bucket_error_is_bounded(self):
+        rng = random.Random(7)
+        for value in [rng.randrange(32, 1 << 44) for _ in range(2000)] + [32, 33, 63, 64, 1 << 40]:
+            upper = LatencyHistogram._upper_bound(LatencyHistogram._index(value))
+            with self.subTest(value=value):
+                self.assertGreaterEqual(upper, value)
+                self.assertLess((upper - value) / value, 1 / 16)
+
+    def test_percentiles_report_the_bucket_bound_capped_at_the_max(self):
+        histogram = LatencyHistogram()
+        for value in [1_000] * 99 + [250_000]:
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(50), 1_023)  # 1_000 shares the [992, 1023] bucket
+        self.assertEqual(histogram.percentile(99), 1_023)
+        self.assertEqual(histogram.percentile(99.9), 250_000)
+        self.assertEqual(LatencyHistogram().percentile(99), 0)
+
+    def test_negative_values_count_as_zero(self):
+        histogram = LatencyHistogram()
+        histogram.record(-500)
+        self.assertEqual((histogram.counts[0], histogram.sum, histogram.max_value), (1, 0, 0))
+
+    def test_values_past_the_range_land_in_the_last_bucket(self):
+        histogram = LatencyHistogram()
+        histogram.record(1 << 60)
+        self.assertEqual(histogram.counts[-1], 1)
+        self.assertEqual(histogram.summary()["max_us"], 1 << 60)
+
+
+class LatencyTrackerTests(SimpleTestCase):
+    def test_record_path_records_each_stage_and_the_whole_path(self):
+        tracker = LatencyTracker()
+        tracker.record_path("BTCUSDT", [0, 100, 150, 400, 1_000])
+        snapshot = tracker.snapshot("BTCUSDT")
+        self.assertEqual(
+            {stage: row["BTCUSDT"]["max_us"] for stage, row in snapshot.items()},
+            {"socket_receive": 100, "state_merge": 50, "flush_start": 250, "send_complete": 600, END_TO_END: 1_000},
+        )
+        self.assertEqual(snapshot[END_TO_END]["*"]["count"], 1)
+
+    def test_partial_paths_skip_the_end_to_end_latency(self):
+        tracker = LatencyTracker()
+        tracker.record_path("BTCUSDT", [0, 100, None, None, None])
+        self.assertEqual(list(tracker.snapshot()), ["socket_receive"])
+
+
+class LatencyViewTests(SimpleTestCase):
+    def setUp(self):
+        self.tracker = LatencyTracker()
+        self.tracker.record("socket_receive", "BTCUSDT", 100)
+        patcher = mock.patch.object(views, "latency_tracker", self.tracker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_never_resets(self):
+        response = self.client.get("/api/latency/", {"symbol": "btcusdt", "reset": "1"})
+        self.assertEqual(response.json()["stages"]["socket_receive"]["BTCUSDT"]["count"], 1)
+        self.assertTrue(self.tracker.snapshot())
+
+    def test_post_returns_the_stats_and_resets(self):
+        response = self.client.post("/api/latency/")
+        self.assertEqual(response.json()["stages"]["socket_receive"]["BTCUSDT"]["count"], 1)
+        self.assertEqual(self.tracker.snapshot(), {})
+
+    def test_other_methods_are_rejected(self):
+        self.assertEqual(self.client.delete("/api/latency/").status_code, 405)
+        self.assertTrue(self.tracker.snapshot())
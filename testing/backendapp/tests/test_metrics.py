@@ -0,0 +1,38 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from backendapp import latency, metrics
+from backendapp.latency import LatencyTracker
+
+
+class ExpositionTests(SimpleTestCase):
+    def render(self):
+        return metrics.registry.render().splitlines()
+
+    def test_latency_summary_has_sum_and_count(self):
+        tracker = LatencyTracker()
+        with mock.patch.object(latency, "latency_tracker", tracker):
+            for received in (1_000, 3_000):
+                tracker.record("socket_receive", "BTCUSDT", received)
+            lines = self.render()
+        self.assertIn("# TYPE stream_latency_microseconds summary", lines)
+        self.assertIn('stream_latency_microseconds_sum{stage="socket_receive",symbol="BTCUSDT"} 4000', lines)
+        self.assertIn('stream_latency_microseconds_count{stage="socket_receive",symbol="BTCUSDT"} 2', lines)
+        # record() also feeds the all-symbols "*" series.
+        self.assertIn('stream_latency_microseconds_sum{stage="socket_receive",symbol="*"} 4000', lines)
+
+    def test_counters_and_histograms(self):
+        counter = metrics.Counter("test_events_total", "Events.", ("kind",))
+        counter.inc("a")
+        counter.inc("a", amount=2)
+        self.assertIn('test_events_total{kind="a"} 3', counter.render())
+
+        histogram = metrics.Histogram("test_seconds", "Latency.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value=value)
+        rendered = histogram.render()
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', rendered)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 3', rendered)
+        self.assertIn("test_seconds_count 3", rendered)
+        self.assertIn("test_seconds_sum 5.55", rendered)
@@ -0,0 +1,114 @@
+import asyncio
+import contextlib
+import json
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.test import SimpleTestCase, override_settings
+
+from backendapp.fake_exchange import FakeExchangeConfig, start_fake_exchange
+from backendapp.order_book import BookGap, OrderBook, OrderBookFeed, group_name, tier
+
+
+def diff(first, last, bids=(), asks=()):
+    return {"e": "depthUpdate", "E": 1, "U": first, "u": last, "b": list(bids), "a": list(asks)}
+
+
+class OrderBookTests(SimpleTestCase):
+    def setUp(self):
+        self.book = OrderBook("BTCUSDT", 2, 5)
+        self.book.load({
+            "lastUpdateId": 100,
+            "bids": [["99.00", "1.00000"], ["98.50", "2.00000"]],
+            "asks": [["100.00", "0.50000"], ["101.00", "3.00000"]],
+        })
+
+    def test_snapshot_levels_are_best_first(self):
+        self.assertEqual(self.book.top(1), ([["99.00", "1.00000"]], [["100.00", "0.50000"]]))
+        self.assertEqual(self.book.top(5)[0], [["99.00", "1.00000"], ["98.50", "2.00000"]])
+
+    def test_diffs_already_in_the_snapshot_are_dropped(self):
+        version = self.book.version
+        self.assertFalse(self.book.apply(diff(90, 100, bids=[["99.00", "0"]])))
+        self.assertEqual(self.book.version, version)
+        self.assertEqual(self.book.top(1)[0], [["99.00", "1.00000"]])
+
+    def test_first_diff_may_straddle_the_snapshot(self):
+        self.assertTrue(self.book.apply(diff(95, 105, bids=[["99.50", "4.00000"]], asks=[["100.00", "0"]])))
+        self.assertEqual(self.book.last_update_id, 105)
+        self.assertEqual(self.book.top(1), ([["99.50", "4.00000"]], [["101.00", "3.00000"]]))
+
+    def test_consecutive_diffs_apply_and_a_skip_is_a_gap(self):
+        self.assertTrue(self.book.apply(diff(101, 103)))
+        self.assertTrue(self.book.apply(diff(104, 110, bids=[["98.50", "0.00000"]])))
+        self.assertEqual(self.book.top(5)[0], [["99.00", "1.00000"]])
+        with self.assertRaises(BookGap):
+            self.book.apply(diff(112, 115))
+        self.assertEqual(self.book.last_update_id, 110)
+
+    def test_a_diff_starting_after_the_snapshot_is_a_gap(self):
+        with self.assertRaises(BookGap):
+            self.book.apply(diff(102, 104))
+
+    def test_load_replaces_the_book(self):
+        self.book.load({"lastUpdateId": 200, "bids": [["50.00", "1.00000"]], "asks": []})
+        self.assertEqual(self.book.top(5), ([["50.00", "1.00000"]], []))
+        self.assertEqual(self.book.last_update_id, 200)
+
+    def test_tiers(self):
+        self.assertEqual([tier(d) for d in (1, 5, 6, 10, 20, 50)], [5, 5, 10, 10, 20, 20])
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class OrderBookFeedTests(SimpleTestCase):
+    """OrderBookFeed against the fake exchange's depth snapshots and diff streams."""
+
+    @contextlib.asynccontextmanager
+    async def feed(self, **config):
+        _, runner = await start_fake_exchange(FakeExchangeConfig(symbols=["BTCUSDT"], **config), port=0)
+        host, port = runner.addresses[0][:2]
+        try:
+            with override_settings(BINANCE_API_URL=f"http://{host}:{port}/api", BINANCE_STREAM_URL=f"ws://{host}:{port}/"):
+                yield OrderBookFeed(push_interval=0.05)
+        finally:
+            await runner.cleanup()
+
+    async def wait_for(self, condition, timeout=5.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            if asyncio.get_running_loop().time() > deadline:
+                self.fail("timed out waiting for the order book")
+            await asyncio.sleep(0.02)
+
+    def test_publishes_the_synced_book_to_the_tier_group(self):
+        async def run():
+            async with self.feed() as feed:
+                layer = get_channel_layer()
+                channel = await layer.new_channel()
+                await layer.group_add(group_name("BTCUSDT", 5), channel)
+                symbol, depth = await feed.acquire("btcusdt", 3)
+                try:
+                    self.assertEqual((symbol, depth), ("BTCUSDT", 5))
+                    await self.wait_for(lambda: feed.diffs >= 3)
+                    message = await asyncio.wait_for(layer.receive(channel), 5)
+                    book = json.loads(message["text"])
+                    self.assertEqual((len(book["bids"]), len(book["asks"])), (5, 5))
+                    self.assertLess(float(book["bids"][0][0]), float(book["asks"][0][0]))
+                    self.assertIsNotNone(feed.view("BTCUSDT", 5))
+                finally:
+                    await feed.release(symbol, depth)
+                self.assertIsNone(feed.client)
+                self.assertEqual(feed.books, {})
+        async_to_sync(run)()
+
+    def test_resyncs_after_a_dropped_diff(self):
+        async def run():
+            async with self.feed(depth_gap_every=0.3) as feed:
+                key = await feed.acquire("BTCUSDT", 10)
+                try:
+                    await self.wait_for(lambda: feed.resyncs >= 1 and "BTCUSDT" in feed.books)
+                    synced = feed.books["BTCUSDT"].last_update_id
+                    await self.wait_for(lambda: feed.books["BTCUSDT"].last_update_id > synced)
+                finally:
+                    await feed.release(*key)
+        async_to_sync(run)()
@@ -0,0 +1,115 @@
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from backendapp.models import HistoryData
+from backendapp.quality import SCAN_SOURCES, SeriesScanner, mask_ranges
+
+T0 = 1_717_977_600  # 2024-06-10T00:00:00Z
+
+
+def series(*rows):
+    """rows of (slot, close, volume) on a 5m grid -> [epoch, o, h, l, c, v] float array."""
+    return np.array([[T0 + 300 * slot, close, close + 1, close - 1, close, volume] for slot, close, volume in rows],
+                    dtype=np.float64)
+
+
+def scan(chunk, split=None, **options):
+    scanner = SeriesScanner(300, **options)
+    for part in (np.split(chunk, split) if split else [chunk]):
+        scanner.feed(part)
+    return scanner.report()
+
+
+# Slot 2 duplicated, slots 5-6 missing, slots 7-10 identical, 11-13 without volume.
+MESSY = series(
+    (0, 100, 5), (1, 101, 5), (2, 102, 5), (2, 103, 5), (3, 104, 5), (4, 105, 5),
+    (7, 106, 5), (8, 106, 5), (9, 106, 5), (10, 106, 5), (11, 107, 0), (12, 108, 0), (13, 109, 0),
+)
+
+
+class SeriesScannerTests(SimpleTestCase):
+    def test_issue_ranges(self):
+        report = scan(MESSY)
+        self.assertEqual(report["rows"], 13)
+        self.assertEqual(report["counts"], {
+            "gap": 2, "duplicate": 2, "misaligned": 0, "placeholder": 4, "high_low": 0, "ohlc_bounds": 0,
+            "zero_volume": 3,
+        })
+        gap = next(issue for issue in report["issues"] if issue["kind"] == "gap")
+        self.assertEqual((gap["from"], gap["to"]), ("2024-06-10T00:25:00+00:00", "2024-06-10T00:30:00+00:00"))
+        zero = next(issue for issue in report["issues"] if issue["kind"] == "zero_volume")
+        self.assertEqual((zero["from"], zero["to"], zero["rows"]), (
+            "2024-06-10T00:55:00+00:00", "2024-06-10T01:05:00+00:00", 3,
+        ))
+
+    def test_chunk_boundaries_change_nothing(self):
+        whole = scan(MESSY)
+        for split in range(1, len(MESSY)):
+            with self.subTest(split=split):
+                self.assertEqual(scan(MESSY, [split]), whole)
+        # Every row in its own chunk: each pairwise check relies on the carried row.
+        self.assertEqual(scan(MESSY, list(range(1, len(MESSY)))), whole)
+
+    def test_ranges_touching_across_a_boundary_merge(self):
+        chunk = series((0, 100, 0), (1, 101, 0), (2, 102, 0), (3, 103, 0))
+        issues = scan(chunk, [2])["issues"]
+        self.assertEqual([(i["kind"], i["rows"]) for i in issues], [("zero_volume", 4)])
+
+    def test_short_placeholder_runs_are_ignored(self):
+        chunk = series((0, 100, 5), (1, 100, 5), (2, 101, 5))
+        self.assertEqual(scan(chunk)["counts"]["placeholder"], 0)
+        self.assertEqual(scan(chunk, min_placeholder_run=2)["counts"]["placeholder"], 2)
+
+    def test_bad_rows(self):
+        chunk = series((0, 100, 5), (1, 101, 5))
+        chunk[0, 2], chunk[0, 3] = 90, 110  # high below low
+        chunk[1, 0] += 7  # off the grid
+        chunk[1, 1] = 200  # open above high
+        counts = scan(chunk)["counts"]
+        self.assertEqual((counts["high_low"], counts["misaligned"], counts["ohlc_bounds"]), (1, 1, 2))
+
+    def test_overnight_gaps_are_closures_in_the_session_timezone(self):
+        kolkata = ZoneInfo("Asia/Kolkata")
+        # 09:55 and 10:00 UTC are 15:25 and 15:30 IST; the next row is 02:15 UTC (07:45 IST) the next day.
+        closes = series((119, 100, 5), (120, 101, 5), (315, 102, 5), (317, 103, 5))
+        report = scan(closes, session_tz=kolkata)
+        self.assertEqual(report["counts"]["gap"], 1)  # only the intraday slot 316
+        self.assertEqual(scan(closes)["counts"]["gap"], 194 + 1)
+
+    def test_mask_ranges(self):
+        self.assertEqual(mask_ranges(np.array([False, True, True, False, True])), [(1, 2), (4, 4)])
+        self.assertEqual(mask_ranges(np.zeros(3, dtype=bool)), [])
+
+
+class ScanCommandTests(TransactionTestCase):
+    def test_shared_history_table_is_scanned_per_source(self):
+        start = datetime(2024, 6, 10, 4, 0, tzinfo=timezone.utc)
+        rows = [("fyers", start + timedelta(minutes=5 * i)) for i in range(4)]
+        # IB candles for the same symbol name, later that day, would read as a gap in the Fyers series.
+        rows += [("ib", start + timedelta(hours=2, minutes=5 * i)) for i in range(2)]
+        HistoryData.objects.bulk_create([
+            HistoryData(source=source, symbol="ABC", timestamp=when, open_price=Decimal("10"), high_price=Decimal("11"),
+                        low_price=Decimal("9"), close_price=Decimal("10.5") + i, volume=100)
+            for i, (source, when) in enumerate(rows)
+        ])
+        self.assertEqual(SCAN_SOURCES["fyers"]["source"], "fyers")
+
+        out = io.StringIO()
+        call_command("scan_data_quality", "--source", "fyers", stdout=out, stderr=io.StringIO())
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["session_tz"], "Asia/Kolkata")
+        self.assertEqual(report["symbols"]["ABC"]["rows"], 4)
+        self.assertEqual(report["symbols"]["ABC"]["counts"]["gap"], 0)
+
+        out = io.StringIO()
+        call_command("scan_data_quality", "--source", "ib", "--session-tz", "none", stdout=out, stderr=io.StringIO())
+        report = json.loads(out.getvalue())
+        self.assertIsNone(report["session_tz"])
+        self.assertEqual(report["symbols"]["ABC"]["rows"], 2)
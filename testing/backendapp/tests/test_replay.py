@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import TransactionTestCase
+
+from backendapp.consumers.binance_consumer import BinanceConsumer
+from backendapp.fixed_point import binance_scales
+from backendapp.models import Binance_Data
+from backendapp.providers import BINANCE
+from backendapp.replay import replay_candles
+from backendapp.ticks import Tick
+
+START = datetime(2024, 6, 10, 9, 0, tzinfo=timezone.utc)
+
+
+class ReplayTests(TransactionTestCase):
+    def setUp(self):
+        # 0.01 tick size, 0.00001 step size
+        scales = mock.patch.dict(binance_scales.scales, {"BTCUSDT": (2, 5)})
+        scales.start()
+        self.addCleanup(scales.stop)
+        Binance_Data.objects.bulk_create([
+            Binance_Data(
+                symbol="BTCUSDT", timestamp=START + timedelta(minutes=5 * i),
+                open_price=Decimal("67000.10") + i, high_price=Decimal("67100.00") + i,
+                low_price=Decimal("66900.00") + i, close_price=Decimal("67050.25") + i,
+                volume=Decimal("12.50"),
+            )
+            for i in range(3)
+        ])
+
+    def test_stored_candles_replay_as_binance_ticks(self):
+        replayed = []
+        count = async_to_sync(replay_candles)(
+            "binance", ["BTCUSDT"], START, START + timedelta(hours=1), None,
+            lambda symbol, tick: replayed.append((symbol, tick)),
+        )
+        self.assertEqual(count, 3)
+        symbol, tick = replayed[0]
+        self.assertEqual(symbol, "BTCUSDT")
+        self.assertIsInstance(tick, Tick)
+        self.assertEqual(BINANCE.message(tick), {
+            "symbol": "BTCUSDT",
+            "timestamp": int(START.timestamp() * 1000),
+            "open": "67000.10",
+            "high": "67100.00",
+            "low": "66900.00",
+            "close": "67050.25",
+            "volume": "12.50000",
+        })
+        self.assertEqual([t.ts for _, t in replayed], [int(START.timestamp() * 1000) + 300_000 * i for i in range(3)])
+
+    def test_replayed_ticks_go_through_apply_tick(self):
+        consumer = BinanceConsumer()
+        async_to_sync(replay_candles)(
+            "binance", [], START, START + timedelta(hours=1), None, consumer.apply_tick,
+        )
+        # Conflated to the latest candle, as a live flush would be.
+        self.assertEqual(list(consumer.latest_updates), ["BTCUSDT"])
+        self.assertEqual(BINANCE.message(consumer.latest_updates["BTCUSDT"])["close"], "67052.25")
+
+    def test_stored_decimals_widen_a_coarser_scale(self):
+        # A 0.1 tick size today; the stored 67050.25 keeps its second decimal.
+        with mock.patch.dict(binance_scales.scales, {"BTCUSDT": (1, 5)}):
+            tick = BINANCE.stored_tick(("BTCUSDT", START, *[Decimal("67050.25")] * 4, Decimal("12.50")))
+        self.assertEqual((tick.price, tick.price_scale), (6705025, 2))
+        self.assertEqual(BINANCE.message(tick)["close"], "67050.25")
@@ -0,0 +1,76 @@
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+
+from backendapp.consumers import fyers_consumer, ibapi_consumer
+from backendapp.fyers_feed import FyersFeed
+from backendapp.ib_feed import IbFeed
+from backendapp.ib_stub import StubGateway, StubIB
+from backendapp.websockets.ibapi_ws import IBConnection
+from backendproject.asgi import application
+from backendproject.routing import websocket_urlpatterns
+
+
+class StandInSocket:
+    def __init__(self, on_open, on_error, on_message):
+        self.on_open = on_open
+        self.on_message = on_message
+
+    def connect(self):
+        self.on_open()
+
+    def subscribe(self, symbols, data_type):
+        pass
+
+    def close_connection(self):
+        pass
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class WebsocketRoutingTests(TransactionTestCase):
+    """The served ASGI application routes every live feed's socket."""
+
+    async def connect(self, path):
+        communicator = WebsocketCommunicator(application, path, headers=[(b"origin", b"http://localhost")])
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    def test_fyers_clients_share_the_feed(self):
+        feed = FyersFeed(StandInSocket, symbols=["NSE:SBIN-EQ"])
+
+        async def run():
+            with mock.patch.object(fyers_consumer, "fyers_feed", feed):
+                first, connected = await self.connect("/ws/fyers/")
+                self.assertTrue(connected)
+                second, _ = await self.connect("/ws/fyers/")
+                self.assertEqual(feed.refs, 2)
+                feed.on_message({"symbol": "NSE:SBIN-EQ", "ltp": 812.5, "last_traded_time": 1718000000, "vol_traded_today": 1000})
+                frame = json.loads(await first.receive_from(timeout=3))
+                self.assertIn("NSE:SBIN-EQ", frame)
+                await first.disconnect()
+                await second.disconnect()
+                self.assertEqual(feed.refs, 0)
+        async_to_sync(run)()
+
+    def test_ibapi_clients_get_updates_from_the_shared_feed(self):
+        gateway = StubGateway(latency=0, tick_interval=0.02)
+        feed = IbFeed(lambda: IBConnection(client_id=78, ib=StubIB(gateway)), symbols=["AAPL"])
+
+        async def run():
+            with mock.patch.object(ibapi_consumer, "ib_feed", feed), \
+                    override_settings(IB_BROADCAST_INTERVAL=0.05):
+                client, connected = await self.connect("/ws/ibapi/")
+                self.assertTrue(connected)
+                frame = json.loads(await client.receive_from(timeout=3))
+                self.assertEqual(list(frame), ["AAPL"])
+                await client.disconnect()
+            self.assertEqual(gateway.client_ids, set())
+        async_to_sync(run)()
+
+    def test_every_live_socket_has_a_route(self):
+        paths = ["ws/binance/", "ws/fyers/", "ws/ibapi/", "ws/replay/", "ws/orderbook/"]
+        for path in paths:
+            self.assertTrue(any(route.pattern.match(path) for route in websocket_urlpatterns), path)
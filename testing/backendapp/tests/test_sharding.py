@@ -0,0 +1,44 @@
+from django.test import SimpleTestCase
+
+from backendapp.sharding import HashRing
+
+SYMBOLS = [f"SYM{i}USDT" for i in range(2000)]
+
+
+class HashRingTests(SimpleTestCase):
+    def test_empty_ring_owns_nothing(self):
+        self.assertIsNone(HashRing().owner("BTCUSDT"))
+        self.assertEqual(HashRing().assign(SYMBOLS), {})
+
+    def test_assignment_is_deterministic_and_complete(self):
+        first = HashRing(["w1", "w2", "w3"]).assign(SYMBOLS)
+        second = HashRing(["w3", "w1", "w2"]).assign(SYMBOLS)
+        self.assertEqual(first, second)
+        self.assertEqual(sorted(s for keys in first.values() for s in keys), sorted(SYMBOLS))
+        # 128 points per worker keeps the split within a few percent of even.
+        for keys in first.values():
+            self.assertAlmostEqual(len(keys) / len(SYMBOLS), 1 / 3, delta=0.08)
+
+    def test_a_joining_worker_only_takes_symbols(self):
+        ring = HashRing(["w1", "w2", "w3"])
+        before = {s: ring.owner(s) for s in SYMBOLS}
+        ring.add("w4")
+        moved = [s for s in SYMBOLS if ring.owner(s) != before[s]]
+        self.assertTrue(all(ring.owner(s) == "w4" for s in moved))
+        self.assertAlmostEqual(len(moved) / len(SYMBOLS), 1 / 4, delta=0.08)
+
+    def test_a_leaving_worker_only_gives_up_its_own(self):
+        ring = HashRing(["w1", "w2", "w3", "w4"])
+        before = {s: ring.owner(s) for s in SYMBOLS}
+        ring.remove("w2")
+        moved = {s for s in SYMBOLS if ring.owner(s) != before[s]}
+        self.assertEqual(moved, {s for s in SYMBOLS if before[s] == "w2"})
+        self.assertNotIn("w2", ring.assign(SYMBOLS))
+
+    def test_members_that_own_nothing_are_listed(self):
+        self.assertEqual(HashRing(["only", "idle"]).assign([]), {"only": [], "idle": []})
+
+    def test_adding_twice_changes_nothing(self):
+        ring = HashRing(["w1"])
+        ring.add("w1")
+        self.assertEqual(len(ring._points), ring.replicas)
@@ -0,0 +1,145 @@
+import asyncio
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from backendapp import symbols
+from backendapp.fixed_point import SymbolScales
+from backendapp.models import TrackedSymbol
+from backendapp.symbols import SymbolRejected, SymbolWatcher
+from backendapp.tests.test_fixed_point import FakeClient
+
+IN_MEMORY = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+class ValidateTests(SimpleTestCase):
+    def validate(self, provider, symbol):
+        with mock.patch.object(symbols, "binance_scales", SymbolScales(ttl=60)):
+            return async_to_sync(symbols.validate)(provider, symbol, FakeClient())
+
+    def test_binance_symbols_must_be_listed_and_trading(self):
+        self.assertEqual(self.validate("binance", " btcusdt"), "BTCUSDT")
+        with self.assertRaisesMessage(SymbolRejected, "Binance does not list NEWUSDT"):
+            self.validate("binance", "NEWUSDT")
+        with self.assertRaisesMessage(SymbolRejected, "LUNAUSDT is BREAK on Binance, not TRADING"):
+            self.validate("binance", "LUNAUSDT")
+
+    def test_formats_are_checked_per_provider(self):
+        self.assertEqual(self.validate("fyers", "nse:bajaj-auto-eq"), "NSE:BAJAJ-AUTO-EQ")
+        with self.assertRaises(SymbolRejected):
+            self.validate("fyers", "SBIN")
+        with self.assertRaises(SymbolRejected):
+            self.validate("kraken", "XBTUSD")
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY)
+class SymbolWatcherTests(TransactionTestCase):
+    def setUp(self):
+        # Drop the rows the seed migration adds.
+        TrackedSymbol.objects.all().delete()
+
+    async def watching(self, watcher, provider):
+        deltas = asyncio.Queue()
+
+        async def on_symbols(added, removed):
+            await deltas.put((added, removed))
+        watcher.watch(provider, on_symbols)
+        # Let the listener join the group before anything is published.
+        await asyncio.sleep(0.1)
+        return deltas, on_symbols
+
+    def test_registry_deltas_reach_the_watcher(self):
+        async def run():
+            watcher = SymbolWatcher()
+            deltas, on_symbols = await self.watching(watcher, "fyers")
+            try:
+                self.assertEqual(await symbols.add("fyers", " nse:sbin-eq "), ("NSE:SBIN-EQ", True))
+                self.assertEqual(await asyncio.wait_for(deltas.get(), 2), (["NSE:SBIN-EQ"], []))
+                # Already enabled: nothing to publish.
+                self.assertEqual(await symbols.add("fyers", "NSE:SBIN-EQ"), ("NSE:SBIN-EQ", False))
+
+                await TrackedSymbol.objects.filter(symbol="NSE:SBIN-EQ").aupdate(enabled=False)
+                self.assertEqual(await symbols.add("fyers", "NSE:SBIN-EQ"), ("NSE:SBIN-EQ", True))
+                self.assertEqual(await asyncio.wait_for(deltas.get(), 2), (["NSE:SBIN-EQ"], []))
+
+                self.assertTrue(await symbols.remove("fyers", "nse:sbin-eq"))
+                self.assertEqual(await asyncio.wait_for(deltas.get(), 2), ([], ["NSE:SBIN-EQ"]))
+                self.assertFalse(await symbols.remove("fyers", "NSE:SBIN-EQ"))
+
+                # Other providers' changes are not delivered.
+                await symbols.add("ib", "AAPL")
+                await asyncio.sleep(0.2)
+                self.assertTrue(deltas.empty())
+            finally:
+                watcher.unwatch("fyers", on_symbols)
+            self.assertIsNone(watcher.task)
+
+        async_to_sync(run)()
+
+    @override_settings(CHANNEL_LAYERS={"default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer", "CONFIG": {"group_expiry": 1},
+    }})
+    def test_watcher_outlives_the_group_expiry(self):
+        async def run():
+            watcher = SymbolWatcher(refresh_interval=0.2)
+            deltas, on_symbols = await self.watching(watcher, "ib")
+            try:
+                await asyncio.sleep(3)
+                await symbols.publish("ib", added=["MSFT"])
+                self.assertEqual(await asyncio.wait_for(deltas.get(), 2), (["MSFT"], []))
+            finally:
+                watcher.unwatch("ib", on_symbols)
+
+        async_to_sync(run)()
+
+
+async def reject_delisted(provider, symbol, client=None):
+    if symbol == "GONEUSDT":
+        raise SymbolRejected("GONEUSDT is BREAK on Binance, not TRADING")
+    return symbol
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY)
+@mock.patch.object(symbols, "validate", reject_delisted)
+class TrackedSymbolAdminTests(TransactionTestCase):
+    def setUp(self):
+        TrackedSymbol.objects.all().delete()
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        self.url = reverse("admin:backendapp_trackedsymbol_changelist")
+        self.row = TrackedSymbol.objects.create(provider="binance", symbol="BTCUSDT", enabled=False)
+        self.gone = TrackedSymbol.objects.create(provider="binance", symbol="GONEUSDT", enabled=False)
+
+    def edit(self, enabled):
+        data = {"form-TOTAL_FORMS": "2", "form-INITIAL_FORMS": "2", "_save": "Save"}
+        for i, row in enumerate([self.row, self.gone]):
+            data[f"form-{i}-id"] = str(row.pk)
+            if row.symbol in enabled:
+                data[f"form-{i}-enabled"] = "on"
+        return self.client.post(self.url, data)
+
+    def test_list_editable_enables_through_the_form(self):
+        with mock.patch.object(symbols, "publish", mock.AsyncMock()) as publish:
+            response = self.edit(enabled={"BTCUSDT"})
+        self.assertEqual(response.status_code, 302)
+        self.row.refresh_from_db()
+        self.assertTrue(self.row.enabled)
+        publish.assert_awaited_once_with("binance", added=["BTCUSDT"])
+
+    def test_list_editable_rejects_what_the_form_rejects(self):
+        with mock.patch.object(symbols, "publish", mock.AsyncMock()) as publish:
+            response = self.edit(enabled={"BTCUSDT", "GONEUSDT"})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "GONEUSDT is BREAK on Binance")
+        self.assertFalse(TrackedSymbol.objects.filter(enabled=True).exists())
+        publish.assert_not_awaited()
+
+    def test_enable_action_skips_rejected_symbols(self):
+        with mock.patch.object(symbols, "publish", mock.AsyncMock()) as publish:
+            self.client.post(self.url, {
+                "action": "enable", "_selected_action": [str(self.row.pk), str(self.gone.pk)],
+            })
+        self.assertEqual(set(TrackedSymbol.objects.filter(enabled=True).values_list("symbol", flat=True)), {"BTCUSDT"})
+        publish.assert_awaited_once_with("binance", added=["BTCUSDT"])
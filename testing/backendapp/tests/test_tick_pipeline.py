@@ -0,0 +1,54 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from backendapp import tick_pipeline
+from backendapp.providers import FYERS
+from backendapp.tick_pipeline import TickPipeline
+
+
+class FlakyLayer:
+    """Channel layer whose first group_send fails, as when Redis drops a connection."""
+
+    def __init__(self):
+        self.sent = asyncio.Queue()
+        self.calls = 0
+
+    async def group_send(self, group, message):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("Redis went away")
+        await self.sent.put(message)
+
+
+def fyers_tick(ltp):
+    return {"symbol": "NSE:SBIN-EQ", "ltp": ltp, "last_traded_time": 1718000000, "vol_traded_today": 1000}
+
+
+class TickPipelineRunTests(SimpleTestCase):
+    def test_run_keeps_broadcasting_after_a_failed_flush(self):
+        layer = FlakyLayer()
+
+        async def run():
+            pipeline = TickPipeline(FYERS, "fyers_updates", "send.fyers", broadcast_interval=0.02, candles=False)
+            task = asyncio.create_task(pipeline.run())
+            try:
+                with mock.patch.object(tick_pipeline, "get_channel_layer", return_value=layer):
+                    pipeline.submit(fyers_tick(812.5))
+                    while layer.calls == 0:
+                        await asyncio.sleep(0.01)
+                    pipeline.submit(fyers_tick(813.0))
+                    message = await asyncio.wait_for(layer.sent.get(), 2)
+                self.assertFalse(task.done())
+            finally:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            self.assertEqual(message["symbols"], ["NSE:SBIN-EQ"])
+            self.assertEqual(json.loads(message["text"])["NSE:SBIN-EQ"]["close_price"], 813.0)
+
+        with self.assertLogs("backendapp.tick_pipeline", "ERROR") as logs:
+            async_to_sync(run)()
+        self.assertIn("Redis went away", logs.output[0])
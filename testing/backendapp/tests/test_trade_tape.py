@@ -0,0 +1,128 @@
+import tempfile
+from datetime import datetime, timezone
+from unittest import mock
+
+import numpy as np
+import zstandard
+from django.test import SimpleTestCase, override_settings
+
+from backendapp import trade_tape
+from backendapp.trade_tape import BLOCK_HEADER, TapeReader, TradeTape, decode_block, encode_block
+
+HOUR_MS = 1_718_000_000_000 // 3_600_000 * 3_600_000
+
+
+def rows(count, start_id=1000, start_ms=HOUR_MS):
+    return [
+        (start_id + i, start_ms + i * 37, 4300001 + (i * 7919) % 50 - 25, 1 + (i * 104729) % 3_000_000,
+         5000 + i * 3, 1 + i % 3, i % 2)
+        for i in range(count)
+    ]
+
+
+def event(row, symbol="BTCUSDT"):
+    agg_id, time_ms, price, qty, first_id, trades, buyer_maker = row
+    return {"e": "aggTrade", "s": symbol, "a": agg_id, "T": time_ms, "p": f"{price // 100}.{price % 100:02d}",
+            "q": f"{qty // 100000}.{qty % 100000:05d}", "f": first_id, "l": first_id + trades - 1, "m": bool(buyer_maker)}
+
+
+def split(block):
+    return BLOCK_HEADER.unpack(block[:BLOCK_HEADER.size]), block[BLOCK_HEADER.size:]
+
+
+class BlockTests(SimpleTestCase):
+    def test_round_trip(self):
+        data = rows(5000)
+        header, body = split(encode_block(data, 2, 5, zstandard.ZstdCompressor()))
+        table, price_scale, qty_scale = decode_block(header, body, zstandard.ZstdDecompressor())
+        np.testing.assert_array_equal(table, np.array(data, dtype=np.int64))
+        self.assertEqual((price_scale, qty_scale), (2, 5))
+        self.assertEqual(header[1], 5000)
+        self.assertEqual((header[2], header[3]), (data[0][1], data[-1][1]))
+
+    def test_columns_are_narrowed_to_fixed_little_endian_codes(self):
+        header, _ = split(encode_block(rows(100), 2, 5, zstandard.ZstdCompressor()))
+        self.assertEqual(header[0], b"TAP2")
+        # The id/time/price/first_id deltas fit in int8; qty needs int32.
+        self.assertEqual(list(header[-2]), [0, 0, 0, 2, 0, 0, 0])
+
+    def test_wide_values_round_trip(self):
+        data = [(1, HOUR_MS, 1, 2**40, 1, 1, 0), (2**35, HOUR_MS + 1, 2**50, 1, 2**33, 70000, 1)]
+        header, body = split(encode_block(data, 8, 8, zstandard.ZstdCompressor()))
+        table, _, _ = decode_block(header, body, zstandard.ZstdDecompressor())
+        np.testing.assert_array_equal(table, np.array(data, dtype=np.int64))
+
+    def test_reads_tap1_blocks(self):
+        data = rows(100)
+        header, body = split(encode_block(data, 2, 5, zstandard.ZstdCompressor()))
+        # TAP1 named the dtypes by numpy type char, e.g. "bbbibbb".
+        legacy = "".join("bhil"[code] for code in header[-2]).encode()
+        header = (b"TAP1",) + header[1:-2] + (legacy,) + header[-1:]
+        table, _, _ = decode_block(header, body, zstandard.ZstdDecompressor())
+        np.testing.assert_array_equal(table, np.array(data, dtype=np.int64))
+
+
+class TapeTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        patch = mock.patch.object(trade_tape.binance_scales, "get", return_value=(2, 5))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def write(self, *batches, block_rows=1000):
+        tape = TradeTape(self.directory.name, block_rows=block_rows, block_seconds=60)
+        for batch in batches:
+            for row in batch:
+                tape.append(event(row))
+        tape.close()
+
+    def test_reader_merges_writers_and_drops_duplicates(self):
+        data = rows(2500)
+        self.write(data[:1500])
+        self.write(data[1000:])  # a second writer overlapping the first
+        tape = TapeReader(self.directory.name).read("btcusdt", HOUR_MS, HOUR_MS + 3_600_000)
+        self.assertEqual(len(tape), 2500)
+        np.testing.assert_array_equal(tape.ids, [row[0] for row in data])
+        self.assertEqual(tape.volume(), trade_tape.format_scaled(sum(row[3] for row in data), 5))
+
+    def test_read_limits_to_the_time_range(self):
+        data = rows(1000)
+        self.write(data, block_rows=100)
+        start, end = data[200][1], data[299][1]
+        tape = TapeReader(self.directory.name).read("BTCUSDT", start, end)
+        np.testing.assert_array_equal(tape.ids, [row[0] for row in data[200:300]])
+
+    def test_volume_profile_and_vwap(self):
+        data = [(1, HOUR_MS, 10000, 100000, 1, 1, 0), (2, HOUR_MS + 1, 10050, 300000, 2, 1, 1),
+                (3, HOUR_MS + 2, 11000, 100000, 3, 1, 0)]
+        self.write(data)
+        tape = TapeReader(self.directory.name).read("BTCUSDT", HOUR_MS, HOUR_MS + 10)
+        self.assertAlmostEqual(tape.vwap(), (100 * 1 + 100.5 * 3 + 110 * 1) / 5)
+        self.assertEqual(tape.volume_profile("5"), [
+            {"price": "100.00", "volume": "4.00000", "buy_volume": "1.00000"},
+            {"price": "110.00", "volume": "1.00000", "buy_volume": "1.00000"},
+        ])
+
+    def test_a_torn_last_block_is_skipped(self):
+        data = rows(300)
+        self.write(data[:200], block_rows=200)
+        self.write(data[200:], block_rows=200)
+        path = next(iter(TapeReader(self.directory.name).files("BTCUSDT", HOUR_MS, HOUR_MS)))
+        with open(path, "r+b") as f:
+            f.truncate(path.stat().st_size - 10)
+        tape = TapeReader(self.directory.name).read("BTCUSDT", HOUR_MS, HOUR_MS + 3_600_000)
+        self.assertEqual(len(tape), 200)
+
+
+class TradeStatsViewTests(SimpleTestCase):
+    def test_span_and_order_are_checked(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(TRADE_TAPE_DIR=directory, TRADE_TAPE_MAX_SPAN=3600):
+            day = datetime(2024, 6, 1, tzinfo=timezone.utc)
+            too_long = self.client.get("/api/trades/BTCUSDT", {"from": day.isoformat(), "to": day.replace(hour=2).isoformat()})
+            backwards = self.client.get("/api/trades/BTCUSDT", {"from": day.replace(hour=1).isoformat(), "to": day.isoformat()})
+            ok = self.client.get("/api/trades/BTCUSDT", {"from": day.isoformat(), "to": day.replace(minute=30).isoformat()})
+        self.assertEqual(too_long.status_code, 400)
+        self.assertEqual(backwards.status_code, 400)
+        self.assertEqual(ok.status_code, 200)
+        self.assertEqual(ok.json()["trades"], 0)
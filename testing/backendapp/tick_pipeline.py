@@ -0,0 +1,261 @@
+import asyncio
+import json
+import logging
+import queue
+import time
+from datetime import datetime, timezone
+
+from channels.layers import get_channel_layer
+
+from backendapp import db, metrics
+from backendapp.ticks import Candle
+
+logger = logging.getLogger(__name__)
+
+# Tick pipeline shared by the live feeds. submit() may be called from a
+# provider SDK's own thread; all it does is turn the payload into a Tick
+# (through the feed's Provider) and put it on a bounded queue. An asyncio
+# task on the consumers' loop drains the queue every broadcast interval,
+# keeps the latest tick per symbol, publishes the changed symbols as one
+# {symbol: message} group message, builds 5-minute candles in memory and
+# writes closed candles in batches. Client messages are built once per
+# symbol per interval, not per tick.
+
+BUCKET_SECONDS = 300
+# Close a bucket this long after its end even if no newer tick arrived.
+CLOSE_GRACE_SECONDS = 5
+
+
+def _same_session(a, b, tz):
+    if tz is None:
+        return True
+    return datetime.fromtimestamp(a, tz).date() == datetime.fromtimestamp(b, tz).date()
+
+
+class CandleBucket:
+    """
+    One symbol's in-progress 5m candle. With cumulative volume (a running day
+    total) volume_base/volume_last are the totals at open and latest;
+    otherwise volume_last is the sum of the ticks' own volumes.
+    """
+    __slots__ = ("start", "open", "high", "low", "close", "volume_base", "volume_last")
+
+    def __init__(self, start, price, volume_base, volume_last):
+        self.start = start
+        self.open = self.high = self.low = self.close = price
+        self.volume_base = volume_base
+        self.volume_last = volume_last
+
+    def update(self, price, volume, cumulative=True):
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        if volume is not None:
+            self.volume_last = volume if cumulative else (self.volume_last or 0) + volume
+
+    def candle(self, provider, symbol):
+        last, base = self.volume_last or 0, self.volume_base or 0
+        if not provider.cumulative_volume:
+            volume = last
+        else:
+            # Running day totals restart each session, so a drop means a new day.
+            volume = last - base if last >= base else last
+        return Candle(provider.name, symbol, self.start, self.open, self.high, self.low, self.close, volume)
+
+
+def flat_candles(provider, symbol, first_start, last_start, price):
+    """Zero-volume candles at a carried-forward price for every slot in [first_start, last_start]."""
+    return [
+        Candle(provider.name, symbol, start, price, price, price, price, 0)
+        for start in range(first_start, last_start + 1, BUCKET_SECONDS)
+    ]
+
+
+class TickPipeline:
+    def __init__(self, provider, group, event_type, backfill=None, queue_size=100_000,
+                 broadcast_interval=0.25, persist_interval=2.0, candles=True):
+        self.provider = provider
+        self.group = group
+        # Consumer handler the group message is dispatched to, e.g. "send.fyers".
+        self.event_type = event_type
+        # async callable(feed_symbol, until), awaited the first time a symbol has no stored history.
+        self.backfill = backfill
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.broadcast_interval = broadcast_interval
+        self.persist_interval = persist_interval
+        # False: broadcast only, for feeds whose candles are written elsewhere.
+        self.candles = candles
+        # Latest tick per symbol since the last broadcast, and the last message sent for every symbol.
+        self.latest = {}
+        self.snapshot = {}
+        self.buckets = {}
+        # Last bucket closed for lack of ticks, kept for its close and cumulative volume.
+        self.closed = {}
+        self.pending = []
+        self.seen = set()
+        self.tasks = set()
+        self._last_persist = time.monotonic()
+        self._persisting = None
+        self._running = False
+
+    def submit(self, raw):
+        """Normalize a provider payload and enqueue it; never blocks. Safe from any thread."""
+        tick = self.provider.tick(raw)
+        if tick is None:
+            return
+        try:
+            self.queue.put_nowait(tick)
+        except queue.Full:
+            metrics.messages_dropped.inc(self.provider.name, tick.symbol)
+
+    def snapshot_text(self):
+        """Every symbol's latest message as one frame, or None before the first tick."""
+        return json.dumps(self.snapshot) if self.snapshot else None
+
+    async def run(self):
+        self._running = True
+        try:
+            while self._running:
+                await asyncio.sleep(self.broadcast_interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    # One bad flush (e.g. the channel layer briefly down) must not stop broadcasting.
+                    logger.exception(f"{self.provider.name} flush failed: {e}")
+        except asyncio.CancelledError:
+            pass
+
+    async def stop(self):
+        """Flush what is buffered, close open candles and wait for the last write."""
+        self._running = False
+        await self.flush(close_all=True)
+        for task in list(self.tasks):
+            task.cancel()
+        if self._persisting:
+            await self._persisting
+        if self.pending:
+            candles, self.pending = self.pending, []
+            await self._write(candles)
+
+    def _drain(self):
+        ticks = []
+        try:
+            while True:
+                ticks.append(self.queue.get_nowait())
+        except queue.Empty:
+            return ticks
+
+    async def flush(self, close_all=False):
+        for tick in self._drain():
+            if self.candles:
+                try:
+                    self._bucket(tick)
+                except (TypeError, ValueError, IndexError) as e:
+                    logger.warning(f"Skipping malformed {self.provider.name} tick {tick}: {e}")
+            previous = self.latest.get(tick.symbol)
+            if previous is not None:
+                tick.fill_from(previous)
+            self.latest[tick.symbol] = tick
+
+        if self.latest:
+            updates, self.latest = self.latest, {}
+            for symbol, tick in updates.items():
+                message = self.snapshot.get(symbol)
+                if message is None:
+                    message = self.snapshot[symbol] = {}
+                # Fields a tick does not carry (e.g. a quote's volume) keep their last value.
+                for key, value in self.provider.message(tick).items():
+                    if value is not None:
+                        message[key] = value
+            # One group message per interval with every changed symbol, serialized once for all consumers.
+            await get_channel_layer().group_send(self.group, {
+                "type": self.event_type,
+                "text": json.dumps({symbol: self.snapshot[symbol] for symbol in updates}),
+                "symbols": list(updates),
+            })
+
+        self._close_idle_buckets(close_all)
+        if self.pending and (close_all or time.monotonic() - self._last_persist >= self.persist_interval):
+            self._persist()
+
+    def _bucket(self, tick):
+        symbol = self.provider.storage_symbol(tick.symbol)
+        ts = tick.ts // 1000
+        price = tick.price
+        volume = tick.volume
+        start = ts - ts % BUCKET_SECONDS
+        if symbol not in self.seen:
+            self.seen.add(symbol)
+            self._spawn(self._first_seen(tick.symbol, start))
+
+        bucket = self.buckets.get(symbol)
+        if bucket is None:
+            self._open_bucket(symbol, start, price, volume, self.closed.pop(symbol, None))
+        elif start == bucket.start:
+            bucket.update(price, volume, self.provider.cumulative_volume)
+        elif start > bucket.start:
+            self.pending.append(bucket.candle(self.provider, symbol))
+            self._open_bucket(symbol, start, price, volume, bucket)
+        # Ticks older than the open bucket are only broadcast.
+
+    def _open_bucket(self, symbol, start, price, volume, previous):
+        cumulative = self.provider.cumulative_volume
+        if previous is None:
+            self.buckets[symbol] = CandleBucket(start, price, volume, volume)
+            return
+        if start <= previous.start:
+            return  # late tick for a candle that was already written
+        # Fill slots with no trades inside the same session with flat candles at the last close.
+        if start - previous.start > BUCKET_SECONDS and _same_session(previous.start, start, self.provider.session_tz):
+            self.pending.extend(
+                flat_candles(self.provider, symbol, previous.start + BUCKET_SECONDS, start - BUCKET_SECONDS, previous.close)
+            )
+        self.buckets[symbol] = CandleBucket(start, price, previous.volume_last if cumulative else 0, volume)
+
+    def _close_idle_buckets(self, close_all):
+        cutoff = time.time() - CLOSE_GRACE_SECONDS
+        for symbol, bucket in list(self.buckets.items()):
+            if close_all or bucket.start + BUCKET_SECONDS <= cutoff:
+                self.pending.append(bucket.candle(self.provider, symbol))
+                self.closed[symbol] = bucket
+                del self.buckets[symbol]
+
+    def _persist(self):
+        if self._persisting and not self._persisting.done():
+            return  # previous batch still writing; these candles go with the next one
+        candles, self.pending = self.pending, []
+        self._last_persist = time.monotonic()
+        self._persisting = asyncio.create_task(self._write(candles))
+
+    async def _write(self, candles):
+        try:
+            await db.insert_candles(
+                self.provider.model_name, [candle.row() for candle in candles], source=self.provider.name
+            )
+        except Exception as e:
+            logger.error(f"Failed to save {len(candles)} {self.provider.name} candles: {e}")
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _first_seen(self, feed_symbol, start):
+        """Backfill a symbol with no history; fill a same-session gap up to the first live candle."""
+        provider = self.provider
+        symbol = provider.storage_symbol(feed_symbol)
+        try:
+            latest = await db.latest_candle(provider.model_name, symbol, source=provider.name)
+            if latest is None:
+                if self.backfill:
+                    await self.backfill(feed_symbol, datetime.fromtimestamp(start, timezone.utc))
+                return
+            last_start = int(latest["timestamp"].timestamp())
+            if start - last_start > BUCKET_SECONDS and _same_session(last_start, start, provider.session_tz):
+                self.pending.extend(
+                    flat_candles(provider, symbol, last_start + BUCKET_SECONDS, start - BUCKET_SECONDS, latest["close_price"])
+                )
+        except Exception as e:
+            logger.error(f"Error preparing history for {symbol}: {e}")
@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+
+from backendapp.fixed_point import format_scaled
+
+# Normalized market-data records shared by every provider. Providers turn
+# their own payloads into these (see providers.py) and everything downstream,
+# conflation, candle building, persistence and fan-out, works on them only.
+# Both are __slots__ classes: a few hundred thousand live at once during a
+# burst, and they are created on the feed's hot path.
+#
+# When price_scale/qty_scale are set, prices and quantities are fixed-point
+# ints with that many decimals (see fixed_point.py); otherwise they are the
+# provider's own numbers.
+
+
+class Tick:
+    """
+    One observation of a symbol. ts is epoch milliseconds. volume is whatever
+    the provider reports (see Provider.cumulative_volume); open/high/low are
+    the provider's own session or bar fields, passed through to clients.
+    """
+    __slots__ = ("source", "symbol", "ts", "price", "volume", "open", "high", "low", "bid", "ask",
+                 "price_scale", "qty_scale")
+
+    def __init__(self, source, symbol, ts, price, volume=None, open=None, high=None, low=None, bid=None, ask=None,
+                 price_scale=None, qty_scale=None):
+        self.source = source
+        self.symbol = symbol
+        self.ts = ts
+        self.price = price
+        self.volume = volume
+        self.open = open
+        self.high = high
+        self.low = low
+        self.bid = bid
+        self.ask = ask
+        self.price_scale = price_scale
+        self.qty_scale = qty_scale
+
+    def key(self):
+        """What a client sees change; with fixed-point values comparing these is integer work."""
+        return (self.ts, self.price, self.open, self.high, self.low, self.volume, self.bid, self.ask)
+
+    def fill_from(self, older):
+        """Take the optional fields this tick lacks from an older tick of the same symbol."""
+        for field in ("volume", "open", "high", "low", "bid", "ask"):
+            if getattr(self, field) is None:
+                setattr(self, field, getattr(older, field))
+
+    def __repr__(self):
+        return f"Tick({self.source}, {self.symbol}, {self.ts}, {self.price}, {self.volume})"
+
+
+class Candle:
+    """One OHLCV bar. start is epoch seconds."""
+    __slots__ = ("source", "symbol", "start", "open", "high", "low", "close", "volume", "price_scale", "qty_scale")
+
+    def __init__(self, source, symbol, start, open, high, low, close, volume, price_scale=None, qty_scale=None):
+        self.source = source
+        self.symbol = symbol
+        self.start = start
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.price_scale = price_scale
+        self.qty_scale = qty_scale
+
+    def row(self):
+        """Column tuple for db.insert_candles; fixed-point values go out as exact decimal text."""
+        when = datetime.fromtimestamp(self.start, timezone.utc)
+        p = self.price_scale
+        if p is None:
+            return (self.symbol, when, self.open, self.high, self.low, self.close, self.volume)
+        return (self.symbol, when, format_scaled(self.open, p), format_scaled(self.high, p),
+                format_scaled(self.low, p), format_scaled(self.close, p), format_scaled(self.volume, self.qty_scale))
+
+    def __repr__(self):
+        return f"Candle({self.source}, {self.symbol}, {self.start}, {self.close}, {self.volume})"
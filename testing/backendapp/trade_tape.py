@@ -0,0 +1,345 @@
+import atexit
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from backendapp import metrics
+from backendapp.fixed_point import binance_scales, format_scaled, to_scaled
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - only needed when the trade tape is enabled
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Binance aggregate-trade tape as compressed columnar blocks. Each symbol
+# has one file per writer process per UTC hour, <SYMBOL>/<YYYYMMDDHH>-<pid>.tape,
+# made of independent blocks:
+#
+#     BLOCK_HEADER, then one zstd frame holding the columns back to back
+#
+# Columns are int arrays: aggregate trade ID, trade time (ms), price and
+# quantity (fixed-point at the header's scales), first trade ID, trade count
+# and the buyer-maker flag. IDs, times and prices are stored as deltas from
+# the header's base values, and every column is narrowed to the smallest
+# int dtype that holds it before compression. An aggTrade ends up at a few
+# bytes instead of a Postgres row. Readers skip blocks outside the time
+# range by their header alone, and merge the files of one hour by trade ID,
+# which also drops the duplicates two shard workers write while a symbol
+# moves between them.
+
+BLOCK_HEADER = struct.Struct("<4sIqqqqqqBB7sI")  # magic, rows, min/max time, base id/time/price/first id, scales, dtypes, length
+MAGIC = b"TAP2"
+# TAP1 blocks name their column dtypes by numpy type chars, whose sizes and
+# byte order are those of the writing machine; they are still read on the
+# assumption that it was little-endian with 8-byte longs.
+LEGACY_MAGIC = b"TAP1"
+COLUMNS = ("id", "time", "price", "qty", "first_id", "trades", "buyer_maker")
+DELTA_COLUMNS = (0, 1, 2, 4)  # stored relative to the previous row; the first row is the header's base
+# Column dtypes are written as indexes into this table, one byte per column.
+_DTYPES = tuple(np.dtype(code) for code in ("<i1", "<i2", "<i4", "<i8"))
+_LEGACY_DTYPES = {"b": "<i1", "h": "<i2", "i": "<i4", "l": "<i8", "q": "<i8"}
+
+tape_trades = metrics.registry.counter(
+    "trade_tape_trades_total", "Aggregate trades written to the trade tape.", ("symbol",)
+)
+tape_bytes = metrics.registry.counter(
+    "trade_tape_bytes_total", "Bytes written to the trade tape, headers included.", ("symbol",)
+)
+tape_dropped = metrics.registry.counter(
+    "trade_tape_dropped_total", "Aggregate trades dropped because the tape queue was full.", ()
+)
+
+_STOP = object()
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise ImportError("The trade tape needs the 'zstandard' package (pip install zstandard)")
+
+
+def _narrow(column):
+    """-> (index into _DTYPES, the column as that little-endian dtype)"""
+    low, high = (int(column.min()), int(column.max())) if len(column) else (0, 0)
+    for code, dtype in enumerate(_DTYPES):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return code, column.astype(dtype)
+    raise OverflowError("trade tape column does not fit in int64")
+
+
+def encode_block(rows, price_scale, qty_scale, compressor):
+    """Rows of (id, time, price, qty, first_id, trades, buyer_maker) ints -> header + compressed columns."""
+    table = np.array(rows, dtype=np.int64)
+    bases = table[0]
+    codes, columns = [], []
+    for i in range(len(COLUMNS)):
+        column = table[:, i]
+        if i in DELTA_COLUMNS:
+            column = np.diff(column, prepend=column[0])
+        code, column = _narrow(column)
+        codes.append(code)
+        columns.append(column)
+    body = compressor.compress(b"".join(column.tobytes() for column in columns))
+    header = BLOCK_HEADER.pack(
+        MAGIC, len(rows), int(table[:, 1].min()), int(table[:, 1].max()),
+        int(bases[0]), int(bases[1]), int(bases[2]), int(bases[4]), price_scale, qty_scale,
+        bytes(codes), len(body),
+    )
+    return header + body
+
+
+def decode_block(header, body, decompressor):
+    """-> (table of shape (rows, 7) int64, price_scale, qty_scale)"""
+    magic, rows, _, _, base_id, base_time, base_price, base_first, price_scale, qty_scale, codes, _ = header
+    if magic == LEGACY_MAGIC:
+        dtypes = [np.dtype(_LEGACY_DTYPES[char]) for char in codes.decode()]
+    else:
+        dtypes = [_DTYPES[code] for code in codes]
+    raw = decompressor.decompress(body)
+    table = np.empty((rows, len(COLUMNS)), dtype=np.int64)
+    pos = 0
+    for i, dtype in enumerate(dtypes):
+        table[:, i] = np.frombuffer(raw, dtype=dtype, count=rows, offset=pos)
+        pos += rows * dtype.itemsize
+    for i, base in zip(DELTA_COLUMNS, (base_id, base_time, base_price, base_first)):
+        table[:, i] = np.cumsum(table[:, i]) + base
+    return table, price_scale, qty_scale
+
+
+def _hour_key(time_ms):
+    return datetime.fromtimestamp(time_ms // 1000, tz=timezone.utc).strftime("%Y%m%d%H")
+
+
+class TradeTape:
+    """
+    Writer side. append() only enqueues the raw aggTrade event; a background
+    thread parses, buffers per symbol and writes a block when a symbol has
+    block_rows trades or its oldest one is block_seconds old. Trades still
+    buffered when the process dies are lost.
+    """
+
+    def __init__(self, directory, block_rows=50_000, block_seconds=60.0, level=9, queue_size=500_000):
+        _require_zstd()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.block_rows = block_rows
+        self.block_seconds = block_seconds
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._buffers = {}  # symbol -> [aggTrade events]
+        self._started = {}  # symbol -> monotonic time of the oldest buffered event
+        self._thread = threading.Thread(target=self._run, name="trade-tape", daemon=True)
+        self._thread.start()
+
+    def append(self, event):
+        """Queue one aggTrade event as received from the stream."""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            tape_dropped.inc()
+
+    def close(self, timeout=5):
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    # --- writer thread ---
+
+    def _run(self):
+        checked = time.monotonic()
+        while True:
+            try:
+                event = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                event = None
+            if event is _STOP:
+                for symbol in list(self._buffers):
+                    self._flush(symbol)
+                return
+            if event is not None:
+                symbol = event["s"]
+                buffer = self._buffers.get(symbol)
+                if buffer is None:
+                    buffer = self._buffers[symbol] = []
+                    self._started[symbol] = time.monotonic()
+                buffer.append(event)
+                if len(buffer) >= self.block_rows:
+                    self._flush(symbol)
+            now = time.monotonic()
+            if now - checked >= 1.0:
+                checked = now
+                for symbol in [s for s, started in self._started.items() if started <= now - self.block_seconds]:
+                    self._flush(symbol)
+
+    def _flush(self, symbol):
+        try:
+            self._write(symbol)
+        except Exception as e:
+            logger.exception(f"Error writing trade tape block for {symbol}: {e}")
+
+    def _write(self, symbol):
+        events = self._buffers.pop(symbol, None)
+        self._started.pop(symbol, None)
+        if not events:
+            return
+        p, q = binance_scales.get(symbol)
+        hours = {}
+        for e in events:
+            hours.setdefault(_hour_key(e["T"]), []).append((
+                e["a"], e["T"], to_scaled(e["p"], p), to_scaled(e["q"], q), e["f"], e["l"] - e["f"] + 1, int(e["m"]),
+            ))
+        folder = self.directory / symbol
+        folder.mkdir(exist_ok=True)
+        for hour, rows in hours.items():
+            block = encode_block(rows, p, q, self._compressor)
+            with open(folder / f"{hour}-{os.getpid()}.tape", "ab") as f:
+                f.write(block)
+            tape_trades.inc(symbol, amount=len(rows))
+            tape_bytes.inc(symbol, amount=len(block))
+
+
+class TapeSlice:
+    """
+    One symbol's trades in a time range as parallel int arrays ordered by
+    aggregate trade ID, with prices and quantities fixed-point at
+    price_scale/qty_scale.
+    """
+
+    def __init__(self, symbol, table, price_scale, qty_scale):
+        self.symbol = symbol
+        self.price_scale = price_scale
+        self.qty_scale = qty_scale
+        self.ids, self.times, self.prices, self.qtys, self.first_ids, self.trades, self.buyer_maker = table.T
+
+    def __len__(self):
+        return len(self.ids)
+
+    def volume(self):
+        return format_scaled(int(self.qtys.sum()), self.qty_scale)
+
+    def vwap(self):
+        """Volume-weighted average price, or None without volume."""
+        volume = self.qtys.sum()
+        if not volume:
+            return None
+        notional = np.dot(self.prices.astype(np.float64), self.qtys.astype(np.float64))
+        return notional / volume / 10 ** self.price_scale
+
+    def volume_profile(self, bucket=None, buckets=50):
+        """
+        Volume per price bucket, lowest first: [{price, volume, buy_volume}], with
+        buy_volume the part bought by takers. `bucket` is a decimal string width
+        (e.g. "10"); without it the traded range is split into about `buckets`.
+        """
+        if not len(self):
+            return []
+        low, high = int(self.prices.min()), int(self.prices.max())
+        width = to_scaled(bucket, self.price_scale) if bucket else (high - low) // buckets + 1
+        width = max(1, width)
+        index = (self.prices - low // width * width) // width
+        volume = np.zeros(int(index.max()) + 1, dtype=np.int64)
+        bought = np.zeros_like(volume)
+        np.add.at(volume, index, self.qtys)
+        np.add.at(bought, index, np.where(self.buyer_maker == 0, self.qtys, 0))
+        start = low // width * width
+        return [
+            {
+                "price": format_scaled(start + i * width, self.price_scale),
+                "volume": format_scaled(int(volume[i]), self.qty_scale),
+                "buy_volume": format_scaled(int(bought[i]), self.qty_scale),
+            }
+            for i in np.flatnonzero(volume)
+        ]
+
+
+class TapeReader:
+    def __init__(self, directory):
+        _require_zstd()
+        self.directory = Path(directory)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def files(self, symbol, start_ms, end_ms):
+        first, last = _hour_key(start_ms), _hour_key(end_ms)
+        folder = self.directory / symbol.upper()
+        return sorted(path for path in folder.glob("*.tape") if first <= path.name[:10] <= last)
+
+    def iter_blocks(self, path, start_ms=None, end_ms=None):
+        """Yield (header, compressed body) of the blocks overlapping the range; a torn last block is skipped."""
+        with open(path, "rb") as f:
+            while True:
+                raw = f.read(BLOCK_HEADER.size)
+                if len(raw) < BLOCK_HEADER.size:
+                    return
+                header = BLOCK_HEADER.unpack(raw)
+                if header[0] not in (MAGIC, LEGACY_MAGIC):
+                    logger.error(f"Corrupt trade tape block in {path}")
+                    return
+                first_ms, last_ms, length = header[2], header[3], header[-1]
+                if (start_ms is not None and last_ms < start_ms) or (end_ms is not None and first_ms > end_ms):
+                    f.seek(length, os.SEEK_CUR)
+                    continue
+                body = f.read(length)
+                if len(body) < length:
+                    return
+                yield header, body
+
+    def read(self, symbol, start_ms, end_ms):
+        """Trades with start_ms <= time <= end_ms as a TapeSlice."""
+        parts = []
+        for path in self.files(symbol, start_ms, end_ms):
+            for header, body in self.iter_blocks(path, start_ms, end_ms):
+                parts.append(decode_block(header, body, self._decompressor))
+        if not parts:
+            return TapeSlice(symbol.upper(), np.empty((0, len(COLUMNS)), dtype=np.int64), 0, 0)
+        # Blocks written before and after an exchangeInfo refresh may differ in scale.
+        price_scale = max(p for _, p, _ in parts)
+        qty_scale = max(q for _, _, q in parts)
+        for table, p, q in parts:
+            table[:, 2] *= 10 ** (price_scale - p)
+            table[:, 3] *= 10 ** (qty_scale - q)
+        table = np.concatenate([table for table, _, _ in parts])
+        table = table[(table[:, 1] >= start_ms) & (table[:, 1] <= end_ms)]
+        _, unique = np.unique(table[:, 0], return_index=True)
+        return TapeSlice(symbol.upper(), table[unique], price_scale, qty_scale)
+
+    def stored_bytes(self, symbol, start_ms, end_ms):
+        return sum(path.stat().st_size for path in self.files(symbol, start_ms, end_ms))
+
+
+_tape = None
+_tape_lock = threading.Lock()
+
+
+def get_trade_tape():
+    """The process's TradeTape, or None when TRADE_TAPE_DIR is not configured."""
+    global _tape
+    directory = getattr(settings, "TRADE_TAPE_DIR", None)
+    if not directory:
+        return None
+    if _tape is None:
+        with _tape_lock:
+            if _tape is None:
+                _tape = TradeTape(
+                    directory,
+                    block_rows=getattr(settings, "TRADE_TAPE_BLOCK_ROWS", 50_000),
+                    block_seconds=getattr(settings, "TRADE_TAPE_BLOCK_SECONDS", 60.0),
+                )
+    return _tape
+
+
+@atexit.register
+def _close_tape():
+    if _tape is not None:
+        _tape.close()
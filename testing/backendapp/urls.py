@@ -1,6 +1,6 @@
 from django.urls import path
 from django.http import JsonResponse
-from backendapp.views import start_fyers_ws_and_fetch_history, start_binance_ws_api
+from backendapp.views import start_fyers_ws_and_fetch_history, start_binance_ws_api, latency_stats, loop_stats, feed_health, profile_worker, export_history, symbols_api, symbol_detail, trade_stats
 
 def api_root(request):
     return JsonResponse({
@@ -8,6 +8,13 @@ def api_root(request):
         'available_endpoints': {
             'fyers_websocket': '/api/start-fyers-and-fetch-history/',
             'binance_websocket': '/api/start-binance/',
+            'latency': '/api/latency/',
+            'event_loop': '/api/debug/loop/',
+            'feeds': '/api/debug/feeds/',
+            'profiler': '/api/debug/profile/?seconds=10',
+            'export': '/api/export/<symbol>?from=&to=&format=csv|arrow|parquet',
+            'symbols': '/api/symbols/?provider=binance|fyers|ib (POST to add, DELETE /api/symbols/<provider>/<symbol>)',
+            'trades': '/api/trades/<symbol>?from=&to=&bucket=',
         },
         'documentation': 'Each endpoint starts a WebSocket connection in a separate thread'
     })
@@ -16,4 +23,12 @@ urlpatterns = [
     path('', api_root, name='api_root'),  # Add this root endpoint
     path('start-fyers-and-fetch-history/', start_fyers_ws_and_fetch_history, name='start_fyers_and_fetch_history'),
     path('start-binance/', start_binance_ws_api, name='start_binance_ws_api'),
+    path('latency/', latency_stats, name='latency_stats'),
+    path('debug/loop/', loop_stats, name='loop_stats'),
+    path('debug/feeds/', feed_health, name='feed_health'),
+    path('debug/profile/', profile_worker, name='profile_worker'),
+    path('export/<str:symbol>', export_history, name='export_history'),
+    path('symbols/', symbols_api, name='symbols_api'),
+    path('symbols/<str:provider>/<str:symbol>', symbol_detail, name='symbol_detail'),
+    path('trades/<str:symbol>', trade_stats, name='trade_stats'),
 ]
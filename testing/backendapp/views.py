@@ -1,8 +1,23 @@
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.conf import settings
+from django.views.decorators.csrf import csrf_exempt
+from datetime import datetime, timezone
+import hmac
+import json
+import re
 import threading
 import asyncio
+import aiohttp
+from binance.exceptions import BinanceAPIException, BinanceRequestException
 from backendapp.fyers_ws import fetch_and_save_historical_data
 from backendapp.binance_ws import start_binance_ws
+from backendapp.latency import latency_tracker
+from backendapp.loop_monitor import loop_monitor, sample_profile
+from backendapp.feed_supervisor import supervisor
+from backendapp.export import ENCODERS, accepts_gzip, available_formats, stream_export
+from backendapp.replay import REPLAY_SOURCES
+from backendapp import symbols as symbol_registry
+from backendapp.trade_tape import TapeReader
 
 # New view for both tasks
 def start_fyers_ws_and_fetch_history(request):
@@ -31,6 +46,185 @@ def start_binance_ws_api(request):
     
     return JsonResponse({"message": "Binance WebSocket started!"})
 
+@csrf_exempt
+def latency_stats(request):
+    """
+    GET  ?symbol=<symbol>    per-stage and per-symbol latency percentiles for the streaming pipeline
+    POST                     return the percentiles and reset every histogram
+    """
+    if request.method not in ("GET", "POST"):
+        return JsonResponse({"error": "Use GET or POST"}, status=405)
+    symbol = request.GET.get("symbol")
+    stats = latency_tracker.snapshot(symbol.upper() if symbol else None)
+    if request.method == "POST":
+        latency_tracker.reset()
+    return JsonResponse({"unit": "microseconds", "stages": stats})
+
+def loop_stats(request):
+    """Event loop lag and the most recent slow callbacks."""
+    return JsonResponse(loop_monitor.stats())
+
+def feed_health(request):
+    """Health state, reconnects and backfills of every supervised upstream stream in this process."""
+    return JsonResponse(supervisor.status())
+
+
+async def profile_worker(request):
+    """Sample stacks on this worker for N seconds and return collapsed stacks for a flame graph."""
+    if not getattr(settings, "PROFILER_ENABLED", False):
+        return JsonResponse({"error": "Profiler is disabled (set PROFILER_ENABLED=true)"}, status=403)
+    try:
+        seconds = min(float(request.GET.get("seconds", 10)), 120)
+        interval = max(float(request.GET.get("interval_ms", 5)), 1) / 1000
+    except ValueError:
+        return JsonResponse({"error": "seconds and interval_ms must be numbers"}, status=400)
+    thread_ids = None
+    if request.GET.get("loop_only") == "1" and loop_monitor.loop_thread_id:
+        thread_ids = {loop_monitor.loop_thread_id}
+    # Sample from a worker thread so the event loop being profiled keeps running.
+    profile = await asyncio.to_thread(sample_profile, seconds, interval, thread_ids)
+    return HttpResponse(profile, content_type="text/plain; charset=utf-8")
+
+
+# An unencoded "+" in a query string decodes to a space: ...T09:15:00 05:30 means +05:30.
+_SPACE_OFFSET = re.compile(r"(\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?) (\d{2}(?::?\d{2})?)$")
+
+
+def _parse_export_time(value, default):
+    if not value:
+        return default
+    value = value.strip()
+    if value.isdigit():
+        return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc)
+    moment = datetime.fromisoformat(_SPACE_OFFSET.sub(r"\1+\2", value))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+async def export_history(request, symbol):
+    """
+    Stream stored candles for one symbol.
+
+    ?from=<iso|ms>&to=<iso|ms>&format=csv|arrow|parquet&source=binance|history
+    Every row carries a source column (fyers or ib for the shared history table).
+    The body is gzipped when the client sends Accept-Encoding: gzip (not for parquet,
+    which is already compressed).
+    """
+    fmt = request.GET.get("format", "csv").lower()
+    source = request.GET.get("source", "binance")
+    if fmt not in available_formats():
+        error = f"Unsupported format {fmt}" if fmt not in ENCODERS else f"Format {fmt} needs pyarrow, which is not installed"
+        return JsonResponse({"error": error, "formats": available_formats()}, status=400)
+    if source not in REPLAY_SOURCES:
+        return JsonResponse({"error": f"Unknown source {source}", "sources": sorted(REPLAY_SOURCES)}, status=400)
+    try:
+        end = _parse_export_time(request.GET.get("to"), datetime.now(timezone.utc))
+        start = _parse_export_time(request.GET.get("from"), datetime(1970, 1, 1, tzinfo=timezone.utc))
+    except ValueError:
+        return JsonResponse({"error": "from and to must be ISO-8601 or epoch milliseconds"}, status=400)
+
+    symbol = symbol.upper()
+    gzip = fmt != "parquet" and accepts_gzip(request.headers.get("Accept-Encoding", ""))
+    encoder = ENCODERS[fmt]
+    response = StreamingHttpResponse(
+        stream_export(source, symbol, start, end, fmt, gzip), content_type=encoder.content_type
+    )
+    # Symbols come from the URL (Fyers ones contain ':'); keep the filename to a safe charset.
+    filename = re.sub(r"[^A-Za-z0-9._-]", "_", f"{symbol}-{source}")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{encoder.extension}"'
+    response["Vary"] = "Accept-Encoding"
+    if gzip:
+        response["Content-Encoding"] = "gzip"
+    return response
+
+def _symbols_token_ok(request):
+    token = getattr(settings, "SYMBOLS_API_TOKEN", None)
+    return bool(token) and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+
+
+@csrf_exempt
+async def symbols_api(request):
+    """
+    GET  ?provider=binance|fyers|ib            enabled symbols per provider
+    POST {"provider": ..., "symbol": ...}      validate and add; live feeds subscribe it at once
+    Changes need Authorization: Bearer <SYMBOLS_API_TOKEN>.
+    """
+    if request.method == "GET":
+        provider = request.GET.get("provider")
+        providers = [provider] if provider else list(symbol_registry.DEFAULTS)
+        if any(p not in symbol_registry.DEFAULTS for p in providers):
+            return JsonResponse({"error": f"Unknown provider {provider}"}, status=400)
+        return JsonResponse({p: await symbol_registry.enabled(p) for p in providers})
+    if request.method != "POST":
+        return JsonResponse({"error": "Use GET or POST"}, status=405)
+    if not _symbols_token_ok(request):
+        return JsonResponse({"error": "Symbol changes need a valid SYMBOLS_API_TOKEN"}, status=403)
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "The body must be JSON"}, status=400)
+    if not isinstance(body, dict) or not all(isinstance(body.get(k), str) for k in ("provider", "symbol")):
+        return JsonResponse({"error": 'Send {"provider": "<name>", "symbol": "<symbol>"} with string values'}, status=400)
+    try:
+        symbol, changed = await symbol_registry.add(body["provider"], body["symbol"])
+    except symbol_registry.SymbolRejected as e:
+        # bad format, unknown provider, not listed or not TRADING
+        return JsonResponse({"error": str(e)}, status=400)
+    except (BinanceAPIException, BinanceRequestException) as e:
+        return JsonResponse({"error": f"Binance could not validate the symbol: {e}"}, status=502)
+    except (aiohttp.ClientError, OSError, asyncio.TimeoutError) as e:
+        return JsonResponse({"error": f"Symbol validation is unavailable, try again later: {e!r}"}, status=503)
+    return JsonResponse({"provider": body["provider"], "symbol": symbol, "added": changed}, status=201 if changed else 200)
+
+
+@csrf_exempt
+async def symbol_detail(request, provider, symbol):
+    """DELETE removes a symbol; live feeds unsubscribe it at once."""
+    if request.method != "DELETE":
+        return JsonResponse({"error": "Use DELETE"}, status=405)
+    if not _symbols_token_ok(request):
+        return JsonResponse({"error": "Symbol changes need a valid SYMBOLS_API_TOKEN"}, status=403)
+    if not await symbol_registry.remove(provider, symbol):
+        return JsonResponse({"error": f"{provider} {symbol} is not tracked"}, status=404)
+    return JsonResponse({"provider": provider, "symbol": symbol.upper(), "removed": True})
+
+
+def trade_stats(request, symbol):
+    """
+    Trade count, volume, VWAP and volume profile from the aggTrade tape.
+
+    ?from=<iso|ms>&to=<iso|ms> (default: the last hour)&bucket=<price width>|buckets=<count>
+    The range may span at most TRADE_TAPE_MAX_SPAN seconds, and buckets at most 1000.
+    """
+    directory = getattr(settings, "TRADE_TAPE_DIR", None)
+    if not directory:
+        return JsonResponse({"error": "The trade tape is disabled (set TRADE_TAPE_DIR)"}, status=404)
+    now = datetime.now(timezone.utc)
+    try:
+        end = _parse_export_time(request.GET.get("to"), now)
+        start = _parse_export_time(request.GET.get("from"), datetime.fromtimestamp(now.timestamp() - 3600, tz=timezone.utc))
+        buckets = min(max(1, int(request.GET.get("buckets", 50))), 1000)
+    except ValueError:
+        return JsonResponse({"error": "from and to must be ISO-8601 or epoch milliseconds, buckets a number"}, status=400)
+    max_span = getattr(settings, "TRADE_TAPE_MAX_SPAN", 86400)
+    if not start <= end:
+        return JsonResponse({"error": "from must not be after to"}, status=400)
+    if (end - start).total_seconds() > max_span:
+        return JsonResponse({"error": f"The range may span at most {max_span} seconds"}, status=400)
+    tape = TapeReader(directory).read(symbol.upper(), int(start.timestamp() * 1000), int(end.timestamp() * 1000))
+    try:
+        profile = tape.volume_profile(request.GET.get("bucket"), buckets)
+    except ValueError:
+        return JsonResponse({"error": "bucket must be a decimal price width, e.g. 10 or 0.5"}, status=400)
+    return JsonResponse({
+        "symbol": tape.symbol,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "trades": len(tape),
+        "volume": tape.volume(),
+        "vwap": tape.vwap(),
+        "profile": profile,
+    })
+
 # def start_ibapi_ws_api(request):
 #     """API to start Other WebSocket"""
 #     threading.Thread(target=start_ibkr_ws, daemon=True).start()
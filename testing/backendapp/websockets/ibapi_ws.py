@@ -2,20 +2,18 @@
 import asyncio
 from datetime import datetime, timezone, timedelta
 from ib_insync import IB, Stock
-from asgiref.sync import sync_to_async
+from backendapp import metrics, db
 
 # Replace the following import with your actual Django model
 from backendapp.models import HistoryData
 
-# Define the list of symbols you wish to fetch historical data for.
-# For example, you might have:
-IB_SYMBOLS = ["AAPL", "MSFT", "GOOG"]  # Update with your desired symbols
 
 class IBConnection:
     _next_client_id = 1
 
-    def __init__(self, client_id=None):
-        self.ib = IB()
+    def __init__(self, client_id=None, ib=None):
+        # ib: an ib_insync.IB, or a stand-in such as backendapp.ib_stub.StubIB
+        self.ib = ib if ib is not None else IB()
         if client_id is not None:
             self.client_id = client_id
         else:
@@ -40,11 +38,10 @@ class IBConnection:
         """
         return Stock(symbol, exchange, currency)
 
-    @sync_to_async(thread_sensitive=True)
-    def save_history_records(self, records):
-        """Save a list of HistoryData records using Django ORM."""
+    async def save_history_records(self, records):
+        """Save a list of HistoryData records through the async market-data layer."""
         if records:
-            HistoryData.objects.bulk_create(records, ignore_conflicts=True)
+            await db.insert_candles("HistoryData", db.candle_rows(records), source="ib")
 
     async def fetch_and_save_historical_data_for_symbol(
         self, symbol, duration='1 Y', bar_size='1 day', total_years=10
@@ -82,6 +79,7 @@ class IBConnection:
                 print(f"⚠️ No data returned for {symbol} for chunk ending {endDateTime}")
                 break
 
+            metrics.backfill_rows.inc("ib", symbol, amount=len(bars))
             records = []
             for bar in bars:
                 try:
@@ -114,22 +112,21 @@ class IBConnection:
             current_end = new_end
             await asyncio.sleep(1)  # Small pause to avoid rate limits
 
-    async def fetch_and_save_all_historical_data(self):
+    async def fetch_and_save_all_historical_data(self, total_years=10):
         """
-        Fetch historical data concurrently for all symbols defined in IB_SYMBOLS.
+        Fetch daily history for the registry's IB symbols over this connection,
+        paced by the shared scheduler in backendapp.ib_history.
         """
-        tasks = [
-            asyncio.shield(self.fetch_and_save_historical_data_for_symbol(symbol))
-            for symbol in IB_SYMBOLS
-        ]
-        await asyncio.gather(*tasks)
+        from backendapp import ib_history, symbols as symbol_registry
+
+        return await ib_history.backfill(await symbol_registry.enabled("ib"), [self], days=total_years * 365)
 
 
 async def main():
-    ib_conn = IBConnection()
-    await ib_conn.connect()
-    await ib_conn.fetch_and_save_all_historical_data()
-    await ib_conn.disconnect()
+    from backendapp import ib_history, symbols as symbol_registry
+
+    async with ib_history.IbClientPool() as pool:
+        await ib_history.backfill(await symbol_registry.enabled("ib"), pool.connections, days=10 * 365)
 
 
 if __name__ == "__main__":
@@ -1,10 +1,15 @@
-from django.urls import re_path
+from django.urls import path
 from backendapp.consumers.fyers_consumer import FyersConsumer
 from backendapp.consumers.binance_consumer import BinanceConsumer
 from backendapp.consumers.ibapi_consumer import IbApiConsumer
+from backendapp.consumers.replay_consumer import ReplayConsumer
+from backendapp.consumers.orderbook_consumer import OrderBookConsumer
 
+# The one WebSocket route table; backendproject.asgi serves it.
 websocket_urlpatterns = [
-    re_path(r'ws/fyers/$', FyersConsumer.as_asgi()),  # WebSocket route for Fyers
-    re_path(r'ws/binance/$', BinanceConsumer.as_asgi()),  # WebSocket route for Binance
-    re_path(r'ws/ibapi/$', IbApiConsumer.as_asgi()),  # WebSocket route for Other API
-]
\ No newline at end of file
+    path('ws/fyers/', FyersConsumer.as_asgi()),  # WebSocket route for Fyers
+    path('ws/binance/', BinanceConsumer.as_asgi()),  # WebSocket route for Binance
+    path('ws/ibapi/', IbApiConsumer.as_asgi()),  # WebSocket route for Other API
+    path('ws/replay/', ReplayConsumer.as_asgi()),  # Historical replay through the live send path
+    path('ws/orderbook/', OrderBookConsumer.as_asgi()),  # Local order books at 5/10/20 levels
+]
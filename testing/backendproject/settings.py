@@ -52,6 +52,13 @@ ASGI_APPLICATION = 'backendproject.asgi.application'
 DATABASES = {
     'default': dj_database_url.config(default='sqlite:///db.sqlite3')
 }
+if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+    # Concurrent writers (backfill progress, candle batches) wait for the lock instead of failing.
+    DATABASES['default'].setdefault('OPTIONS', {}).update({'timeout': 20, 'transaction_mode': 'IMMEDIATE'})
+
+# Async market-data DB pool (psycopg 3 on Postgres, thread pool elsewhere)
+MARKET_DB_POOL_MIN = int(os.getenv('MARKET_DB_POOL_MIN', '2'))
+MARKET_DB_POOL_MAX = int(os.getenv('MARKET_DB_POOL_MAX', '10'))
 
 # Channel Layers (Redis for WebSockets)
 CHANNEL_LAYERS = {
@@ -108,22 +115,97 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Binance endpoints (override to point at a local stand-in, see `manage.py run_fake_exchange`)
+BINANCE_API_URL = os.getenv('BINANCE_API_URL')  # e.g. http://127.0.0.1:9900/api
+BINANCE_STREAM_URL = os.getenv('BINANCE_STREAM_URL')  # e.g. ws://127.0.0.1:9900/
+
+# Binance ingestion: 'direct' opens upstream sockets per /ws/binance/ client; 'sharded' makes
+# clients read the group that `manage.py ingest_binance` workers publish to
+BINANCE_INGEST = os.getenv('BINANCE_INGEST', 'direct')
+BINANCE_BROADCAST_INTERVAL = float(os.getenv('BINANCE_BROADCAST_INTERVAL', '0.25'))  # seconds between shard broadcasts
+BINANCE_TICK_QUEUE_SIZE = int(os.getenv('BINANCE_TICK_QUEUE_SIZE', '100000'))  # per shard worker
+BINANCE_SHARD_HEARTBEAT = float(os.getenv('BINANCE_SHARD_HEARTBEAT', '2'))  # seconds; a worker is dropped after 3 missed
+BINANCE_METADATA_TTL = float(os.getenv('BINANCE_METADATA_TTL', '3600'))  # seconds exchangeInfo (tick sizes, status) is cached
+
+# Upstream feed supervisor (backendapp.feed_supervisor): reconnects and gap backfill for every Binance socket
+FEED_RECONNECT_RATE = float(os.getenv('FEED_RECONNECT_RATE', '5'))  # reconnects per second across all streams, so mass drops are staggered
+FEED_BACKOFF_BASE = float(os.getenv('FEED_BACKOFF_BASE', '0.5'))  # seconds; full-jitter backoff doubles from here
+FEED_BACKOFF_CAP = float(os.getenv('FEED_BACKOFF_CAP', '30'))  # seconds; longest wait between attempts (retries never stop)
+FEED_STALE_SECONDS = float(os.getenv('FEED_STALE_SECONDS', '10'))  # silence before a stream is reported stale
+FEED_DEAD_SECONDS = float(os.getenv('FEED_DEAD_SECONDS', '60'))  # silence before a stale stream is reconnected
+FEED_GAP_SECONDS = float(os.getenv('FEED_GAP_SECONDS', '5'))  # event-time jump treated as missed data and backfilled
+
+# Local order books for /ws/orderbook/ clients (backendapp.order_book)
+ORDER_BOOK_PUSH_INTERVAL = float(os.getenv('ORDER_BOOK_PUSH_INTERVAL', '0.25'))  # seconds between conflated top-N pushes
+ORDER_BOOK_SNAPSHOT_LIMIT = int(os.getenv('ORDER_BOOK_SNAPSHOT_LIMIT', '1000'))  # levels per side in the REST bootstrap snapshot
+
+# Symbol registry API: adding/removing symbols over HTTP needs this bearer token (unset = admin only)
+SYMBOLS_API_TOKEN = os.getenv('SYMBOLS_API_TOKEN')
+
+# Raw feed journal (disabled unless a directory is configured)
+FEED_JOURNAL_DIR = os.getenv('FEED_JOURNAL_DIR')
+FEED_JOURNAL_SEGMENT_SECONDS = int(os.getenv('FEED_JOURNAL_SEGMENT_SECONDS', '3600'))
+
+# Binance aggTrade tape written by the shard workers (unset = disabled), see backendapp.trade_tape
+TRADE_TAPE_DIR = os.getenv('TRADE_TAPE_DIR')
+TRADE_TAPE_BLOCK_ROWS = int(os.getenv('TRADE_TAPE_BLOCK_ROWS', '50000'))  # trades per compressed block at most
+TRADE_TAPE_BLOCK_SECONDS = float(os.getenv('TRADE_TAPE_BLOCK_SECONDS', '60'))  # a symbol's buffered trades are written at least this often
+TRADE_TAPE_MAX_SPAN = int(os.getenv('TRADE_TAPE_MAX_SPAN', '86400'))  # seconds; longest from/to range /api/trades/ reads into memory
+
+# Event loop monitoring and on-demand profiling
+LOOP_MONITOR_INTERVAL = float(os.getenv('LOOP_MONITOR_INTERVAL', '0.5'))  # seconds between lag samples
+LOOP_SLOW_CALLBACK_MS = float(os.getenv('LOOP_SLOW_CALLBACK_MS', '100'))  # callbacks longer than this are logged
+LOOP_SLOW_CALLBACK_HOOK = os.getenv('LOOP_SLOW_CALLBACK_HOOK', 'false').lower() == 'true'  # patches asyncio's Handle._run process-wide; no effect under uvloop
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'  # exposes /api/debug/profile/
+
+# Fyers API credentials (the access token is reissued daily)
+FYERS_CLIENT_ID = os.getenv('FYERS_CLIENT_ID')
+FYERS_ACCESS_TOKEN = os.getenv('ACCESS_TOKEN')
+
+# Fyers tick pipeline (SDK thread -> bounded queue -> event loop)
+FYERS_TICK_QUEUE_SIZE = int(os.getenv('FYERS_TICK_QUEUE_SIZE', '100000'))  # ticks dropped beyond this
+FYERS_BROADCAST_INTERVAL = float(os.getenv('FYERS_BROADCAST_INTERVAL', '0.25'))  # seconds between coalesced broadcasts
+FYERS_PERSIST_INTERVAL = float(os.getenv('FYERS_PERSIST_INTERVAL', '2'))  # seconds between candle batch writes
+
+# Fyers history backfill quotas (shared by every backfill in the process)
+FYERS_HISTORY_PER_SECOND = int(os.getenv('FYERS_HISTORY_PER_SECOND', '10'))
+FYERS_HISTORY_PER_MINUTE = int(os.getenv('FYERS_HISTORY_PER_MINUTE', '200'))
+FYERS_HISTORY_PER_DAY = int(os.getenv('FYERS_HISTORY_PER_DAY', '100000'))
+FYERS_HISTORY_WORKERS = int(os.getenv('FYERS_HISTORY_WORKERS', '4'))  # concurrent history() calls
+
+# IB historical backfill (pacing model shared by a small pool of client IDs)
+IB_HOST = os.getenv('IB_HOST', '127.0.0.1')
+IB_PORT = int(os.getenv('IB_PORT', '7496'))
+IB_HISTORY_CLIENTS = int(os.getenv('IB_HISTORY_CLIENTS', '3'))  # connections in the backfill pool
+IB_HISTORY_CLIENT_ID = int(os.getenv('IB_HISTORY_CLIENT_ID', '100'))  # first client ID of the pool
+IB_HISTORY_PER_10_MIN = int(os.getenv('IB_HISTORY_PER_10_MIN', '60'))  # IB allows 60 requests per 10 minutes
+IB_HISTORY_PACING_PENALTY = float(os.getenv('IB_HISTORY_PACING_PENALTY', '60'))  # seconds to hold after a violation, doubling
+
+# IB live feed (one shared connection for every /ws/ibapi/ client)
+IB_FEED_CLIENT_ID = int(os.getenv('IB_FEED_CLIENT_ID', '50'))
+IB_BROADCAST_INTERVAL = float(os.getenv('IB_BROADCAST_INTERVAL', '0.25'))  # seconds between coalesced broadcasts
+IB_STUB = os.getenv('IB_STUB', 'false').lower() == 'true'  # serve IB from backendapp.ib_stub instead of TWS
+
 # Logging Configuration
+# Django's DEBUG log goes to DJANGO_LOG_FILE when it is set (keep it outside the
+# source tree); otherwise Django logs to the console as usual.
+DJANGO_LOG_FILE = os.getenv('DJANGO_LOG_FILE')
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
-    'handlers': {
+}
+if DJANGO_LOG_FILE:
+    LOGGING['handlers'] = {
         'file': {
             'level': 'DEBUG',
             'class': 'logging.FileHandler',
-            'filename': 'debug.log',
+            'filename': DJANGO_LOG_FILE,
         },
-    },
-    'loggers': {
+    }
+    LOGGING['loggers'] = {
         'django': {
             'handlers': ['file'],
             'level': 'DEBUG',
             'propagate': True,
         },
-    },
-}
+    }
@@ -1,15 +1,21 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.shortcuts import redirect
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
+from backendapp.metrics import registry
 
 # Health check view
 def health_check(request):
     return JsonResponse({"status": "ok"}, status=200)
 
+# Prometheus scrape endpoint
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('backendapp.urls')),  # Ensure 'backendapp/urls.py' exists
     path('', lambda request: redirect('api/')),  # Redirect to API root
     path('health/', health_check),  # JSON health check
+    path('metrics', metrics_view),  # Prometheus metrics
 ]